@@ -0,0 +1,67 @@
+# coding: utf-8
+"""Throughput of evtx2es_async and responsiveness of the event loop meanwhile.
+
+A ticker coroutine measures how late the event loop wakes it up while files
+are imported concurrently against a stand-in ES node with `--latency`.
+
+    $ uv run python benchmarks/bench_async_import.py --chunks 256 --files 4 --latency 0.05
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es import evtx2es_async
+from fake_es import FakeElasticsearch
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(paths, port: int, concurrency: int) -> float:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop))
+    await asyncio.gather(
+        *(
+            evtx2es_async(str(path), host="127.0.0.1", port=port, bulk_concurrency=concurrency)
+            for path in paths
+        )
+    )
+    stop.set()
+    return await ticker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        paths = [path] * args.files
+        for concurrency in args.concurrency:
+            with FakeElasticsearch(latency=args.latency) as es:
+                start = time.perf_counter()
+                lag = asyncio.run(run(paths, es.port, concurrency))
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{args.files} files, bulk-concurrency={concurrency:<3} {es.documents} docs"
+                    f" {elapsed:.2f}s, {es.documents / elapsed:.0f} docs/s,"
+                    f" worst event loop lag {lag * 1000:.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# coding: utf-8
+"""Overlap gain of concurrent bulk indexing against a stand-in ES node.
+
+The stand-in answers every `_bulk` request after `--latency` seconds,
+so sequential imports leave the CPU idle during each round-trip.
+
+    $ uv run python benchmarks/bench_bulk_concurrency.py --chunks 256 --latency 0.05
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es.presenters.Evtx2esPresenter import Evtx2esPresenter
+from fake_es import FakeElasticsearch
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--bulk-size", type=int, default=500)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        for threads in args.threads:
+            with FakeElasticsearch(latency=args.latency) as es:
+                start = time.perf_counter()
+                Evtx2esPresenter(
+                    input_path=path,
+                    port=es.port,
+                    is_quiet=True,
+                    bulk_threads=threads,
+                    bulk_size=args.bulk_size,
+                ).bulk_import()
+                elapsed = time.perf_counter() - start
+                print(
+                    f"bulk-threads={threads:<3} {es.documents} docs in {es.requests} requests,"
+                    f" {elapsed:.2f}s, {es.documents / elapsed:.0f} docs/s"
+                )
+
+
+if __name__ == "__main__":
+    main()
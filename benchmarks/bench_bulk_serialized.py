@@ -0,0 +1,80 @@
+# coding: utf-8
+"""Main process cost of bulk indexing: dict actions vs `_bulk` items from the workers.
+
+    dicts       workers return dicts; the main process wraps them into actions
+                and the bulk helpers serialize every source again
+    serialized  workers return the `_bulk` lines (action + source); the main
+                process posts them as they are
+
+Reports the CPU time of the main thread (which formats nothing and sends
+every request here) per million documents, against a stand-in ES node.
+
+    $ uv run python benchmarks/bench_bulk_serialized.py --chunks 1024 --parse-in-workers
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es.models.ElasticsearchUtils import ElasticsearchUtils
+from evtx2es.models.Evtx2es import Evtx2es, WorkerOptions
+from fake_es import FakeElasticsearch
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+INDEX = "evtx2es"
+
+
+def run(path: Path, serialized: bool, args: argparse.Namespace, port: int) -> tuple:
+    es = ElasticsearchUtils("127.0.0.1", port, "http", "", "")
+    options = WorkerOptions(
+        "0",
+        (),
+        "content",
+        serialized,
+        bulk_index=INDEX if serialized else None,
+    )
+    evtx = Evtx2es(path)
+    with evtx.create_pool(args.workers, options) as pool:
+        count = 0
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        for batch in evtx.gen_records(
+            "0",
+            True,
+            args.size,
+            pool=pool,
+            id_strategy="content",
+            parse_in_workers=args.parse_in_workers,
+            serialized=serialized,
+            bulk_index=INDEX,
+        ):
+            if serialized:
+                success, _ = es.bulk_serialized(batch, chunk_size=args.size)
+            else:
+                success, _ = es.bulk_indice(batch, INDEX, "", chunk_size=args.size)
+            count += success
+        return count, time.perf_counter() - start, time.thread_time() - cpu_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=1024)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--parse-in-workers", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'mode':>11} {'docs':>9} {'docs/s':>8} {'main CPU s/Mdoc':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        for serialized in (False, True):
+            with FakeElasticsearch() as es:
+                count, elapsed, cpu = run(path, serialized, args, es.port)
+            print(
+                f"{'serialized' if serialized else 'dicts':>11} {count:>9}"
+                f" {count / elapsed:>8.0f} {cpu * 1e6 / count:>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
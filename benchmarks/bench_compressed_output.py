@@ -0,0 +1,63 @@
+# coding: utf-8
+"""Streaming compressed output vs converting then compressing in a second pass.
+
+    $ uv run python benchmarks/bench_compressed_output.py --chunks 1024
+"""
+import argparse
+import gzip
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import orjson
+
+from evtx2es.presenters.Evtx2jsonPresenter import Evtx2jsonPresenter
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def two_pass(src: Path, dest: Path, output_format: str) -> int:
+    # former workflow: evtx2json, then gzip the file in a second pass
+    plain = dest.with_suffix("")
+    presenter = Evtx2jsonPresenter(src, plain, is_quiet=True, output_format=output_format)
+    if output_format == "json":
+        plain.write_text(
+            orjson.dumps(presenter.evtx2json(), option=orjson.OPT_INDENT_2).decode("utf-8")
+        )
+    else:
+        presenter.export_json()
+    with plain.open("rb") as f_in, gzip.open(dest, "wb", compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    written = plain.stat().st_size + dest.stat().st_size
+    plain.unlink()
+    return written
+
+
+def streaming(src: Path, dest: Path, output_format: str) -> int:
+    Evtx2jsonPresenter(src, dest, is_quiet=True, output_format=output_format).export_json()
+    return dest.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        for output_format in ("json", "ndjson"):
+            for name, func in (("convert + gzip", two_pass), ("streaming gzip", streaming)):
+                dest = Path(tmp) / f"out.{output_format}.gz"
+                start = time.perf_counter()
+                written = func(src, dest, output_format)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{output_format:>6} {name:<15} {elapsed:6.2f}s,"
+                    f" {written / 2**20:8.1f} MiB written, {dest.stat().st_size / 2**20:6.1f} MiB output"
+                )
+                dest.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# coding: utf-8
+"""Per-record cost of each document id strategy.
+
+    $ uv run python benchmarks/bench_document_id.py --chunks 256
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es.models.DocumentId import ID_STRATEGIES, get_id_function
+from evtx2es.models.Evtx2es import Evtx2es
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        records = [
+            record
+            for batch in Evtx2es(path).gen_records("0", False, 500)
+            for record in batch
+        ]
+
+        for id_strategy in ID_STRATEGIES:
+            try:
+                calc_id = get_id_function(id_strategy)
+            except ImportError as e:
+                print(f"{id_strategy:<8} skipped: {e}")
+                continue
+            if calc_id is None:
+                continue
+            start = time.perf_counter()
+            for record in records:
+                calc_id(record)
+            elapsed = time.perf_counter() - start
+            print(f"{id_strategy:<8} {elapsed / len(records) * 1e6:7.2f} us/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# coding: utf-8
+"""Records/sec of the former and current `process_by_chunk` pipelines.
+
+The former pipeline re-serialized every record dict with `orjson.dumps`,
+joined them into one JSON array and parsed it again before
+`format_record` parsed each "data" payload a third time.
+
+    $ uv run python benchmarks/bench_format_pipeline.py --chunks 256
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import orjson
+from evtx import PyEvtxParser
+
+from evtx2es.models.Evtx2es import format_record, generate_chunks, process_by_chunk
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def legacy_process_by_chunk(records: List[dict], filepath: str, shift: str) -> List[dict]:
+    concatenated_json = (
+        f"[{','.join([orjson.dumps(record).decode('utf-8') for record in records])}]"
+    )
+    return [
+        format_record(record, filepath=filepath, shift=shift)
+        for record in orjson.loads(concatenated_json)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        # parse once up front so only the formatting pipelines are measured
+        chunks = list(generate_chunks(args.size, PyEvtxParser(str(path)).records_json()))
+        count = sum(len(chunk) for chunk in chunks)
+
+        pipelines = {
+            "legacy": lambda chunk: legacy_process_by_chunk(chunk, str(path), "0"),
+            "current": lambda chunk: process_by_chunk(chunk, str(path), "0"),
+        }
+        for name, pipeline in pipelines.items():
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                for chunk in chunks:
+                    pipeline(chunk)
+                best = min(best, time.perf_counter() - start)
+            print(f"{name:>8}: {count} records, {count / best:>10.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# coding: utf-8
+"""Cost of re-importing a log with --incremental when nothing (or little) is new.
+
+The first run imports everything and records the state; the second run sees
+the same file again, as a periodic pull of an unchanged log would.
+
+    $ uv run python benchmarks/bench_incremental.py --chunks 256
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es.models.Checkpoint import IncrementalState
+from evtx2es.presenters.Evtx2esPresenter import Evtx2esPresenter
+from fake_es import FakeElasticsearch
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        state = Path(tmp) / "state.json"
+
+        for label, incremental in (
+            ("full import", None),
+            ("first incremental", state),
+            ("re-run, nothing new", state),
+        ):
+            with FakeElasticsearch() as es:
+                start = time.perf_counter()
+                Evtx2esPresenter(
+                    input_path=path,
+                    port=es.port,
+                    is_quiet=True,
+                    incremental=IncrementalState(incremental) if incremental else None,
+                ).bulk_import()
+                elapsed = time.perf_counter() - start
+                print(f"{label:<20} {es.documents:>8} docs sent, {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
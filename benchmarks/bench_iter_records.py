@@ -0,0 +1,58 @@
+# coding: utf-8
+"""Scaling of the Python API with the file size.
+
+Compares the previous `sum(list(batches), list())` flattening of evtx2json
+(quadratic in the number of batches) with `evtx2json` and `iter_records`.
+A linear API keeps the same time per record at every size.
+
+    $ uv run python benchmarks/bench_iter_records.py --chunks 64 128 256 512
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es import evtx2json, iter_records
+from evtx2es.models.Evtx2es import Evtx2es
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def sum_flatten(path: Path, chunk_size: int) -> int:
+    batches = list(Evtx2es(path).gen_records("0", False, chunk_size))
+    return len(sum(batches, list()))
+
+
+def materialize(path: Path, chunk_size: int) -> int:
+    return len(evtx2json(str(path), chunk_size=chunk_size))
+
+
+def stream(path: Path, chunk_size: int) -> int:
+    return sum(1 for _ in iter_records(str(path), chunk_size=chunk_size))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[64, 128, 256, 512])
+    parser.add_argument("--size", type=int, default=100, help="records per batch")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for chunks in args.chunks:
+            path = build_synthetic_evtx(args.seed, Path(tmp) / f"bench_{chunks}.evtx", chunks)
+            for label, run in (
+                ("sum(batches, [])", sum_flatten),
+                ("evtx2json", materialize),
+                ("iter_records", stream),
+            ):
+                start = time.perf_counter()
+                count = run(path, args.size)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{chunks:>5} chunks {label:<17} {count:>8} records {elapsed:7.2f}s"
+                    f" {elapsed / count * 1e6:7.2f} us/record"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# coding: utf-8
+"""Peak memory and throughput of multiprocess `gen_records` by file size.
+
+Compares the former `starmap_async` strategy (every formatted record held
+until the whole file is done) with the bounded streaming pipeline.
+Each run happens in a fresh interpreter so `ru_maxrss` is per run.
+
+    $ uv run python benchmarks/bench_multiprocess_streaming.py --chunks 64 256 1024
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import chain
+from pathlib import Path
+
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def run_once(path: str, mode: str, chunk_size: int) -> dict:
+    from evtx2es.models.Evtx2es import Evtx2es, generate_chunks, process_by_chunk
+
+    evtx = Evtx2es(Path(path))
+    start = time.perf_counter()
+    count = 0
+    if mode == "starmap":
+        ctx = evtx.get_multiprocessing_context()
+        with ctx.Pool(evtx.get_cpu_count()) as pool:
+            results = pool.starmap_async(
+                process_by_chunk,
+                (
+                    (chunk, path, "0", None)
+                    for chunk in generate_chunks(chunk_size, evtx.parser.records_json())
+                ),
+            )
+            count = len(list(chain.from_iterable(results.get())))
+    else:
+        for batch in evtx.gen_records("0", True, chunk_size):
+            count += len(batch)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "records": count,
+        "seconds": elapsed,
+        "parent_maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "workers_maxrss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--run", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_once(*args.run, args.size)))
+        return
+
+    print(f"{'chunks':>8} {'MiB':>8} {'mode':>10} {'records':>10} {'rec/s':>10} {'parent RSS MiB':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for chunks in args.chunks:
+            path = build_synthetic_evtx(args.seed, Path(tmp) / f"{chunks}.evtx", chunks)
+            for mode in ("starmap", "streaming"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--size", str(args.size), "--run", str(path), mode],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                r = json.loads(out.splitlines()[-1])
+                print(
+                    f"{chunks:>8} {path.stat().st_size / 2**20:>8.0f} {mode:>10} {r['records']:>10}"
+                    f" {r['records'] / r['seconds']:>10.0f} {r['parent_maxrss_mb']:>15.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# coding: utf-8
+"""Native parser threads vs the `-m` pool vs both combined.
+
+    $ uv run python benchmarks/bench_parser_threads.py --chunks 1024
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es.models.Evtx2es import Evtx2es
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=1024)
+    parser.add_argument("--size", type=int, default=500)
+    args = parser.parse_args()
+
+    cpu_count = Evtx2es.get_cpu_count()
+    configurations = [
+        ("single thread", 1, False),
+        (f"parser threads (0 = all {cpu_count} cores)", 0, False),
+        ("-m pool, 1 parser thread", 1, True),
+        ("-m pool + parser threads (all cores)", 0, True),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        for name, parser_threads, multiprocess in configurations:
+            start = time.perf_counter()
+            count = sum(
+                len(batch)
+                for batch in Evtx2es(path, parser_threads).gen_records(
+                    "0", multiprocess, args.size
+                )
+            )
+            elapsed = time.perf_counter() - start
+            print(f"{name:<36} {count} records, {elapsed:6.2f}s, {count / elapsed:>9.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
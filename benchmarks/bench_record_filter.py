@@ -0,0 +1,84 @@
+# coding: utf-8
+"""Speed-up of a selective --event-id filter on evtx2json and evtx2es.
+
+Event IDs are picked (rarest first) until they cover about `--selectivity`
+of the records, 1% by default.
+
+    $ uv run python benchmarks/bench_record_filter.py --chunks 256 --selectivity 0.01
+"""
+import argparse
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from evtx import PyEvtxParser
+
+from evtx2es.models.Evtx2es import get_raw_system_field
+from evtx2es.models.RecordFilter import RecordFilter
+from evtx2es.presenters.Evtx2esPresenter import Evtx2esPresenter
+from evtx2es.presenters.Evtx2jsonPresenter import Evtx2jsonPresenter
+from fake_es import FakeElasticsearch
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def pick_event_ids(path: Path, selectivity: float) -> list:
+    counts = Counter(
+        get_raw_system_field(record, "EventID")
+        for record in PyEvtxParser(str(path)).records_json()
+    )
+    total = sum(counts.values())
+    picked, covered = [], 0
+    for event_id, count in sorted(counts.items(), key=lambda item: item[1]):
+        if picked and covered + count > total * selectivity:
+            break
+        picked.append(int(event_id))
+        covered += count
+    print(f"event ids {picked}: {covered}/{total} records ({covered / total:.2%})")
+    return picked
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--selectivity", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        output = Path(tmp) / "out.json"
+        record_filter = RecordFilter(event_ids=pick_event_ids(path, args.selectivity))
+
+        for label, selected in (("no filter", None), ("filtered", record_filter)):
+            start = time.perf_counter()
+            Evtx2jsonPresenter(
+                input_path=path,
+                output_path=output,
+                is_quiet=True,
+                output_format="ndjson",
+                record_filter=selected,
+            ).export_json()
+            elapsed = time.perf_counter() - start
+            print(
+                f"evtx2json {label:<10} {elapsed:6.2f}s, {output.stat().st_size:>12} bytes written"
+            )
+
+        for label, selected in (("no filter", None), ("filtered", record_filter)):
+            with FakeElasticsearch() as es:
+                start = time.perf_counter()
+                Evtx2esPresenter(
+                    input_path=path,
+                    port=es.port,
+                    is_quiet=True,
+                    record_filter=selected,
+                ).bulk_import()
+                elapsed = time.perf_counter() - start
+                print(
+                    f"evtx2es   {label:<10} {elapsed:6.2f}s, {es.documents:>8} docs,"
+                    f" {es.bytes_received:>12} bytes sent"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# coding: utf-8
+"""Per-record cost of `format_record` vs a per-file `RecordFormatter`.
+
+`format_record` rebuilds everything that only depends on the file
+(resolved path, tags, shift delta, lower-cased strings) for every record,
+as the former implementation did; `RecordFormatter` computes it once.
+A cProfile summary of each is printed to show where the time goes.
+
+    $ uv run python benchmarks/bench_record_formatter.py --chunks 256
+"""
+import argparse
+import cProfile
+import pstats
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from evtx import PyEvtxParser
+
+from evtx2es.models.Evtx2es import RecordFormatter, format_record
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks))
+        records = list(PyEvtxParser(path).records_json())
+        tags = ["host-a", "case-42"]
+
+        for shift in ("0", timedelta(days=-3, seconds=3600)):
+            formatter = RecordFormatter(path, shift, tags)
+            candidates = {
+                "format_record": lambda record: format_record(record, path, shift, tags),
+                "RecordFormatter": formatter.format,
+            }
+            for name, func in candidates.items():
+                start = time.perf_counter()
+                for record in records:
+                    func(record)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"shift={str(shift):<18} {name:<16} {elapsed / len(records) * 1e6:7.2f} us/record"
+                )
+
+                profiler = cProfile.Profile()
+                profiler.runcall(lambda: [func(record) for record in records])
+                pstats.Stats(profiler).sort_stats("tottime").print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
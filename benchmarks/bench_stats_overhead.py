@@ -0,0 +1,47 @@
+# coding: utf-8
+"""Cost of collecting `Stats` while converting, in a single process.
+
+Stages are timed per chunk, so the difference should stay within noise.
+
+    $ uv run python benchmarks/bench_stats_overhead.py --chunks 512
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es.models.Evtx2es import Evtx2es
+from evtx2es.models.Stats import Stats
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def run(path: Path, stats: Stats, chunk_size: int) -> tuple:
+    start = time.perf_counter()
+    count = 0
+    for batch in Evtx2es(path).gen_records(
+        "0", False, chunk_size, id_strategy="content", serialized=True, stats=stats
+    ):
+        count += len(batch)
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        for label, make_stats in (("off", lambda: None), ("on", Stats)):
+            count, elapsed = min(
+                (run(path, make_stats(), args.size) for _ in range(args.repeat)),
+                key=lambda result: result[1],
+            )
+            print(f"stats {label:>3}: {count} records, {count / elapsed:.0f} rec/s")
+
+
+if __name__ == "__main__":
+    main()
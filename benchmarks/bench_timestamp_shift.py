@@ -0,0 +1,60 @@
+# coding: utf-8
+"""Timestamp shifting: strptime/strftime per record vs `TimestampShifter`.
+
+Uses the SystemTime values of a real EVTX, plus a synthetic series with one
+distinct second per record (worst case for the per-second cache).
+
+    $ uv run python benchmarks/bench_timestamp_shift.py
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import orjson
+from evtx import PyEvtxParser
+
+from evtx2es.models.Evtx2es import TimestampShifter, _create_timestamp_field
+from synthetic import DEFAULT_SEED
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--count", type=int, default=200000)
+    args = parser.parse_args()
+
+    shift = datetime.now() - datetime(2016, 10, 6, 1, 47, 7)
+    real = [
+        orjson.loads(record["data"])["Event"]["System"]["TimeCreated"]["#attributes"]["SystemTime"]
+        for record in PyEvtxParser(str(args.seed)).records_json()
+    ]
+    start = datetime(2016, 2, 28, 23, 0, 0, 123456)
+    series = {
+        "real": (real * (args.count // len(real) + 1))[: args.count],
+        "distinct seconds": [
+            (start + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            for i in range(args.count)
+        ],
+    }
+
+    for name, system_times in series.items():
+        begin = time.perf_counter()
+        expected = [_create_timestamp_field(t, shift) for t in system_times]
+        reference = time.perf_counter() - begin
+
+        shifter = TimestampShifter(timedelta(seconds=shift.seconds, days=shift.days))
+        begin = time.perf_counter()
+        result = shifter.shift_many(system_times)
+        fast = time.perf_counter() - begin
+
+        assert result == expected
+        print(
+            f"{name:<17} strptime/strftime {reference / len(system_times) * 1e9:7.0f} ns/record,"
+            f" TimestampShifter {fast / len(system_times) * 1e9:7.0f} ns/record"
+            f" ({reference / fast:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# coding: utf-8
+"""Cost of handing formatted records from the workers to the main process.
+
+For each transport, reports the bytes going through the result pipe (and
+through shared memory) and the CPU time of the main process, both per
+million records, to get NDJSON lines out of multiprocess `gen_records`:
+
+    dicts     records pickled back as dicts, serialized by the main process
+    ndjson    NDJSON lines serialized by the workers, through the result pipe
+    shm       NDJSON lines serialized by the workers, through shared memory
+
+    $ uv run python benchmarks/bench_worker_ipc.py --chunks 1024 --parse-in-workers
+"""
+import argparse
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import orjson
+
+from evtx2es.models.Evtx2es import (
+    Evtx2es,
+    WorkerOptions,
+    _format_output,
+    generate_chunks,
+)
+from evtx2es.models.SharedBuffer import receive_bytes
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+MODES = {
+    "dicts": {},
+    "ndjson": {"serialized": True},
+    "shm": {"serialized": True, "shared_memory": True},
+}
+
+
+def ipc_bytes(path: Path, mode: str, chunk_size: int) -> tuple:
+    """Bytes pickled into the result pipe, and left in shared memory."""
+    options = WorkerOptions(**MODES[mode])
+    pipe = shared = 0
+    evtx = Evtx2es(path)
+    for records in generate_chunks(chunk_size, evtx.parser.records_json()):
+        output = _format_output(records, str(path), options)
+        pipe += len(pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL))
+        if mode == "shm":
+            shared += len(receive_bytes(output))
+    return pipe, shared
+
+
+def main_cpu(path: Path, mode: str, chunk_size: int, parse_in_workers: bool) -> tuple:
+    evtx = Evtx2es(path)
+    options = WorkerOptions(**MODES[mode])
+    with evtx.create_pool(options=options) as pool:
+        count = 0
+        start, cpu_start = time.perf_counter(), time.process_time()
+        for batch in evtx.gen_records(
+            "0", True, chunk_size, pool=pool, parse_in_workers=parse_in_workers, **MODES[mode]
+        ):
+            if mode == "dicts":
+                batch = [orjson.dumps(r, option=orjson.OPT_APPEND_NEWLINE) for r in batch]
+            count += len(batch)
+        return count, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=1024)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--parse-in-workers", action="store_true")
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':>7} {'records':>9} {'rec/s':>8} {'pipe MB/Mrec':>13}"
+        f" {'shm MB/Mrec':>12} {'main CPU s/Mrec':>16}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        for mode in MODES:
+            count, elapsed, cpu = main_cpu(path, mode, args.size, args.parse_in_workers)
+            pipe, shared = ipc_bytes(path, mode, args.size)
+            per_million = 1e6 / count
+            print(
+                f"{mode:>7} {count:>9} {count / elapsed:>8.0f}"
+                f" {pipe * per_million / 1e6:>13.1f} {shared * per_million / 1e6:>12.1f}"
+                f" {cpu * per_million:>16.1f}"
+            )
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
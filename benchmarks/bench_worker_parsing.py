@@ -0,0 +1,52 @@
+# coding: utf-8
+"""Multiprocess `gen_records`: parsing in the main process vs in the workers.
+
+With `parse_in_workers` the main process only reads the chunk headers; the
+workers read, parse and format their own chunks. Reports the throughput and
+the CPU time spent in the main process, by number of workers.
+
+    $ uv run python benchmarks/bench_worker_parsing.py --chunks 1024 --workers 1 2 4 8
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from evtx2es.models.Evtx2es import Evtx2es
+from synthetic import DEFAULT_SEED, build_synthetic_evtx
+
+
+def run(path: Path, workers: int, parse_in_workers: bool, chunk_size: int) -> tuple:
+    evtx = Evtx2es(path)
+    with evtx.create_pool(workers) as pool:
+        start, cpu_start = time.perf_counter(), time.process_time()
+        count = 0
+        for batch in evtx.gen_records(
+            "0", True, chunk_size, pool=pool, parse_in_workers=parse_in_workers
+        ):
+            count += len(batch)
+        return count, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=Path, default=DEFAULT_SEED)
+    parser.add_argument("--chunks", type=int, default=1024)
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'parsing in':>11} {'records':>9} {'rec/s':>9} {'main CPU s':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_synthetic_evtx(args.seed, Path(tmp) / "bench.evtx", args.chunks)
+        for workers in args.workers:
+            for parse_in_workers in (False, True):
+                count, elapsed, cpu = run(path, workers, parse_in_workers, args.size)
+                print(
+                    f"{workers:>8} {'workers' if parse_in_workers else 'main':>11} {count:>9}"
+                    f" {count / elapsed:>9.0f} {cpu:>11.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# coding: utf-8
+"""Minimal stand-in for an Elasticsearch node, for benchmarks.
+
+Answers the product check and `_bulk` requests (after an artificial
+latency), acknowledging every document.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import orjson
+
+
+class FakeElasticsearch:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.requests = 0
+        self.bytes_received = 0
+        self.documents = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send(self, body: dict) -> None:
+                payload = orjson.dumps(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:
+                self._send({"version": {"number": "9.0.0"}, "tagline": "You Know, for Search"})
+
+            def do_HEAD(self) -> None:
+                self._send({})
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                items = []
+                lines = body.splitlines()
+                for line in lines:
+                    if line.startswith(b'{"index"') or line.startswith(b'{"create"'):
+                        action = orjson.loads(line)
+                        op, meta = next(iter(action.items()))
+                        items.append({op: {"_index": meta.get("_index"), "_id": meta.get("_id"), "status": 201}})
+                with server._lock:
+                    server.requests += 1
+                    server.bytes_received += len(body)
+                    server.documents += len(items)
+                time.sleep(server.latency)
+                self._send({"took": 1, "errors": False, "items": items})
+
+            do_PUT = do_POST
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeElasticsearch":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
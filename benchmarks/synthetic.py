@@ -0,0 +1,48 @@
+# coding: utf-8
+"""Build large synthetic EVTX files for benchmarks.
+
+EVTX files are a 4 KiB file header followed by independent 64 KiB chunks,
+so a seed file can be grown to any size by repeating its chunks and patching
+the chunk count and checksum in the header.
+"""
+from itertools import cycle, islice
+from pathlib import Path
+
+from evtx2es.models.EvtxChunks import (
+    CHUNK_SIZE,
+    FILE_HEADER_SIZE,
+    patch_header,
+    scan_chunks,
+)
+
+# default seed: the sample downloaded by the test suite
+DEFAULT_SEED = Path(__file__).parent.parent / "tests" / "cache" / "Security.evtx"
+
+
+def build_synthetic_evtx(seed: Path, dest: Path, chunks: int) -> Path:
+    """Write an EVTX file made of `chunks` chunks copied from `seed`.
+
+    Args:
+        seed (Path): Existing EVTX file to copy chunks from.
+        dest (Path): Output path.
+        chunks (int): Number of chunks to write.
+
+    Returns:
+        Path: dest
+    """
+    data = Path(seed).read_bytes()
+    header = bytearray(data[:FILE_HEADER_SIZE])
+    seed_chunks = [
+        data[offset : offset + CHUNK_SIZE] for offset, _ in scan_chunks(seed)
+    ]
+    if not seed_chunks:
+        raise ValueError(f"{seed} does not contain any EVTX chunk")
+
+    patch_header(header, chunks)
+
+    with Path(dest).open("wb") as f:
+        f.write(header)
+        for chunk in islice(cycle(seed_chunks), chunks):
+            f.write(chunk)
+
+    return Path(dest)
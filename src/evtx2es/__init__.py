@@ -1,10 +1,18 @@
 # coding: utf-8
-from datetime import datetime
-from typing import List, Union
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import Iterator, List, Optional, Union
 from pathlib import Path
 
 from evtx2es.models.Evtx2es import Evtx2es
+from evtx2es.models.Checkpoint import CheckpointStore, IncrementalState
+from evtx2es.models.DeadLetter import DeadLetterQueue
+from evtx2es.models.Profiling import profile
+from evtx2es.models.ElasticsearchUtils import ElasticsearchUtils
+from evtx2es.models.RecordFilter import RecordFilter, combine_filters
 from evtx2es.presenters.Evtx2esPresenter import Evtx2esPresenter
+from evtx2es.presenters.AsyncEvtx2esPresenter import AsyncEvtx2esPresenter
+from evtx2es.presenters.ReplayPresenter import ReplayPresenter
 
 
 # for use via python-script!
@@ -23,6 +31,26 @@ def evtx2es(
     multiprocess: bool = False,
     chunk_size: int = 500,
     additional_tags: List[str] = None,
+    max_inflight: Optional[int] = None,
+    parser_threads: int = 0,
+    parse_in_workers: bool = False,
+    batch_size: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+    bulk_threads: int = 1,
+    bulk_size: int = 500,
+    bulk_bytes: int = 100 * 1024 * 1024,
+    id_strategy: str = "content",
+    checkpoint: Optional[str] = None,
+    incremental: Optional[str] = None,
+    record_filter: Optional[RecordFilter] = None,
+    http_compress: bool = False,
+    max_retries: int = 3,
+    initial_backoff: float = 2.0,
+    max_backoff: float = 60.0,
+    bulk_load: bool = False,
+    install_template: bool = False,
+    dead_letter: Optional[str] = None,
+    profile_dir: Optional[str] = None,
 ) -> None:
     """Fast import of Windows Eventlog into Elasticsearch.
     Args:
@@ -61,56 +89,379 @@ def evtx2es(
 
         additional_tags (List[str], optional):
             Additional tags to add to each record.
+
+        max_inflight (int, optional):
+            Maximum number of chunks in flight when multiprocessing.
+            Defaults to twice the CPU count.
+
+        parser_threads (int, optional):
+            Number of threads used by the EVTX parser itself. Defaults to 0 (all cores).
+
+        parse_in_workers (bool, optional):
+            With multiprocess, each worker reads and parses its own EVTX chunks;
+            the main process only locates them. Defaults to False.
+
+        batch_size (int, optional):
+            Number of records per batch handed to bulk indexing. Defaults to chunk_size.
+
+        batch_bytes (int, optional):
+            Approximate byte budget per batch, measured on the raw event data.
+
+        bulk_threads (int, optional):
+            Number of bulk requests in flight at the same time. Defaults to 1.
+
+        bulk_size (int, optional):
+            Maximum number of documents per bulk request. Defaults to 500.
+
+        bulk_bytes (int, optional):
+            Maximum size of a bulk request in bytes. Defaults to 100 MiB.
+
+        id_strategy (str, optional):
+            Document id strategy: "content" (SHA-1 of the record), "natural"
+            (computer, channel, record_id, provider, timestamp), "xxhash"
+            (requires xxhash) or "none" (generated by Elasticsearch).
+            Defaults to "content".
+
+        checkpoint (str, optional):
+            JSON state file recording the import progress of each file.
+            Fully imported files are skipped and partial ones resumed.
+
+        incremental (str, optional):
+            JSON state file remembering the last imported record of each
+            (computer, channel). Only newer records are imported.
+
+        record_filter (RecordFilter, optional):
+            Event IDs, providers, channels and time window to import;
+            other records are dropped before they are formatted.
+
+        http_compress (bool, optional):
+            Gzip the bulk request bodies. Defaults to False.
+
+        max_retries (int, optional):
+            Retries of documents rejected with 429 or 503, with exponential backoff. Defaults to 3.
+
+        initial_backoff (float, optional):
+            Seconds before the first retry, doubled on each attempt. Defaults to 2.
+
+        max_backoff (float, optional):
+            Upper bound of the wait between two retries in seconds. Defaults to 60.
+
+        bulk_load (bool, optional):
+            Create the index with an explicit mapping if needed, and disable
+            refresh and replicas during the import; the previous settings
+            are restored and the index refreshed afterwards. Defaults to False.
+
+        install_template (bool, optional):
+            Install the composable index template of the index first: typed
+            ECS fields, event_data and userdata mapped as flattened fields.
+            Only applies to an index created afterwards. Defaults to False.
+
+        dead_letter (str, optional):
+            NDJSON file receiving the documents that failed permanently (or
+            after max_retries), to be sent again with `replay`.
+
+        profile_dir (str, optional):
+            Profile this process and the workers with cProfile: one profile
+            per process, and a merged summary.txt of the top functions, are
+            written to this directory.
     """
 
-    Evtx2esPresenter(
-        input_path=Path(input_path),
-        host=host,
+    store = CheckpointStore(Path(checkpoint)) if checkpoint else None
+    dead_letter_queue = DeadLetterQueue(Path(dead_letter)) if dead_letter else None
+    profile_path = Path(profile_dir) if profile_dir else None
+    with profile(profile_path):
+        try:
+            Evtx2esPresenter(
+                input_path=Path(input_path),
+                host=host,
+                port=int(port),
+                index=index,
+                scheme=scheme,
+                pipeline=pipeline,
+                shift=shift,
+                login=login,
+                pwd=pwd,
+                is_quiet=True,
+                multiprocess=multiprocess,
+                chunk_size=int(chunk_size),
+                additional_tags=additional_tags,
+                max_inflight=max_inflight,
+                parser_threads=parser_threads,
+                parse_in_workers=parse_in_workers,
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                bulk_threads=bulk_threads,
+                bulk_size=bulk_size,
+                bulk_bytes=bulk_bytes,
+                id_strategy=id_strategy,
+                checkpoint=store,
+                incremental=IncrementalState(Path(incremental)) if incremental else None,
+                record_filter=record_filter,
+                http_compress=http_compress,
+                max_retries=max_retries,
+                initial_backoff=initial_backoff,
+                max_backoff=max_backoff,
+                bulk_load=bulk_load,
+                install_template=install_template,
+                dead_letter=dead_letter_queue,
+                profile_dir=profile_path,
+            ).bulk_import()
+        finally:
+            if dead_letter_queue is not None:
+                dead_letter_queue.close()
+            if store is not None:
+                store.save()
+
+
+def replay(
+    input_path: str,
+    host: str = "localhost",
+    port: int = 9200,
+    scheme: str = "http",
+    login: str = "",
+    pwd: str = "",
+    bulk_threads: int = 1,
+    bulk_size: int = 500,
+    bulk_bytes: int = 100 * 1024 * 1024,
+    http_compress: bool = False,
+    max_retries: int = 3,
+    initial_backoff: float = 2.0,
+    max_backoff: float = 60.0,
+    dead_letter: Optional[str] = None,
+) -> int:
+    """Send again the documents of a dead-letter file written by `evtx2es`.
+
+    Documents go to their original index and pipeline. Arguments are those
+    of `evtx2es`.
+
+    Args:
+        input_path (str):
+            Dead-letter file to replay.
+
+        dead_letter (str, optional):
+            Another NDJSON file receiving the documents failing again.
+
+    Returns:
+        int: Number of documents indexed.
+    """
+    es = ElasticsearchUtils(
+        hostname=host,
         port=int(port),
-        index=index,
         scheme=scheme,
-        pipeline=pipeline,
-        shift=shift,
         login=login,
         pwd=pwd,
-        is_quiet=True,
+        connections_per_node=bulk_threads,
+        http_compress=http_compress,
+        max_retries=max_retries,
+        initial_backoff=initial_backoff,
+        max_backoff=max_backoff,
+    )
+    with DeadLetterQueue(Path(dead_letter)) if dead_letter else nullcontext() as queue:
+        return ReplayPresenter(
+            input_path=Path(input_path),
+            es=es,
+            is_quiet=True,
+            bulk_threads=bulk_threads,
+            bulk_size=bulk_size,
+            bulk_bytes=bulk_bytes,
+            dead_letter=queue,
+        ).replay()
+
+
+async def evtx2es_async(
+    input_path: str,
+    host: str = "localhost",
+    port: int = 9200,
+    index: str = "evtx2es",
+    scheme: str = "http",
+    pipeline: str = "",
+    shift: Union[str, timedelta] = "0",
+    login: str = "",
+    pwd: str = "",
+    multiprocess: bool = False,
+    chunk_size: int = 500,
+    additional_tags: List[str] = None,
+    max_inflight: Optional[int] = None,
+    parser_threads: int = 0,
+    parse_in_workers: bool = False,
+    batch_size: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+    bulk_concurrency: int = 4,
+    bulk_size: int = 500,
+    bulk_bytes: int = 100 * 1024 * 1024,
+    id_strategy: str = "content",
+    record_filter: Optional[RecordFilter] = None,
+    http_compress: bool = False,
+    max_retries: int = 3,
+    initial_backoff: float = 2.0,
+    max_backoff: float = 60.0,
+    dead_letter: Optional[str] = None,
+) -> None:
+    """Import Windows Eventlog into Elasticsearch without blocking the event loop.
+
+    Requires the `async` extra (pip install evtx2es[async]). Parsing and
+    formatting run on an executor thread; bulk requests are sent with
+    AsyncElasticsearch. Several files can be imported concurrently:
+
+        await asyncio.gather(*(evtx2es_async(path) for path in paths))
+
+    Args:
+        input_path (str): Windows Eventlogs to import into Elasticsearch.
+        bulk_concurrency (int, optional): Number of bulk requests in flight. Defaults to 4.
+        (other arguments): Same as `evtx2es`.
+    """
+
+    with DeadLetterQueue(Path(dead_letter)) if dead_letter else nullcontext() as queue:
+        await AsyncEvtx2esPresenter(
+            input_path=Path(input_path),
+            host=host,
+            port=int(port),
+            index=index,
+            scheme=scheme,
+            pipeline=pipeline,
+            shift=shift,
+            login=login,
+            pwd=pwd,
+            is_quiet=True,
+            multiprocess=multiprocess,
+            chunk_size=int(chunk_size),
+            additional_tags=additional_tags,
+            max_inflight=max_inflight,
+            parser_threads=parser_threads,
+            parse_in_workers=parse_in_workers,
+            batch_size=batch_size,
+            batch_bytes=batch_bytes,
+            bulk_concurrency=bulk_concurrency,
+            bulk_size=bulk_size,
+            bulk_bytes=bulk_bytes,
+            id_strategy=id_strategy,
+            record_filter=record_filter,
+            http_compress=http_compress,
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+            max_backoff=max_backoff,
+            dead_letter=queue,
+        ).bulk_import()
+
+
+def iter_batches(
+    input_path: str,
+    shift: Union[str, timedelta] = "0",
+    multiprocess: bool = False,
+    chunk_size: int = 500,
+    additional_tags: List[str] = None,
+    max_inflight: Optional[int] = None,
+    parser_threads: int = 0,
+    parse_in_workers: bool = False,
+    batch_size: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+    record_filter: Optional[RecordFilter] = None,
+    profile_dir: Optional[str] = None,
+) -> Iterator[List[dict]]:
+    """Lazily convert Windows Eventlog to batches of records.
+
+    Records are parsed and formatted as the batches are consumed, so memory
+    stays constant whatever the file size. With multiprocess, the worker pool
+    is closed when the generator is exhausted or closed.
+
+    Args:
+        input_path (str): Input Eventlog file.
+        shift (Union[str, timedelta]): Timestamp shift value. Defaults to '0'.
+        multiprocess (bool): Flag to run multiprocessing.
+        chunk_size (int): Size of the chunk to be processed for each process.
+        additional_tags (List[str], optional): Additional tags to add to each record.
+        max_inflight (int, optional): Maximum number of chunks in flight when multiprocessing.
+        parser_threads (int, optional): Number of threads used by the EVTX parser. 0 uses all cores.
+        parse_in_workers (bool, optional): With multiprocess, workers parse their own EVTX chunks.
+        batch_size (int, optional): Number of records per batch. Defaults to chunk_size.
+        batch_bytes (int, optional): Approximate byte budget per batch.
+        record_filter (RecordFilter, optional): Records to keep, selected before formatting.
+        profile_dir (str, optional): With multiprocess, the workers write their cProfile
+            profile to this directory (see `evtx2json` to profile this process as well).
+
+    Yields:
+        List[dict]: Formatted records, in file order.
+    """
+    evtx = Evtx2es(Path(input_path).resolve(), parser_threads=parser_threads)
+    yield from evtx.gen_records(
+        shift=shift,
         multiprocess=multiprocess,
-        chunk_size=int(chunk_size),
+        chunk_size=chunk_size,
         additional_tags=additional_tags,
-    ).bulk_import()
+        max_inflight=max_inflight,
+        batch_size=batch_size,
+        batch_bytes=batch_bytes,
+        record_filter=combine_filters(record_filter),
+        parse_in_workers=parse_in_workers,
+        profile_dir=Path(profile_dir) if profile_dir else None,
+    )
+
+
+def iter_records(input_path: str, **kwargs) -> Iterator[dict]:
+    """Lazily convert Windows Eventlog to records, one at a time.
+
+    Args:
+        input_path (str): Input Eventlog file.
+        **kwargs: Same options as `iter_batches`.
+
+    Yields:
+        dict: Formatted record, in file order.
+    """
+    for records in iter_batches(input_path, **kwargs):
+        yield from records
 
 
 def evtx2json(
     input_path: str,
-    shift: Union[str, datetime] = "0",
+    shift: Union[str, timedelta] = "0",
     multiprocess: bool = False,
     chunk_size: int = 500,
     additional_tags: List[str] = None,
+    max_inflight: Optional[int] = None,
+    parser_threads: int = 0,
+    parse_in_workers: bool = False,
+    batch_size: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+    record_filter: Optional[RecordFilter] = None,
+    profile_dir: Optional[str] = None,
 ) -> List[dict]:
     """Convert Windows Eventlog to List[dict].
 
     Args:
         input_path (str): Input Eventlog file.
-        shift (Union[str, datetime]): Timestamp shift value. Defaults to '0'.
+        shift (Union[str, timedelta]): Timestamp shift value. Defaults to '0'.
         multiprocess (bool): Flag to run multiprocessing.
         chunk_size (int): Size of the chunk to be processed for each process.
         additional_tags (List[str], optional): Additional tags to add to each record.
+        max_inflight (int, optional): Maximum number of chunks in flight when multiprocessing.
+        parser_threads (int, optional): Number of threads used by the EVTX parser. 0 uses all cores.
+        parse_in_workers (bool, optional): With multiprocess, workers parse their own EVTX chunks.
+        batch_size (int, optional): Number of records per internal batch. Defaults to chunk_size.
+        batch_bytes (int, optional): Approximate byte budget per internal batch.
+        record_filter (RecordFilter, optional): Records to keep, selected before formatting.
+        profile_dir (str, optional): Profile this process and the workers with cProfile,
+            into this directory (one profile per process and a merged summary.txt).
 
     Note:
-        Since the content of the file is loaded into memory at once,
-        it requires the same amount of memory as the file to be loaded.
+        All the records are held in memory at once; use `iter_records` or
+        `iter_batches` to process large files with constant memory.
     """
-    evtx = Evtx2es(Path(input_path).resolve())
-    records: List[dict] = sum(
-        list(
-            evtx.gen_records(
+    with profile(Path(profile_dir) if profile_dir else None):
+        records: List[dict] = list(
+            iter_records(
+                input_path,
                 shift=shift,
                 multiprocess=multiprocess,
                 chunk_size=chunk_size,
                 additional_tags=additional_tags,
+                max_inflight=max_inflight,
+                parser_threads=parser_threads,
+                parse_in_workers=parse_in_workers,
+                batch_size=batch_size,
+                batch_bytes=batch_bytes,
+                record_filter=record_filter,
+                profile_dir=profile_dir,
             )
-        ),
-        list(),
-    )
+        )
 
     return records
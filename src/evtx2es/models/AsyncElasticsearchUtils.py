@@ -0,0 +1,117 @@
+# coding: utf-8
+from importlib.util import find_spec
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Union
+
+from elasticsearch import AsyncElasticsearch, OrjsonSerializer
+from elasticsearch.helpers import async_streaming_bulk
+
+from evtx2es.models.ElasticsearchUtils import build_client_options, gen_actions
+
+
+class AsyncElasticsearchUtils:
+    """asyncio counterpart of `ElasticsearchUtils` (requires `elasticsearch[async]`).
+
+    Takes the same arguments as `ElasticsearchUtils`.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        scheme: str,
+        login: str,
+        pwd: str,
+        connections_per_node: int = 10,
+        http_compress: bool = False,
+        max_retries: int = 3,
+        initial_backoff: float = 2.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        if find_spec("aiohttp") is None:
+            raise ImportError(
+                "the asyncio API requires aiohttp: pip install evtx2es[async]"
+            )
+
+        self.es = AsyncElasticsearch(
+            serializer=OrjsonSerializer(),
+            **build_client_options(
+                hostname, port, scheme, login, pwd, connections_per_node, http_compress
+            ),
+        )
+        self.retry_options = {
+            "max_retries": max_retries,
+            "initial_backoff": initial_backoff,
+            "max_backoff": max_backoff,
+        }
+
+    async def streaming_bulk_indice(
+        self,
+        batches: AsyncIterable[List[dict]],
+        index_name: str,
+        pipeline: str,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+        id_strategy: str = "content",
+    ) -> AsyncIterator:
+        """Bulk indices the documents, one bulk request at a time.
+
+        Run several of them concurrently to have many requests in flight.
+
+        Args:
+            batches (AsyncIterable[List[dict]]): Batches of records read from Eventlog files.
+            index_name (str): Target Elasticsearch Index.
+            pipeline (str): Target Elasticsearch Ingest Pipeline
+            chunk_size (int, optional): Maximum number of documents per bulk request.
+            max_chunk_bytes (int, optional): Maximum size of a bulk request in bytes.
+            id_strategy (str, optional): Document id strategy. Defaults to "content".
+
+        Yields:
+            AsyncIterator: (ok, info) for each document.
+        """
+
+        async def gen_async_actions():
+            async for records in batches:
+                for action in gen_actions(records, index_name, pipeline, id_strategy):
+                    yield action
+
+        async for ok, info in self.streaming_bulk_actions(
+            gen_async_actions(), chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes
+        ):
+            yield ok, info
+
+    async def streaming_bulk_actions(
+        self,
+        actions: Union[Iterable[dict], AsyncIterable[dict]],
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+    ) -> AsyncIterator:
+        """Bulk indices the actions (see `gen_actions`), one bulk request at a time.
+
+        A request answered with an error status fails its documents, whose
+        info carries the source under "data"; other errors (connection lost
+        after the retries of the client) are raised.
+
+        Args:
+            actions (Union[Iterable[dict], AsyncIterable[dict]]): Bulk actions.
+            chunk_size (int, optional): Maximum number of documents per bulk request.
+            max_chunk_bytes (int, optional): Maximum size of a bulk request in bytes.
+
+        Yields:
+            AsyncIterator: (ok, info) for each document.
+        """
+        try:
+            async for ok, info in async_streaming_bulk(
+                self.es,
+                actions,
+                chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                raise_on_error=False,
+                raise_on_exception=False,
+                **self.retry_options,
+            ):
+                yield ok, info
+        except Exception as e:
+            raise Exception(f"Bulk indexing error: {e}") from e
+
+    async def close(self) -> None:
+        await self.es.close()
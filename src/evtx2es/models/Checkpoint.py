@@ -0,0 +1,249 @@
+# coding: utf-8
+import os
+import threading
+import time
+from hashlib import sha1
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+from evtx2es.models.Evtx2es import get_raw_system_field
+
+# bytes hashed at the beginning and at the end of each file
+FINGERPRINT_BYTES = 1024 * 1024
+
+
+def _write_json(path: Path, data: dict) -> None:
+    # write then rename, so an interrupted run never leaves a truncated file
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, path)
+
+
+def fingerprint(path: Path) -> str:
+    """Identify a file by its path, size and the content of both ends.
+
+    The EVTX header and the last chunks change whenever records are written,
+    so a live log that grew is not mistaken for the copy imported before.
+
+    Args:
+        path (Path): Eventlog file.
+
+    Returns:
+        str: "path:size:sha1"
+    """
+    path = Path(path).resolve()
+    size = path.stat().st_size
+    digest = sha1()
+    with path.open(mode="rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return f"{path}:{size}:{digest.hexdigest()}"
+
+
+class FileCheckpoint:
+    """Import progress of one file.
+
+    Progress is a watermark: the number of selected records (those passing the
+    record filters), in parser order, that were all acknowledged by
+    Elasticsearch (and the highest `record_id` among them).
+    It stops advancing at the first failure, so a re-run resumes from there.
+    """
+
+    def __init__(self, store: "CheckpointStore", state: dict) -> None:
+        self.store = store
+        self.state = state
+        self.failed = False
+
+    @property
+    def records(self) -> int:
+        return self.state["records"]
+
+    @property
+    def record_id(self) -> Optional[int]:
+        return self.state["record_id"]
+
+    @property
+    def completed(self) -> bool:
+        return self.state["completed"]
+
+    def acknowledge(self, count: int, record_id: Optional[int]) -> None:
+        """Advance the watermark by `count` records acknowledged in order."""
+        if self.failed:
+            return
+        self.state["records"] += count
+        if record_id is not None and (
+            self.state["record_id"] is None or record_id > self.state["record_id"]
+        ):
+            self.state["record_id"] = record_id
+        self.store.save(force=False)
+
+    def fail(self) -> None:
+        """Freeze the watermark (a record before it was not indexed)."""
+        self.failed = True
+
+    def finish(self) -> None:
+        """Mark the file as fully imported, unless something failed."""
+        if not self.failed:
+            self.state["completed"] = True
+        self.store.save()
+
+
+class CheckpointStore:
+    """Per-file import progress, persisted in a small JSON state file.
+
+    Files can be imported concurrently (one thread each) with the same store.
+
+    Args:
+        path (Path): State file (created if missing).
+        save_interval (float, optional): Minimum number of seconds between two
+            writes of the state file while importing.
+    """
+
+    def __init__(self, path: Path, save_interval: float = 5.0) -> None:
+        self.path = Path(path)
+        self.save_interval = save_interval
+        self.last_save = 0.0
+        self.lock = threading.Lock()
+        self.files: dict = (
+            orjson.loads(self.path.read_bytes())["files"] if self.path.exists() else {}
+        )
+
+    def open(self, evtx_path: Path, selection: str = "") -> FileCheckpoint:
+        """Get (or start) the progress of an Eventlog file.
+
+        Args:
+            evtx_path (Path): Eventlog file.
+            selection (str, optional): Key of the records selected (see
+                `RecordFilter.selection_key`); the progress counts those records
+                only, so each selection of a file has its own.
+        """
+        key = fingerprint(evtx_path)
+        if selection:
+            key = f"{key}|{selection}"
+        with self.lock:
+            state = self.files.setdefault(
+                key, {"records": 0, "record_id": None, "completed": False}
+            )
+        return FileCheckpoint(self, state)
+
+    def save(self, force: bool = True) -> None:
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_save < self.save_interval:
+                return
+            self.last_save = now
+            _write_json(self.path, {"files": self.files})
+
+
+class IncrementalFilter:
+    """Raw record predicate keeping only the records newer than the last run.
+
+    A record is new when its EventRecordID or its TimeCreated is greater than
+    the last ingested one of its (computer, channel); the time also catches
+    logs that were cleared, whose record ids start over.
+    """
+
+    def __init__(self, streams: dict, selection: str = "") -> None:
+        self.streams = streams
+        self.selection = selection
+        # newest (record_id, time_created) passed, per (computer, channel)
+        self.latest: Dict[Tuple[str, str], Tuple[int, str]] = {}
+
+    def __call__(self, record: dict) -> bool:
+        record_id = get_raw_system_field(record, "EventRecordID")
+        time_created = get_raw_system_field(record, "SystemTime")
+        if record_id is None or time_created is None:
+            return True
+        record_id = int(record_id)
+        key = (
+            get_raw_system_field(record, "Computer") or "",
+            get_raw_system_field(record, "Channel") or "",
+        )
+
+        last = self.streams.get(key[0], {}).get(key[1])
+        if last and record_id <= last["record_id"] and time_created <= last["time_created"]:
+            return False
+
+        newest = self.latest.get(key)
+        if newest is None:
+            self.latest[key] = (record_id, time_created)
+        else:
+            self.latest[key] = (max(newest[0], record_id), max(newest[1], time_created))
+        return True
+
+    def merge(self, other: "IncrementalFilter") -> None:
+        """Fold in the records passed by a copy (e.g. evaluated in a worker process)."""
+        for key, (record_id, time_created) in other.latest.items():
+            newest = self.latest.get(key)
+            if newest is not None:
+                record_id = max(newest[0], record_id)
+                time_created = max(newest[1], time_created)
+            self.latest[key] = (record_id, time_created)
+
+
+class IncrementalState:
+    """Last ingested record of each (computer, channel), persisted in a JSON file.
+
+    Each record selection has its own watermarks: a run importing only some
+    event IDs does not move past the records it left out, which a later run
+    with another selection (or none) still imports.
+
+    Files can be imported concurrently (one thread each) with the same state.
+
+    Args:
+        path (Path): State file (created if missing).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        state = orjson.loads(self.path.read_bytes()) if self.path.exists() else {}
+        # watermarks of the unfiltered runs, then those of each selection
+        self.streams: dict = state.get("streams", {})
+        self.selections: dict = state.get("selections", {})
+        self.lock = threading.Lock()
+
+    def __streams(self, selection: str) -> dict:
+        if not selection:
+            return self.streams
+        return self.selections.setdefault(selection, {})
+
+    def filter(self, selection: str = "") -> IncrementalFilter:
+        """Predicate for `Evtx2es.gen_records(record_filter=...)`.
+
+        It must come after the selection filter (see `combine_filters`), so
+        that it only sees the selected records.
+
+        Args:
+            selection (str, optional): Key of the records selected (see
+                `RecordFilter.selection_key`).
+        """
+        # a copy: the state may be committed (and the filter sent to the
+        # workers) while other files are imported
+        with self.lock:
+            streams = {
+                computer: dict(channels)
+                for computer, channels in self.__streams(selection).items()
+            }
+        return IncrementalFilter(streams, selection)
+
+    def commit(self, record_filter: IncrementalFilter) -> None:
+        """Remember the newest records passed by a filter (once they are ingested)."""
+        with self.lock:
+            streams = self.__streams(record_filter.selection)
+            for (computer, channel), (record_id, time_created) in record_filter.latest.items():
+                last = streams.setdefault(computer, {}).get(channel)
+                if last:
+                    record_id = max(record_id, last["record_id"])
+                    time_created = max(time_created, last["time_created"])
+                streams[computer][channel] = {
+                    "record_id": record_id,
+                    "time_created": time_created,
+                }
+            state = {"streams": self.streams}
+            if self.selections:
+                state["selections"] = self.selections
+            _write_json(self.path, state)
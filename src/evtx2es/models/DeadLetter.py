@@ -0,0 +1,98 @@
+# coding: utf-8
+import threading
+from pathlib import Path
+from typing import Generator
+
+import orjson
+
+
+class DeadLetterQueue:
+    """NDJSON file receiving the documents Elasticsearch refused for good.
+
+    Each line holds the bulk action (`_index`, `_id`, `pipeline`, `_source`)
+    with the `status` and `error` returned for it, so that the documents can
+    be sent again with `read_dead_letters` once the cause is fixed. Entries are
+    appended and written out as they come: memory use does not depend on the
+    number of failures.
+
+    Args:
+        path (Path): Dead-letter file, created if missing.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.count = 0
+        self.file = None
+        # shared by the files imported concurrently
+        self.lock = threading.Lock()
+
+    def add(self, info: dict) -> None:
+        """Append a failed document.
+
+        Args:
+            info (dict): Bulk result of the document ({op_type: item}), with
+                the source document under "data".
+        """
+        op_type, item = next(iter(info.items()))
+        entry = {
+            "_op_type": op_type,
+            "_index": item.get("_index"),
+            "_id": item.get("_id"),
+            "status": item.get("status"),
+            "error": item.get("error"),
+        }
+        if item.get("pipeline"):
+            entry["pipeline"] = item["pipeline"]
+        entry["_source"] = item.get("data")
+
+        line = orjson.dumps(entry, default=str) + b"\n"
+        with self.lock:
+            if self.file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.file = self.path.open("ab")
+            self.file.write(line)
+            self.count += 1
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self) -> "DeadLetterQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_dead_letters(path: Path) -> Generator:
+    """Bulk actions of the documents recorded in a dead-letter file.
+
+    Args:
+        path (Path): File written by `DeadLetterQueue`.
+
+    Yields:
+        Generator: dict, ready for the bulk helpers.
+    """
+    with path.open("rb") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number}: invalid dead-letter entry") from e
+            if entry.get("_source") is None:
+                continue
+
+            action = {
+                "_op_type": entry.get("_op_type", "index"),
+                "_index": entry["_index"],
+                "_source": entry["_source"],
+            }
+            if entry.get("_id") is not None:
+                action["_id"] = entry["_id"]
+            if entry.get("pipeline"):
+                action["pipeline"] = entry["pipeline"]
+            yield action
@@ -0,0 +1,91 @@
+# coding: utf-8
+from hashlib import sha1
+from typing import Callable, Optional
+
+import orjson
+
+try:
+    from xxhash import xxh3_128_hexdigest
+except ImportError:  # optional dependency
+    xxh3_128_hexdigest = None
+
+
+def calc_content_hash(record: dict) -> str:
+    """SHA-1 of the whole formatted record (keys sorted).
+
+    Compatible with the ids of previous evtx2es versions.
+
+    Args:
+        record (dict): Formatted eventlog record.
+
+    Returns:
+        str: Hash value
+    """
+    return sha1(orjson.dumps(record, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def calc_natural_key(record: dict) -> str:
+    """Deterministic key made of the fields that identify an event.
+
+    (computer, channel, record_id, provider, original timestamp); nothing is
+    serialized or hashed, and the id stays the same whatever --datasetdate is.
+
+    Args:
+        record (dict): Formatted eventlog record.
+
+    Returns:
+        str: Natural key
+    """
+    winlog = record["winlog"]
+    return "|".join(
+        (
+            str(winlog["computer_name"]),
+            str(winlog["channel"]),
+            str(winlog["record_id"]),
+            str(winlog["provider"]["name"]),
+            str(record["event"]["created"]),
+        )
+    )
+
+
+def calc_xxhash(record: dict) -> str:
+    """XXH3-128 of the formatted record (requires the optional `xxhash` package).
+
+    Formatted records always have the same key order, so keys are not sorted.
+
+    Args:
+        record (dict): Formatted eventlog record.
+
+    Returns:
+        str: Hash value
+    """
+    return xxh3_128_hexdigest(orjson.dumps(record))
+
+
+ID_STRATEGIES = {
+    "content": calc_content_hash,
+    "natural": calc_natural_key,
+    "xxhash": calc_xxhash,
+    # let Elasticsearch generate ids (fastest, but re-imports are not deduplicated)
+    "none": None,
+}
+
+
+def get_id_function(id_strategy: str) -> Optional[Callable[[dict], str]]:
+    """Resolve the document id function of a strategy.
+
+    Args:
+        id_strategy (str): One of `ID_STRATEGIES`.
+
+    Returns:
+        Optional[Callable[[dict], str]]: None when Elasticsearch should generate ids.
+    """
+    if id_strategy not in ID_STRATEGIES:
+        raise ValueError(
+            f"Unknown id strategy: {id_strategy} (choose from {', '.join(ID_STRATEGIES)})"
+        )
+    if id_strategy == "xxhash" and xxh3_128_hexdigest is None:
+        raise ImportError(
+            "the xxhash id strategy requires the 'xxhash' package: pip install evtx2es[xxhash]"
+        )
+    return ID_STRATEGIES[id_strategy]
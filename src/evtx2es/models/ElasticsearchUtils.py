@@ -1,25 +1,216 @@
 # coding: utf-8
-from typing import List
-from hashlib import sha1
-
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+import time
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing.pool import ThreadPool
+from typing import Any, Callable, List, Iterable, Generator, Optional, Union
+from itertools import islice
+from urllib.parse import urlsplit
 
 import orjson
+from elasticsearch import ApiError, Elasticsearch
+from elasticsearch.helpers import expand_action
+
+from evtx2es.models.DocumentId import calc_content_hash, get_id_function
+from evtx2es.models.Evtx2es import imap_bounded
+from evtx2es.models.Mappings import BULK_LOAD_SETTINGS, ECS_MAPPINGS, index_template
+from evtx2es.models.Stats import Stats
+
+# Rejections of an overloaded cluster (es_rejected_execution_exception, or
+# unavailable shards); any other failure of a document is permanent.
+RETRYABLE_STATUSES = frozenset({429, 503})
+
+# Bulk responses are trimmed to what tells the failed items apart
+BULK_FILTER_PATH = "errors,items.*.status,items.*.error"
+
+
+def parse_hosts(hostname: str, port: int, scheme: str) -> List[str]:
+    """Expand a comma-separated host list into node URLs.
+
+    Each host may carry its own scheme and port (e.g. "es1,https://es2:9201");
+    `scheme` and `port` are used for the parts left out.
+
+    Args:
+        hostname (str): One or more comma-separated hosts.
+        port (int): Default port number.
+        scheme (str): Default scheme.
+
+    Returns:
+        List[str]: Node URLs, requests are sent to them in round-robin.
+    """
+    hosts = []
+    for host in hostname.split(","):
+        host = host.strip()
+        if not host:
+            continue
+        if "://" not in host:
+            host = f"{scheme}://{host}"
+        url = urlsplit(host)
+        netloc = url.netloc if url.port is not None else f"{url.netloc}:{port}"
+        hosts.append(f"{url.scheme}://{netloc}{url.path}")
+    return hosts
+
+
+def build_client_options(
+    hostname: str,
+    port: int,
+    scheme: str,
+    login: str,
+    pwd: str,
+    connections_per_node: int = 10,
+    http_compress: bool = False,
+) -> dict:
+    """Keyword arguments of the (Async)Elasticsearch client."""
+    kwargs = {
+        "hosts": parse_hosts(hostname, port, scheme),
+        "verify_certs": False,
+        # one connection per concurrent bulk request, on each node
+        "connections_per_node": max(1, connections_per_node),
+        "http_compress": http_compress,
+    }
+    if login != "":
+        kwargs["http_auth"] = (login, pwd)
+    return kwargs
+
+
+def chunk_records(records: Iterable[dict], chunk_size: int) -> Generator:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def chunk_serialized(
+    items: Iterable[bytes], chunk_size: int, max_chunk_bytes: int
+) -> Generator:
+    """Group serialized `_bulk` items into request bodies.
+
+    Args:
+        items (Iterable[bytes]): Action and source lines of each document.
+        chunk_size (int): Maximum number of documents per request.
+        max_chunk_bytes (int): Maximum size of a request in bytes.
+
+    Yields:
+        Generator: List[bytes], never empty.
+    """
+    chunk: List[bytes] = []
+    size = 0
+    for item in items:
+        if chunk and (len(chunk) >= chunk_size or size + len(item) > max_chunk_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(item)
+        size += len(item)
+    if chunk:
+        yield chunk
+
+
+def serialize_action(action: dict) -> bytes:
+    """`_bulk` item (action and source lines) of a dict action, as `streaming_bulk` sends it."""
+    meta, source = expand_action(action)
+    if source is None:
+        return orjson.dumps(meta) + b"\n"
+    return orjson.dumps(meta) + b"\n" + orjson.dumps(source) + b"\n"
+
+
+def describe_serialized_failure(serialized: bytes, item: dict) -> None:
+    """Add the action and the source of a failed serialized item to its result.
+
+    Only done for the failures: the dead-letter file needs the same info as
+    for a dict action (see `ElasticsearchUtils.__send_chunk`).
+    """
+    action_line, source_line = serialized.split(b"\n", 1)
+    meta = next(iter(orjson.loads(action_line).values()))
+    item.setdefault("_index", meta.get("_index"))
+    item.setdefault("_id", meta.get("_id"))
+    item["data"] = orjson.loads(source_line)
+    if meta.get("pipeline"):
+        item["pipeline"] = meta["pipeline"]
+
+
+def gen_actions(
+    records: Iterable[dict],
+    index_name: str,
+    pipeline: str,
+    id_strategy: str = "content",
+) -> Generator:
+    """Wrap each record into a bulk index action.
+
+    Ids already computed while formatting (under "_id") are used as is;
+    otherwise they are computed here with `id_strategy`.
+
+    Args:
+        records (Iterable[dict]): Records read from Eventlog files.
+        index_name (str): Target Elasticsearch Index.
+        pipeline (str): Target Elasticsearch Ingest Pipeline
+        id_strategy (str, optional): Document id strategy. Defaults to "content".
+
+    Yields:
+        Generator: dict
+    """
+    calc_id = get_id_function(id_strategy)
+    for record in records:
+        doc_id = record.pop("_id", None)
+        if doc_id is None and calc_id is not None:
+            doc_id = calc_id(record)
+
+        event = {
+            "_index": index_name,
+            "_source": record,
+        }
+        if doc_id is not None:
+            event["_id"] = doc_id
+        if pipeline != "":
+            event["pipeline"] = pipeline
+        yield event
 
 
 class ElasticsearchUtils:
+    """Elasticsearch client shared by every imported file.
+
+    Args:
+        hostname (str): One or more comma-separated hosts (see `parse_hosts`).
+        port (int): Default port number.
+        scheme (str): Default scheme.
+        login (str): Login, empty for none.
+        pwd (str): Password associated with the login.
+        connections_per_node (int, optional): HTTP connection pool size per node,
+            to match the number of bulk requests in flight.
+        http_compress (bool, optional): Gzip the request bodies.
+        max_retries (int, optional): Retries of documents (or whole requests)
+            rejected with a retryable status (see `RETRYABLE_STATUSES`).
+        initial_backoff (float, optional): Seconds before the first retry,
+            doubled on each attempt.
+        max_backoff (float, optional): Upper bound of the wait between retries.
+        stats (Stats, optional): Receives the "bulk" time (per request) and the
+            bulk counters (requests, bytes sent, retries, indexed and failed
+            documents).
+    """
+
     def __init__(
-        self, hostname: str, port: int, scheme: str, login: str, pwd: str
+        self,
+        hostname: str,
+        port: int,
+        scheme: str,
+        login: str,
+        pwd: str,
+        connections_per_node: int = 10,
+        http_compress: bool = False,
+        max_retries: int = 3,
+        initial_backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        stats: Optional[Stats] = None,
     ) -> None:
-        kwargs = {
-            "hosts": [f"{scheme}://{hostname}:{port}"],
-            "verify_certs": False
+        self.stats = stats
+        self.es = Elasticsearch(
+            **build_client_options(
+                hostname, port, scheme, login, pwd, connections_per_node, http_compress
+            )
+        )
+        self.retry_options = {
+            "max_retries": max_retries,
+            "initial_backoff": initial_backoff,
+            "max_backoff": max_backoff,
         }
-        if login != "":
-            kwargs["http_auth"] = (login, pwd)
-            
-        self.es = Elasticsearch(**kwargs)
 
     def calc_hash(self, record: dict) -> str:
         """Calculate hash value from record.
@@ -30,35 +221,338 @@ class ElasticsearchUtils:
         Returns:
             str: Hash value
         """
-        return sha1(orjson.dumps(record, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        return calc_content_hash(record)
+
+    def gen_actions(
+        self,
+        records: Iterable[dict],
+        index_name: str,
+        pipeline: str,
+        id_strategy: str = "content",
+    ) -> Generator:
+        """Wrap each record into a bulk index action (see `gen_actions`)."""
+        return gen_actions(records, index_name, pipeline, id_strategy)
+
+    def install_template(self, index_name: str, name: str = "") -> None:
+        """Install (or update) the composable index template of `index_name`.
+
+        It types the ECS fields and maps event_data and userdata as flattened
+        fields (see `Mappings.TEMPLATE_MAPPINGS`); it only applies to indices
+        created afterwards.
+
+        Args:
+            index_name (str): Target Elasticsearch Index.
+            name (str, optional): Template name. Defaults to `index_name`.
+        """
+        self.es.indices.put_index_template(
+            name=name or index_name, **index_template(index_name)
+        )
 
-    def bulk_indice(self, records: List[dict], index_name: str, pipeline: str) -> tuple:
+    @contextmanager
+    def bulk_load(self, index_name: str, mappings: dict = ECS_MAPPINGS) -> Generator:
+        """Index settings for a large import, restored afterwards (even on failure).
+
+        A missing index is created with `mappings`. Refresh and replicas are
+        disabled while loading; then the previous settings (the defaults for
+        a new index) are restored and the index is refreshed.
+
+        Args:
+            index_name (str): Target Elasticsearch Index.
+            mappings (dict, optional): Mappings of a new index.
+        """
+        indices = self.es.indices
+        if indices.exists(index=index_name):
+            current = indices.get_settings(
+                index=index_name,
+                name=["index.refresh_interval", "index.number_of_replicas"],
+                flat_settings=True,
+            )
+            settings = next(iter(current.values()))["settings"]
+            previous = {
+                "refresh_interval": settings.get("index.refresh_interval"),
+                "number_of_replicas": settings.get("index.number_of_replicas"),
+            }
+            indices.put_settings(index=index_name, settings=BULK_LOAD_SETTINGS)
+        else:
+            indices.create(
+                index=index_name, mappings=mappings, settings=BULK_LOAD_SETTINGS
+            )
+            # null resets to the default values
+            previous = {"refresh_interval": None, "number_of_replicas": None}
+
+        try:
+            yield
+        finally:
+            indices.put_settings(index=index_name, settings={"index": previous})
+            indices.refresh(index=index_name)
+
+    def bulk_indice(
+        self,
+        records: List[dict],
+        index_name: str,
+        pipeline: str,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+        id_strategy: str = "content",
+    ) -> tuple:
         """Bulk indices the documents into Elasticsearch.
 
         Args:
             records (List[dict]): List of each records read from Eventlog files.
             index_name (str): Target Elasticsearch Index.
             pipeline (str): Target Elasticsearch Ingest Pipeline
+            chunk_size (int, optional): Maximum number of documents per bulk request.
+            max_chunk_bytes (int, optional): Maximum size of a bulk request in bytes.
+            id_strategy (str, optional): Document id strategy. Defaults to "content".
 
         Returns:
             tuple: (success_count, failed_list) - Results of bulk indexing operation
         """
-        events = []
-        for record in records:
-            event = {
-                "_id": self.calc_hash(record),
-                "_index": index_name,
-                "_source": record,
-            }
-            if pipeline != "":
-                event["pipeline"] = pipeline
-            events.append(event)
+        events = list(self.gen_actions(records, index_name, pipeline, id_strategy))
 
         # Perform bulk indexing and return results
         try:
-            success, failed = bulk(
-                self.es, events, raise_on_error=False, stats_only=False
-            )
-            return (success, failed)
+            results = self.__send_chunk(events, chunk_size, max_chunk_bytes)
+            failed = [info for ok, info in results if not ok]
+            return (len(results) - len(failed), failed)
         except Exception as e:
             raise Exception(f"Bulk indexing error: {e}") from e
+
+    def bulk_serialized(
+        self,
+        items: List[bytes],
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+    ) -> tuple:
+        """Bulk indices documents already serialized as `_bulk` lines.
+
+        The items (e.g. from `Evtx2es.gen_records` with `bulk_index`) are
+        posted as they are: nothing is serialized again in this process, and
+        the response is only walked when it reports errors.
+
+        Args:
+            items (List[bytes]): Action and source lines of each document.
+            chunk_size (int, optional): Maximum number of documents per bulk request.
+            max_chunk_bytes (int, optional): Maximum size of a bulk request in bytes.
+
+        Returns:
+            tuple: (success_count, failed_list) - Results of bulk indexing operation
+        """
+        try:
+            results = self.__send_serialized_chunk(items, chunk_size, max_chunk_bytes)
+            failed = [info for ok, info in results if not ok]
+            return (len(results) - len(failed), failed)
+        except Exception as e:
+            raise Exception(f"Bulk indexing error: {e}") from e
+
+    def parallel_bulk_indice(
+        self,
+        records: Iterable[dict],
+        index_name: str,
+        pipeline: str,
+        thread_count: int = 4,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+        id_strategy: str = "content",
+    ) -> Generator:
+        """Bulk indices the documents with several bulk requests in flight.
+
+        Records are pulled lazily (see `bulk_actions`), and results keep the
+        order of `records`.
+
+        Args:
+            records (Iterable[dict]): Records read from Eventlog files.
+            index_name (str): Target Elasticsearch Index.
+            pipeline (str): Target Elasticsearch Ingest Pipeline
+            thread_count (int, optional): Number of bulk requests in flight.
+            chunk_size (int, optional): Maximum number of documents per bulk request.
+            max_chunk_bytes (int, optional): Maximum size of a bulk request in bytes.
+            id_strategy (str, optional): Document id strategy. Defaults to "content".
+
+        Yields:
+            Generator: (ok, info) for each document.
+        """
+        return self.bulk_actions(
+            gen_actions(records, index_name, pipeline, id_strategy),
+            thread_count,
+            chunk_size,
+            max_chunk_bytes,
+        )
+
+    def bulk_actions(
+        self,
+        actions: Iterable[Union[dict, bytes]],
+        thread_count: int = 4,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+        serialized: bool = False,
+    ) -> Generator:
+        """Send bulk actions with several bulk requests in flight.
+
+        At most twice `thread_count` requests are prepared or in flight, and
+        consumption of `actions` blocks beyond that, which applies backpressure
+        to the generator. Each request is retried with backoff like
+        `bulk_indice`, and results keep the order of `actions`.
+
+        Args:
+            actions (Iterable[Union[dict, bytes]]): Bulk actions.
+            thread_count (int, optional): Number of bulk requests in flight.
+            chunk_size (int, optional): Maximum number of documents per bulk request.
+            max_chunk_bytes (int, optional): Maximum size of a bulk request in bytes.
+            serialized (bool, optional): The actions are serialized `_bulk` items,
+                posted as they are (see `bulk_serialized`).
+
+        Yields:
+            Generator: (ok, info) for each action.
+        """
+        send_chunk = partial(
+            self.__send_serialized_chunk if serialized else self.__send_chunk,
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+        )
+        try:
+            with ThreadPool(thread_count) as pool:
+                for results in imap_bounded(
+                    pool,
+                    send_chunk,
+                    ((chunk,) for chunk in chunk_records(actions, chunk_size)),
+                    thread_count * 2,
+                ):
+                    yield from results
+        except Exception as e:
+            raise Exception(f"Bulk indexing error: {e}") from e
+
+    def __send_chunk(
+        self, actions: List[dict], chunk_size: int, max_chunk_bytes: int
+    ) -> List[tuple]:
+        """Send actions like `streaming_bulk`, retrying the retryable failures.
+
+        The info of a failed document carries its source under "data" (and
+        its pipeline), for the dead-letter file.
+        """
+
+        def send(pending: List[dict]) -> List[tuple]:
+            # whole results, ids included, like those of `streaming_bulk`
+            return self.__post_items(
+                [serialize_action(action) for action in pending],
+                chunk_size,
+                max_chunk_bytes,
+                filter_path=None,
+            )
+
+        def describe(action: dict, item: dict) -> None:
+            item["data"] = action.get("_source")
+            if action.get("pipeline"):
+                item["pipeline"] = action["pipeline"]
+
+        return self.__send_with_retries(actions, send, describe)
+
+    def __send_serialized_chunk(
+        self, items: List[bytes], chunk_size: int, max_chunk_bytes: int
+    ) -> List[tuple]:
+        """Post serialized `_bulk` items as they are, retrying the retryable failures."""
+
+        def send(pending: List[bytes]) -> List[tuple]:
+            return self.__post_items(
+                pending, chunk_size, max_chunk_bytes, filter_path=BULK_FILTER_PATH
+            )
+
+        return self.__send_with_retries(items, send, describe_serialized_failure)
+
+    def __post_items(
+        self,
+        items: List[bytes],
+        chunk_size: int,
+        max_chunk_bytes: int,
+        filter_path: Optional[str],
+    ) -> List[tuple]:
+        """Post serialized `_bulk` items in requests of at most `chunk_size` items
+        and `max_chunk_bytes` bytes.
+
+        The documents of a request rejected as a whole with a retryable status
+        come back as `(None, error)` (see `__send_with_retries`).
+        """
+        outcomes = []
+        for chunk in chunk_serialized(items, chunk_size, max_chunk_bytes):
+            body = b"".join(chunk)
+            start = time.perf_counter()
+            try:
+                response = self.es.bulk(operations=body, filter_path=filter_path)
+            except ApiError as e:
+                if e.status_code not in RETRYABLE_STATUSES:
+                    raise
+                # only the documents of this request are sent again
+                outcomes.extend((None, e) for _ in chunk)
+                continue
+            finally:
+                if self.stats is not None:
+                    self.stats.add_time("bulk", time.perf_counter() - start)
+                    self.stats.add("bulk_requests")
+                    self.stats.add("bytes_sent", len(body))
+            results = response.get("items", [])
+            if len(results) != len(chunk):
+                raise Exception(f"{len(results)} results for {len(chunk)} bulk items")
+            if not response.get("errors"):
+                outcomes.extend((True, info) for info in results)
+                continue
+            for info in results:
+                status = next(iter(info.values())).get("status", 500)
+                outcomes.append((200 <= status < 300, info))
+        return outcomes
+
+    def __send_with_retries(
+        self,
+        actions: list,
+        send: Callable[[list], List[tuple]],
+        describe: Callable[[Any, dict], None],
+    ) -> List[tuple]:
+        """Send actions, retrying the retryable failures after an exponential backoff.
+
+        Unlike the retries of `streaming_bulk`, results keep the order of
+        `actions`. Each permanent failure goes through `describe(action, item)`.
+
+        `send` may split the actions into several requests: the documents of a
+        request rejected as a whole with a retryable status come back as
+        `(None, error)`, and only they are sent again (the error is raised
+        once the retries are exhausted).
+        """
+        max_retries = self.retry_options["max_retries"]
+        backoff = self.retry_options["initial_backoff"]
+        results: List[tuple] = [None] * len(actions)
+        pending = list(range(len(actions)))
+
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(min(backoff, self.retry_options["max_backoff"]))
+                backoff *= 2
+            is_last = attempt == max_retries
+
+            outcomes = send([actions[i] for i in pending])
+
+            retry = []
+            for i, (ok, info) in zip(pending, outcomes):
+                if ok is None:
+                    # its whole request was rejected
+                    if is_last:
+                        raise info
+                    retry.append(i)
+                    continue
+                item = next(iter(info.values()))
+                if ok:
+                    results[i] = (ok, info)
+                elif item.get("status") in RETRYABLE_STATUSES and not is_last:
+                    retry.append(i)
+                else:
+                    describe(actions[i], item)
+                    results[i] = (ok, info)
+            if retry and self.stats is not None:
+                self.stats.add("bulk_retries", len(retry))
+            pending = retry
+            if not pending:
+                break
+
+        if self.stats is not None:
+            failed = sum(1 for ok, _ in results if not ok)
+            self.stats.add("documents_indexed", len(results) - failed)
+            self.stats.add("documents_failed", failed)
+        return results
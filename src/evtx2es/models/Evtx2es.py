@@ -1,16 +1,33 @@
 # coding: utf-8
+from collections import deque
+from contextlib import closing, contextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
-from itertools import chain
 from pathlib import Path
-from typing import List, Generator, Iterable, Union, Any
+from typing import List, Generator, Iterable, Iterator, NamedTuple, Union, Any, Callable, Optional
 from itertools import islice
 import multiprocessing as mp
+import operator
 import sys
 import os
+import io
+import re
+import time
 
 import orjson
 from evtx import PyEvtxParser
 
+from evtx2es.models.DocumentId import get_id_function
+from evtx2es.models.EvtxChunks import group_chunks, read_chunks, scan_chunks
+from evtx2es.models.Profiling import profile_worker
+from evtx2es.models.SharedBuffer import (
+    SegmentTracker,
+    SharedBuffer,
+    receive_bytes,
+    send_bytes,
+)
+from evtx2es.models.Stats import Stats
+
 
 class SafeMultiprocessingMixin:
     """Safe multiprocessing management class for Python 3.13 compatibility"""
@@ -38,7 +55,9 @@ class SafeMultiprocessingMixin:
             return os.cpu_count() or 1
 
 
-def generate_chunks(chunk_size: int, iterable: Iterable) -> Generator:
+def generate_chunks(
+    chunk_size: int, iterable: Iterable, stats: Optional[Stats] = None
+) -> Generator:
     """Generate arbitrarily sized chunks from iterable objects, maximizing data recovery.
 
     When dealing with EVTX files recovered via carving from unallocated space, 
@@ -51,12 +70,16 @@ def generate_chunks(chunk_size: int, iterable: Iterable) -> Generator:
     Args:
         chunk_size (int): Chunk sizes.
         iterable (Iterable): Original Iterable object.
+        stats (Stats, optional): Receives the "parse" time (per chunk, the time
+            spent waiting on `iterable`), and the records_parsed and
+            records_skipped (errors recovered from) counters.
 
     Yields:
         Generator: List
     """
     iterator = iter(iterable)
     piece = []
+    start = time.perf_counter() if stats is not None else 0.0
 
     while True:
         try:
@@ -66,10 +89,18 @@ def generate_chunks(chunk_size: int, iterable: Iterable) -> Generator:
 
             # Yield the chunk when it reaches the specified size
             if len(piece) == chunk_size:
+                if stats is not None:
+                    stats.add_time("parse", time.perf_counter() - start)
+                    stats.add("records_parsed", len(piece))
                 yield piece
                 piece = []
+                if stats is not None:
+                    start = time.perf_counter()
 
         except StopIteration:
+            if stats is not None:
+                stats.add_time("parse", time.perf_counter() - start)
+                stats.add("records_parsed", len(piece))
             # End of the iterable reached; yield any remaining records in the buffer
             if piece:
                 yield piece
@@ -78,6 +109,8 @@ def generate_chunks(chunk_size: int, iterable: Iterable) -> Generator:
         except RuntimeError as e:
             # Catch specific EVTX parser errors (e.g., corrupted chunk headers).
             # Bypassing these allows us to recover subsequent valid records.
+            if stats is not None:
+                stats.add("records_skipped")
             continue
 
         except Exception as e:
@@ -85,9 +118,132 @@ def generate_chunks(chunk_size: int, iterable: Iterable) -> Generator:
             # In forensic carving, encountering unpredictable garbage data is common.
             # We catch these to ensure the parser survives and extracts all possible data
             # instead of halting the entire pipeline.
+            if stats is not None:
+                stats.add("records_skipped")
             continue
 
 
+def generate_batches(
+    chunks: Iterable, batch_size: int, batch_bytes: Optional[int] = None
+) -> Generator:
+    """Regroup formatted chunks into output batches.
+
+    A batch is flushed once it holds `batch_size` records or, when `batch_bytes`
+    is given, once the chunks it holds reach that many raw bytes. Every record
+    that goes in comes out, in order.
+
+    Args:
+        chunks (Iterable): Iterable of (records, raw_bytes) tuples.
+        batch_size (int): Maximum number of records per batch.
+        batch_bytes (int, optional): Byte budget per batch (checked per chunk).
+
+    Yields:
+        Generator: List[dict]
+    """
+    buffer: List[dict] = []
+    buffered_bytes = 0
+
+    for records, nbytes in chunks:
+        buffer.extend(records)
+        buffered_bytes += nbytes
+
+        while len(buffer) >= batch_size:
+            # keep the byte estimate proportional to what stays buffered
+            buffered_bytes = buffered_bytes * (len(buffer) - batch_size) // len(buffer)
+            yield buffer[:batch_size]
+            del buffer[:batch_size]
+
+        if batch_bytes and buffer and buffered_bytes >= batch_bytes:
+            yield buffer
+            buffer = []
+            buffered_bytes = 0
+
+    if buffer:
+        yield buffer
+
+
+def imap_bounded(
+    pool: Any,
+    func: Callable,
+    iterable: Iterable,
+    max_inflight: int,
+    wait_on_close: bool = False,
+) -> Generator:
+    """Ordered, bounded alternative to `Pool.starmap`/`Pool.imap`.
+
+    `Pool.imap` drains its input eagerly and `starmap_async` holds every result
+    until the last one is ready, so both keep the whole file in memory.
+    Here at most `max_inflight` tasks are submitted at a time and results are
+    yielded in submission order as soon as they are ready, so memory stays flat
+    and the consumer (e.g. bulk indexing) overlaps with the workers.
+
+    Args:
+        pool (Any): multiprocessing Pool.
+        func (Callable): Function to apply.
+        iterable (Iterable): Iterable of argument tuples for `func`.
+        max_inflight (int): Maximum number of submitted but unconsumed tasks.
+        wait_on_close (bool, optional): When the generator is closed early, wait
+            for the tasks submitted but not consumed to finish. Defaults to False.
+
+    Yields:
+        Generator: Result of each task, in order.
+    """
+    pending: deque = deque()
+    try:
+        for args in iterable:
+            pending.append(pool.apply_async(func, args))
+            if len(pending) >= max_inflight:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        if wait_on_close:
+            for result in pending:
+                result.wait()
+
+
+# Path of each System field read by `get_raw_system_field`
+_RAW_SYSTEM_FIELDS = {
+    "Provider": ("Provider", "#attributes", "Name"),
+    # plain number, or {"#attributes": {"Qualifiers": ...}, "#text": number}
+    "EventID": ("EventID",),
+    "EventRecordID": ("EventRecordID",),
+    "SystemTime": ("TimeCreated", "#attributes", "SystemTime"),
+    "Channel": ("Channel",),
+    "Computer": ("Computer",),
+}
+
+
+@lru_cache(maxsize=64)
+def _load_raw_system(data: str) -> dict:
+    # the filters and the checkpoint read several fields of the same record
+    event = orjson.loads(data).get("Event") or {}
+    return event.get("System") or {}
+
+
+def get_raw_system_field(record: dict, name: str) -> Optional[str]:
+    """Read a System field of a raw record, before it is formatted.
+
+    Only the System object is looked at, so a field of the same name in
+    EventData or UserData (e.g. a "Channel" of the event) is not mistaken
+    for it. The JSON text is loaded once for all the fields of a record.
+
+    Args:
+        record (dict): Raw record from `PyEvtxParser.records_json`.
+        name (str): One of `_RAW_SYSTEM_FIELDS`.
+
+    Returns:
+        Optional[str]: Field value as a string, None if absent or null.
+    """
+    value = _load_raw_system(record["data"])
+    for key in _RAW_SYSTEM_FIELDS[name]:
+        value = value.get(key) if isinstance(value, dict) else None
+    if isinstance(value, dict):
+        value = value.get("#text")
+    return None if value is None else str(value)
+
+
 def _parse_event_data(record: dict) -> dict:
     """Parse and extract event data from raw record."""
     data = orjson.loads(record.get("data"))
@@ -113,18 +269,148 @@ def _parse_event_data(record: dict) -> dict:
     }
 
 
-def _create_timestamp_field(system_time: str, shift: Union[str, datetime]) -> str:
-    """Create timestamp field with optional shift."""
-    if shift != "0" and isinstance(shift, datetime):
-        current_timestamp = datetime.strptime(
-            system_time, "%Y-%m-%dT%H:%M:%S.%fZ"
+def _get_shift_delta(shift: Union[str, timedelta]) -> Optional[timedelta]:
+    """Whole seconds and days of the timestamp shift, or None when not shifting."""
+    if shift != "0" and isinstance(shift, timedelta):
+        return timedelta(seconds=shift.seconds) + timedelta(days=shift.days)
+    return None
+
+
+def _shift_timestamp(system_time: str, shift_delta: timedelta) -> str:
+    """Reference implementation of the timestamp shift (see `TimestampShifter`)."""
+    current_timestamp = datetime.strptime(system_time, "%Y-%m-%dT%H:%M:%S.%fZ")
+    final_timestamp = current_timestamp + shift_delta
+    return final_timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+_TWO_DIGITS = [f"{i:02d}" for i in range(60)]
+_HOURS = {_TWO_DIGITS[i]: i for i in range(24)}
+_MINUTES = {_TWO_DIGITS[i]: i for i in range(60)}
+
+
+class TimestampShifter:
+    """Shift `SystemTime` strings without `strptime`/`strftime` per record.
+
+    The shift only has whole seconds and days, so the fractional part of the
+    timestamp never changes: only the "YYYY-MM-DDTHH:MM:SS" prefix is shifted,
+    with integer arithmetic on the time of day and a per-date cache, and the
+    result is cached per distinct second.
+    Anything that is not in the canonical form emitted by the parser
+    ("YYYY-MM-DDTHH:MM:SS.ffffffZ") goes through `_shift_timestamp`, so the
+    output (or the error) is always the same as the reference implementation.
+    """
+
+    # upper bound for the per-second cache
+    MAX_CACHED_SECONDS = 65536
+
+    def __init__(self, shift_delta: timedelta) -> None:
+        self.shift_delta = shift_delta
+        self.shift_days = shift_delta.days
+        self.shift_seconds = shift_delta.seconds
+        self.prefixes: dict = {}
+        self.dates: dict = {}
+
+    def _shift_date(self, date: str, carry_days: int) -> Optional[str]:
+        key = (date, carry_days)
+        shifted = self.dates.get(key)
+        if shifted is None:
+            try:
+                shifted_date = datetime(
+                    int(date[0:4]), int(date[5:7]), int(date[8:10])
+                ) + timedelta(days=self.shift_days + carry_days)
+            except (ValueError, OverflowError):
+                return None
+            if shifted_date.year < 1000:
+                # strftime does not zero-pad such years on every platform
+                return None
+            shifted = f"{shifted_date.year}-{shifted_date.month:02d}-{shifted_date.day:02d}"
+            self.dates[key] = shifted
+        return shifted
+
+    def _shift_prefix(self, prefix: str) -> Optional[str]:
+        if not (
+            prefix[4] == "-"
+            and prefix[7] == "-"
+            and prefix[10] == "T"
+            and prefix[13] == ":"
+            and prefix[16] == ":"
+            and (prefix[0:4] + prefix[5:7] + prefix[8:10]).isdigit()
+        ):
+            return None
+        # table lookups also validate the ranges strptime would accept
+        hour = _HOURS.get(prefix[11:13])
+        minute = _MINUTES.get(prefix[14:16])
+        second = _MINUTES.get(prefix[17:19])
+        if hour is None or minute is None or second is None:
+            return None
+
+        # time of day in plain integers; whole days are carried over to the date
+        carry_days, seconds = divmod(
+            hour * 3600 + minute * 60 + second + self.shift_seconds, 86400
         )
-        final_timestamp = (
-            current_timestamp
-            + timedelta(seconds=shift.seconds)
-            + timedelta(days=shift.days)
+        date = self._shift_date(prefix[:10], carry_days)
+        if date is None:
+            return None
+        hour, seconds = divmod(seconds, 3600)
+        minute, second = divmod(seconds, 60)
+        return (
+            date
+            + "T"
+            + _TWO_DIGITS[hour]
+            + ":"
+            + _TWO_DIGITS[minute]
+            + ":"
+            + _TWO_DIGITS[second]
         )
-        return final_timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    def shift(self, system_time: str) -> str:
+        """Shift one timestamp.
+
+        Args:
+            system_time (str): SystemTime value.
+
+        Returns:
+            str: Shifted timestamp, formatted as "%Y-%m-%dT%H:%M:%S.%fZ".
+        """
+        if (
+            len(system_time) == 27
+            and system_time[19] == "."
+            and system_time[26] == "Z"
+            and system_time.isascii()
+            and system_time[20:26].isdigit()
+        ):
+            prefix = system_time[:19]
+            shifted = self.prefixes.get(prefix)
+            if shifted is None:
+                shifted = self._shift_prefix(prefix)
+                if shifted is None:
+                    return _shift_timestamp(system_time, self.shift_delta)
+                if len(self.prefixes) >= self.MAX_CACHED_SECONDS:
+                    self.prefixes.clear()
+                    self.dates.clear()
+                self.prefixes[prefix] = shifted
+            return shifted + system_time[19:]
+
+        return _shift_timestamp(system_time, self.shift_delta)
+
+    def shift_many(self, system_times: Iterable[str]) -> List[str]:
+        """Shift a batch of timestamps (e.g. a whole chunk) at once.
+
+        Args:
+            system_times (Iterable[str]): SystemTime values.
+
+        Returns:
+            List[str]: Shifted timestamps, in order.
+        """
+        shift = self.shift
+        return [shift(system_time) for system_time in system_times]
+
+
+def _create_timestamp_field(system_time: str, shift: Union[str, timedelta]) -> str:
+    """Create timestamp field with optional shift."""
+    shift_delta = _get_shift_delta(shift)
+    if shift_delta is not None:
+        return _shift_timestamp(system_time, shift_delta)
     else:
         return system_time
 
@@ -163,230 +449,809 @@ def _create_normalized_event_data(event_data: dict) -> dict:
     return normalized_data
 
 
+class RecordFormatter:
+    """Formats the records of one Eventlog file into structured JSON.
+
+    Everything that only depends on the file (resolved path, tags, timestamp
+    shift) is computed once, and the strings derived from
+    (channel, provider, event_id) are cached and shared between records.
+    """
+
+    # upper bound for the string cache (carved files may contain garbage values)
+    MAX_CACHED_EVENTS = 4096
+
+    def __init__(
+        self,
+        filepath: str,
+        shift: Union[str, timedelta],
+        additional_tags: List[str] = None,
+    ) -> None:
+        self.filepath = str(Path(filepath).resolve())
+        self.shift = shift
+        self.shift_delta = _get_shift_delta(shift)
+        self.shifter = (
+            TimestampShifter(self.shift_delta) if self.shift_delta is not None else None
+        )
+        self.tags = ["eventlog"] + list(additional_tags or [])
+        self.event_strings: dict = {}
+
+    def _get_event_strings(self, channel: str, provider: str, event_id: Any) -> tuple:
+        key = (channel, provider, event_id)
+        strings = self.event_strings.get(key)
+        if strings is None:
+            strings = (f"eventlog-{channel.lower()}-{event_id}", provider.lower())
+            if len(self.event_strings) < self.MAX_CACHED_EVENTS:
+                self.event_strings[key] = strings
+        return strings
+
+    def format(self, record: dict) -> dict:
+        """Format Eventlog record into structured JSON.
+
+        Args:
+            record (dict): Raw eventlog record with 'data' field containing JSON string.
+
+        Returns:
+            dict: Formatted eventlog record with structure:
+            {
+                "@timestamp": str,
+                "event": {
+                    "action": str,
+                    "category": [str],
+                    "type": [str],
+                    "kind": "event",
+                    "provider": str,
+                    "module": "windows",
+                    "dataset": "windows.eventlog",
+                    "code": int,
+                    "created": str
+                },
+                "winlog": {
+                    "channel": str,
+                    "computer_name": str,
+                    "event_id": int,
+                    "record_id": int,
+                    "opcode": int,
+                    "task": int,
+                    "version": int,
+                    "provider": {"name": str, "guid": str},
+                    "event_data": dict (optional)
+                },
+                "userdata": dict (optional),
+                "process": {"pid": int, "thread": {"id": int}} (optional),
+                "log": {
+                    "file": {"path": str}
+                },
+                "tags": [str]
+            }
+        """
+        return self.format_parsed(_parse_event_data(record))
+
+    def format_parsed(self, parsed_data: dict) -> dict:
+        """`format` of a record already decoded by `_parse_event_data`."""
+        system = parsed_data["system"]
+        channel = system["Channel"]
+        event_id = system["EventID"]
+        provider_attrs = system["Provider"]["#attributes"]
+        system_time = system["TimeCreated"]["#attributes"]["SystemTime"]
+        action, provider = self._get_event_strings(
+            channel, provider_attrs["Name"], event_id
+        )
+        timestamp = (
+            self.shifter.shift(system_time) if self.shifter is not None else system_time
+        )
+
+        # Create ECS-compliant event fields
+        event_fields = {
+            "action": action,
+            "category": ["host"],
+            "type": ["info"],
+            "kind": "event",
+            "provider": provider,
+            "module": "windows",
+            "dataset": "windows.eventlog",
+            "code": event_id,
+            "created": system_time,
+        }
+
+        # Create Windows-specific fields
+        windows_eventlog = {
+            "channel": channel,
+            "computer_name": system["Computer"],
+            "event_id": event_id,
+            "opcode": system.get("Opcode"),
+            "record_id": system["EventRecordID"],
+            "task": system["Task"],
+            "version": system.get("Version"),
+            "provider": {
+                "name": provider_attrs["Name"],
+                "guid": provider_attrs.get("Guid"),
+            },
+        }
+
+        # Add event_data if present
+        normalized_event_data = _create_normalized_event_data(
+            parsed_data["event_data"]
+        )
+        if normalized_event_data:
+            windows_eventlog["event_data"] = normalized_event_data
+
+        # Build the final ECS-compliant result object
+        result = {
+            "@timestamp": timestamp,
+            "event": event_fields,
+            "winlog": windows_eventlog,
+            # user_data (optional)
+            # process (optional)
+            # log.file.path
+            # tags
+        }
+
+        # Add userdata if present
+        if parsed_data["user_data"]:
+            result["userdata"] = parsed_data["user_data"]
+
+        # Add process fields if available
+        try:
+            execution_attrs = system["Execution"]["#attributes"]
+            result["process"] = {
+                "pid": int(execution_attrs["ProcessID"]),
+                "thread": {"id": int(execution_attrs["ThreadID"])},
+            }
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        result["log"] = {"file": {"path": self.filepath}}
+        result["tags"] = list(self.tags)
+
+        return result
+
+
+@lru_cache(maxsize=16)
+def _get_record_formatter(
+    filepath: str, shift: Union[str, timedelta], additional_tags: tuple
+) -> RecordFormatter:
+    """Formatter shared by every chunk of the same file (in this process)."""
+    return RecordFormatter(filepath, shift, list(additional_tags))
+
+
 def format_record(
     record: dict,
     filepath: str,
-    shift: Union[str, datetime],
+    shift: Union[str, timedelta],
     additional_tags: List[str] = None,
 ) -> dict:
     """Format Eventlog record into structured JSON.
 
+    Convenience wrapper around `RecordFormatter.format`; prefer a
+    `RecordFormatter` when formatting many records of the same file.
+
     Args:
         record (dict): Raw eventlog record with 'data' field containing JSON string.
         filepath (str): File path for logging.
-        shift (Union[str, datetime]): Timestamp shift value.
+        shift (Union[str, timedelta]): Timestamp shift value.
         additional_tags (List[str], optional): Additional tags to add to the record.
 
     Returns:
-        dict: Formatted eventlog record with structure:
-        {
-            "@timestamp": str,
-            "event": {
-                "action": str,
-                "category": [str],
-                "type": [str],
-                "kind": "event",
-                "provider": str,
-                "module": "windows",
-                "dataset": "windows.eventlog",
-                "code": int,
-                "created": str
-            },
-            "winlog": {
-                "channel": str,
-                "computer_name": str,
-                "event_id": int,
-                "record_id": int,
-                "opcode": int,
-                "task": int,
-                "version": int,
-                "provider": {"name": str, "guid": str},
-                "event_data": dict (optional)
-            },
-            "userdata": dict (optional),
-            "process": {"pid": int, "thread": {"id": int}} (optional),
-            "log": {
-                "file": {"path": str}
-            },
-            "tags": [str]
-        }
+        dict: Formatted eventlog record (see `RecordFormatter.format`).
     """
-    # User defined tags
-    tags = ["eventlog"]
-    if additional_tags:
-        tags.extend(additional_tags)
-
-    # Parse the raw event data
-    parsed_data = _parse_event_data(record)
-
-    system = parsed_data["system"]
-    channel = system["Channel"]
-    event_id = system["EventID"]
-    provider_attrs = system["Provider"]["#attributes"]
-    timestamp = _create_timestamp_field(
-        system["TimeCreated"]["#attributes"]["SystemTime"], shift
-    )
-
-    # Create ECS-compliant event fields
-    event_fields = {
-        "action": f"eventlog-{channel.lower()}-{event_id}",
-        "category": ["host"],
-        "type": ["info"],
-        "kind": "event",
-        "provider": provider_attrs["Name"].lower(),
-        "module": "windows",
-        "dataset": "windows.eventlog",
-        "code": event_id,
-        "created": system["TimeCreated"]["#attributes"]["SystemTime"],
-    }
-
-    # Create Windows-specific fields
-    windows_eventlog = {
-        "channel": channel,
-        "computer_name": system["Computer"],
-        "event_id": event_id,
-        "opcode": system.get("Opcode"),
-        "record_id": system["EventRecordID"],
-        "task": system["Task"],
-        "version": system.get("Version"),
-        "provider": {
-            "name": provider_attrs["Name"],
-            "guid": provider_attrs.get("Guid"),
-        },
-    }
-
-    # Add event_data if present
-    normalized_event_data = _create_normalized_event_data(parsed_data["event_data"])
-    if normalized_event_data:
-        windows_eventlog["event_data"] = normalized_event_data
-
-    # Build the final ECS-compliant result object
-    result = {
-        "@timestamp": timestamp,
-        "event": event_fields,
-        "winlog": windows_eventlog,
-        # user_data (optional)
-        # process (optional)
-        # log.file.path
-        # tags
-    }
-
-    # Add userdata if present
-    if parsed_data["user_data"]:
-        result["userdata"] = parsed_data["user_data"]
-
-    # Add process fields if available
-    try:
-        execution_attrs = system["Execution"]["#attributes"]
-        result["process"] = {
-            "pid": int(execution_attrs["ProcessID"]),
-            "thread": {"id": int(execution_attrs["ThreadID"])},
-        }
-    except (KeyError, TypeError, ValueError):
-        pass
-
-    result["log"] = {"file": {"path": str(Path(filepath).resolve())}}
-    result["tags"] = tags
-
-    return result
+    return RecordFormatter(filepath, shift, additional_tags).format(record)
 
 
 def process_by_chunk(
-    records: List[str],
+    records: List[dict],
     filepath: Union[Generator, str],
-    shift: Union[Generator, str, datetime],
+    shift: Union[Generator, str, timedelta],
     additional_tags: Union[Generator, List[str]] = None,
+    id_strategy: Optional[str] = None,
+    stats: Optional[Stats] = None,
 ) -> List[dict]:
     """Perform formatting for each chunk. (for efficiency)
 
     Args:
-        records (List[str]): chunk of Eventlog records(json).
-        filepath (List[str]): list with 1 element.
-        shift (List[Union[str, datetime]]): list with 1 element
-        additional_tags (List[str], optional): Additional tags to add to each record.
+        records (List[dict]): chunk of Eventlog records from `records_json()`.
+        filepath (Union[Generator, str]): File path, or a generator yielding it.
+        shift (Union[Generator, str, timedelta]): Timestamp shift, or a generator yielding it.
+        additional_tags (List[str], optional): Additional tags (or a generator yielding them).
+        id_strategy (str, optional): Document id strategy (see `DocumentId.ID_STRATEGIES`).
+            When given, each record gets its id under "_id", computed here next to
+            the formatting (i.e. in the worker process).
+        stats (Stats, optional): Receives the "loads", "format" and "hash" times
+            and the records_formatted counter.
 
     Yields:
         List[dict]: Eventlog records list.
     """
 
-    filepath = filepath if isinstance(filepath, str) else next(filepath)
-    shift = shift if isinstance(shift, str) else next(shift)
+    filepath = next(filepath) if isinstance(filepath, Iterator) else filepath
+    shift = next(shift) if isinstance(shift, Iterator) else shift
     additional_tags = (
-        additional_tags
-        if isinstance(additional_tags, list)
-        else (next(additional_tags) if additional_tags else None)
+        next(additional_tags)
+        if isinstance(additional_tags, Iterator)
+        else additional_tags
     )
 
-    concatenated_json: str = (
-        f"[{','.join([orjson.dumps(record).decode('utf-8') for record in records])}]"
-    )
-    record_list: List[dict] = orjson.loads(concatenated_json)
+    formatter = _get_record_formatter(filepath, shift, tuple(additional_tags or ()))
+
+    # records are already dicts from `records_json()`; only their "data"
+    # payload is JSON, and it is parsed exactly once in `_parse_event_data`.
+    if stats is None:
+        formatted = [formatter.format(record) for record in records]
+    else:
+        # decoded in a separate pass, to time both stages per chunk
+        start = time.perf_counter()
+        parsed = [_parse_event_data(record) for record in records]
+        loaded = time.perf_counter()
+        formatted = [formatter.format_parsed(data) for data in parsed]
+        stats.add_time("loads", loaded - start)
+        stats.add_time("format", time.perf_counter() - loaded)
+        stats.add("records_formatted", len(formatted))
+
+    calc_id = get_id_function(id_strategy) if id_strategy else None
+    if calc_id is not None:
+        start = time.perf_counter()
+        for record in formatted:
+            record["_id"] = calc_id(record)
+        if stats is not None:
+            stats.add_time("hash", time.perf_counter() - start)
+
+    return formatted
+
+
+class WorkerOptions(NamedTuple):
+    """Options of the worker tasks which do not depend on the file.
+
+    `Evtx2es.create_pool` ships them once to each worker through the pool
+    initializer; tasks then only carry the file path and their records (or
+    chunk offsets).
+
+    Attributes:
+        shift (Union[str, timedelta]): Timestamp shift value.
+        additional_tags (tuple): Additional tags to add to each record.
+        id_strategy (str, optional): Document id strategy (see `process_by_chunk`).
+        serialized (bool): Return the records as NDJSON lines (bytes) serialized
+            by the worker, instead of dicts which are pickled back.
+        shared_memory (bool): Hand the serialized records back through shared
+            memory instead of the result pipe.
+        bulk_index (str, optional): With `serialized`, emit each record as the
+            `_bulk` lines indexing it into this index (action line, then source
+            line) instead of a plain NDJSON line.
+        bulk_pipeline (str): Ingest pipeline named in the action lines.
+        stats (bool): Collect the stats of each task (see `Stats`), sent back
+            with its result.
+    """
+
+    shift: Union[str, timedelta] = "0"
+    additional_tags: tuple = ()
+    id_strategy: Optional[str] = None
+    serialized: bool = False
+    shared_memory: bool = False
+    bulk_index: Optional[str] = None
+    bulk_pipeline: str = ""
+    stats: bool = False
+
+
+# Options of this worker process, set by the pool initializer
+_worker_options: Optional[WorkerOptions] = None
+
+
+def _init_worker(
+    options: Optional[WorkerOptions], profile_dir: Optional[Path] = None
+) -> None:
+    global _worker_options
+    _worker_options = options
+    if profile_dir is not None:
+        profile_worker(profile_dir)
+
 
-    return [
-        format_record(
-            record, filepath=filepath, shift=shift, additional_tags=additional_tags
+def _serialize_bulk_items(records: List[dict], index: str, pipeline: str) -> bytes:
+    """`_bulk` request body indexing `records` (ids taken from "_id", if any)."""
+    meta = {"_index": index}
+    if pipeline:
+        meta["pipeline"] = pipeline
+    # without ids, every action line is the same
+    action_line = orjson.dumps({"index": meta}, option=orjson.OPT_APPEND_NEWLINE)
+    lines = []
+    for record in records:
+        doc_id = record.pop("_id", None)
+        if doc_id is None:
+            lines.append(action_line)
+        else:
+            lines.append(
+                orjson.dumps(
+                    {"index": {**meta, "_id": doc_id}}, option=orjson.OPT_APPEND_NEWLINE
+                )
+            )
+        lines.append(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+    return b"".join(lines)
+
+
+def _format_output(
+    records: List[dict],
+    filepath: str,
+    options: WorkerOptions,
+    stats: Optional[Stats] = None,
+    segment: Optional[str] = None,
+) -> Union[List[dict], bytes, SharedBuffer]:
+    """Formatted records of a task, as dicts or serialized (see `WorkerOptions`).
+
+    With `options.shared_memory`, the records are left in the shared memory
+    block named `segment` (see `SegmentTracker`).
+    """
+    formatted = process_by_chunk(
+        records,
+        filepath,
+        options.shift,
+        options.additional_tags,
+        options.id_strategy,
+        stats,
+    )
+    if not options.serialized:
+        return formatted
+    start = time.perf_counter()
+    if options.bulk_index is not None:
+        data = _serialize_bulk_items(formatted, options.bulk_index, options.bulk_pipeline)
+    else:
+        data = b"".join(
+            orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in formatted
         )
-        for record in record_list
-    ]
+    if stats is not None:
+        stats.add_time("serialize", time.perf_counter() - start)
+        stats.add("bytes_serialized", len(data))
+    return send_bytes(data, options.shared_memory, segment)
+
+
+def _receive_output(
+    output: Union[List[dict], bytes, SharedBuffer],
+    bulk_items: bool = False,
+    segments: Optional[SegmentTracker] = None,
+) -> list:
+    """Records of `_format_output`: dicts, or NDJSON lines (with their newline).
+
+    With `bulk_items`, each record is its action and source lines, joined.
+    A shared memory block is released, and forgotten by `segments`.
+    """
+    if isinstance(output, list):
+        return output
+    data = segments.receive(output) if segments else receive_bytes(output)
+    lines = data.splitlines(keepends=True)
+    if bulk_items:
+        # orjson escapes newlines in strings: every line is a whole JSON document
+        return list(map(operator.add, lines[::2], lines[1::2]))
+    return lines
+
+
+_SERIALIZED_RECORD_ID = re.compile(rb'"record_id":(\d+)')
+
+
+def get_serialized_record_id(item: bytes) -> Optional[int]:
+    """winlog.record_id of a serialized record, without parsing it.
+
+    "winlog" is serialized before "userdata", and its "record_id" before its
+    "event_data", so the first match is the right one.
+
+    Args:
+        item (bytes): NDJSON line, or `_bulk` item, from `gen_records`.
+
+    Returns:
+        Optional[int]: Record id, None if absent.
+    """
+    match = _SERIALIZED_RECORD_ID.search(item)
+    return int(match.group(1)) if match else None
+
+
+def format_chunk(
+    records: List[dict],
+    filepath: str,
+    options: Optional[WorkerOptions] = None,
+    segment: Optional[str] = None,
+) -> tuple:
+    """Format records parsed by the main process. (in a worker process)
+
+    Args:
+        records (List[dict]): chunk of Eventlog records from `records_json()`.
+        filepath (str): Eventlog file.
+        options (WorkerOptions, optional): Defaults to those of the pool initializer.
+        segment (str, optional): Name of the shared memory block of the output.
+
+    Returns:
+        tuple: (formatted records (see `_receive_output`), Stats of the task
+            or None when `options.stats` is off)
+    """
+    options = options or _worker_options
+    stats = Stats() if options.stats else None
+    return _format_output(records, filepath, options, stats, segment), stats
+
+
+def process_chunk_range(
+    filepath: str,
+    offsets: tuple,
+    options: Optional[WorkerOptions] = None,
+    record_filter: Optional[Callable[[dict], bool]] = None,
+    segment: Optional[str] = None,
+) -> tuple:
+    """Parse, filter and format some EVTX chunks of a file. (in a worker process)
+
+    The worker reads the chunks itself, so record data never goes through the
+    parent process.
+
+    Args:
+        filepath (str): Eventlog file.
+        offsets (tuple): Offsets of the chunks to parse (see `EvtxChunks.scan_chunks`).
+        options (WorkerOptions, optional): Defaults to those of the pool initializer.
+        record_filter (Callable[[dict], bool], optional): Predicate on the raw records.
+        segment (str, optional): Name of the shared memory block of the output.
+
+    Returns:
+        tuple: (formatted records, raw bytes of the records, record_filter, stats)
+            where record_filter is the worker's copy, when it has state to `merge`
+            back, and stats the Stats of the task when `options.stats` is on.
+    """
+    options = options or _worker_options
+    stats = Stats() if options.stats else None
+    data = read_chunks(filepath, offsets)
+    if stats is not None:
+        stats.add("bytes_read", len(data))
+    parser = PyEvtxParser(io.BytesIO(data), number_of_threads=1)
+    # a single piece: generate_chunks only provides the error recovery here
+    records = next(generate_chunks(sys.maxsize, parser.records_json(), stats), [])
+    if record_filter is not None:
+        records = [record for record in records if record_filter(record)]
+
+    raw_bytes = sum(len(record["data"]) for record in records)
+    return (
+        _format_output(records, filepath, options, stats, segment),
+        raw_bytes,
+        record_filter if hasattr(record_filter, "merge") else None,
+        stats,
+    )
 
 
 class Evtx2es(SafeMultiprocessingMixin):
-    def __init__(self, input_path: Path) -> None:
+    def __init__(self, input_path: Path, parser_threads: int = 0) -> None:
+        """
+        Args:
+            input_path (Path): Eventlog file.
+            parser_threads (int, optional): Number of threads the Rust parser uses
+                to parse EVTX chunks. 0 lets the library use every core.
+        """
         self.path = input_path
-        self.parser = PyEvtxParser(self.path.open(mode="rb"))
+        self.parser = PyEvtxParser(
+            self.path.open(mode="rb"), number_of_threads=parser_threads
+        )
+
+    @classmethod
+    def create_pool(
+        cls,
+        processes: Optional[int] = None,
+        options: Optional[WorkerOptions] = None,
+        profile_dir: Optional[Path] = None,
+    ) -> Any:
+        """Create a worker pool for `gen_records`, which can be shared by many files.
+
+        Args:
+            processes (int, optional): Number of workers. Defaults to the CPU count.
+            options (WorkerOptions, optional): Options sent once to each worker;
+                `gen_records` with the same options does not send them with every task.
+            profile_dir (Path, optional): Each worker profiles itself and writes its
+                profile to this directory when the pool is shut down with
+                `shutdown_pool` (see `Profiling`).
+
+        Returns:
+            Any: multiprocessing Pool, whose shared memory blocks (see
+                `SegmentTracker`) are released by `shutdown_pool`.
+        """
+        # Use safe context for Python 3.13 compatibility
+        ctx = cls.get_multiprocessing_context()
+        pool = ctx.Pool(
+            processes or cls.get_cpu_count(),
+            initializer=_init_worker,
+            initargs=(options, profile_dir),
+        )
+        pool.worker_options = options
+        pool.profile_dir = profile_dir
+        pool.shared_segments = SegmentTracker()
+        return pool
+
+    @staticmethod
+    def shutdown_pool(pool: Any) -> None:
+        """Stop the workers of a pool from `create_pool`.
+
+        Profiling workers finish their pending tasks and exit normally, which
+        writes their profile; other workers are terminated right away. The
+        shared memory blocks of the results never received (e.g. of an
+        abandoned `gen_records`) are then unlinked.
+
+        Args:
+            pool (Any): multiprocessing Pool
+        """
+        if getattr(pool, "profile_dir", None) is not None:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+        segments = getattr(pool, "shared_segments", None)
+        if segments is not None:
+            segments.release()
+
+    @contextmanager
+    def __segments(self, pool: Any, options: WorkerOptions) -> Generator:
+        # Names of the shared memory blocks of the tasks, tracked by the pool
+        # owner (released by `shutdown_pool`). Another pool keeps running: its
+        # abandoned tasks are waited for (see `imap_bounded`) before the blocks
+        # are released here
+        if not options.shared_memory:
+            yield None
+            return
+        segments = getattr(pool, "shared_segments", None)
+        if segments is not None:
+            yield segments
+            return
+        segments = SegmentTracker()
+        try:
+            yield segments
+        finally:
+            segments.release()
+
+    @staticmethod
+    def __untracked(pool: Any, segments: Optional[SegmentTracker]) -> bool:
+        # Blocks tracked for a pool not made by `create_pool`
+        return segments is not None and segments is not getattr(
+            pool, "shared_segments", None
+        )
+
+    @contextmanager
+    def __owned_pool(
+        self, pool: Any, options: WorkerOptions, profile_dir: Optional[Path]
+    ) -> Generator:
+        # A shared pool is owned (and shut down) by the caller, e.g. one pool for many files
+        if pool is not None:
+            yield pool
+            return
+        pool = self.create_pool(self.get_cpu_count(), options, profile_dir)
+        try:
+            yield pool
+        finally:
+            self.shutdown_pool(pool)
 
     def gen_records(
         self,
-        shift: Union[str, datetime],
+        shift: Union[str, timedelta],
         multiprocess: bool,
         chunk_size: int,
         additional_tags: List[str] = None,
+        max_inflight: Optional[int] = None,
+        pool: Any = None,
+        batch_size: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+        id_strategy: Optional[str] = None,
+        skip_records: int = 0,
+        record_filter: Optional[Callable[[dict], bool]] = None,
+        parse_in_workers: bool = False,
+        serialized: bool = False,
+        shared_memory: bool = False,
+        bulk_index: Optional[str] = None,
+        bulk_pipeline: str = "",
+        stats: Optional[Stats] = None,
+        profile_dir: Optional[Path] = None,
     ) -> Generator:
-        """Generates the formatted Eventlog records chunks.
+        """Generates the formatted Eventlog records in batches.
 
         Args:
-            shift (Union[str, datetime]): Timestamp shift value.
+            shift (Union[str, timedelta]): Timestamp shift value.
             multiprocess (bool): Flag to run multiprocessing.
             chunk_size (int): Size of the chunk to be processed for each process.
             additional_tags (List[str], optional): Additional tags to add to each record.
+            max_inflight (int, optional): Maximum number of chunks being processed
+                or waiting to be consumed in multiprocess mode. Defaults to twice the CPU count.
+            pool (Any, optional): Pool from `create_pool` to reuse in multiprocess mode.
+                A new pool is created (and closed) for this file when omitted.
+            batch_size (int, optional): Number of records per yielded batch.
+                Defaults to `chunk_size`.
+            batch_bytes (int, optional): Approximate byte budget per yielded batch,
+                measured on the raw event data.
+            id_strategy (str, optional): Compute document ids (stored under "_id")
+                while formatting, with this strategy.
+            skip_records (int, optional): Number of leading records (in parser order)
+                passing `record_filter` to drop before formatting, e.g. to resume an
+                interrupted import.
+            record_filter (Callable[[dict], bool], optional): Predicate on the raw
+                records, evaluated in this process before formatting; records
+                for which it returns False are dropped.
+            parse_in_workers (bool, optional): In multiprocess mode, let each worker
+                read and parse its own EVTX chunks (about `chunk_size` records per
+                task, whole chunks) instead of parsing the file here. The filter is
+                then evaluated in the workers; the state of their copies is folded
+                back with `record_filter.merge` when it has one.
+            serialized (bool, optional): Yield each record as an NDJSON line (bytes,
+                with its newline) serialized where it is formatted, i.e. in the
+                workers in multiprocess mode; the dicts never reach this process.
+            shared_memory (bool, optional): In multiprocess mode, serialized records
+                come back through shared memory instead of the result pipe.
+            bulk_index (str, optional): With `serialized`, yield each record as
+                the `_bulk` lines (bytes) indexing it into this index, ready to be
+                posted as they are: action line (with the id computed with
+                `id_strategy`, if any) then source line.
+            bulk_pipeline (str, optional): Ingest pipeline named in the action lines.
+            stats (Stats, optional): Receives the stats of parsing and formatting,
+                those of the workers included.
+            profile_dir (Path, optional): Profile the workers of the pool created
+                for this file, into this directory (see `Profiling`).
 
         Yields:
-            Generator: Yields List[dict].
+            Generator: Yields List[dict] (List[bytes] when serialized).
         """
+        options = WorkerOptions(
+            shift,
+            tuple(additional_tags or ()),
+            id_strategy,
+            serialized,
+            serialized and shared_memory and multiprocess,
+            bulk_index if serialized else None,
+            bulk_pipeline if serialized and bulk_index is not None else "",
+            stats is not None,
+        )
+        bulk_items = options.bulk_index is not None
+
+        if multiprocess and parse_in_workers:
+            yield from self.__gen_records_parsed_in_workers(
+                options,
+                chunk_size,
+                max_inflight,
+                pool,
+                batch_size,
+                batch_bytes,
+                skip_records,
+                record_filter,
+                stats,
+                profile_dir,
+            )
+            return
+
+        filepath = str(self.path)
+        if stats is not None:
+            # the parser reads the whole file
+            stats.add("bytes_read", self.path.stat().st_size)
 
-        gen_path = iter(lambda: str(self.path), None)
-        gen_shift = iter(lambda: shift, None)
-
-        # Create a proper generator for additional_tags
-        def gen_tags():
-            while True:
-                yield additional_tags
-
-        gen_tags = gen_tags()
-
-        if multiprocess:
-            # Use safe context for Python 3.13 compatibility
-            ctx = self.get_multiprocessing_context()
-            with ctx.Pool(self.get_cpu_count()) as pool:
-                results = pool.starmap_async(
-                    process_by_chunk,
-                    zip(
-                        generate_chunks(chunk_size, self.parser.records_json()),
-                        gen_path,
-                        gen_shift,
-                        gen_tags,
-                    ),
+        # Raw size of each chunk, in submission order, for the byte budget
+        chunk_bytes: deque = deque()
+
+        def gen_sized_chunks():
+            to_skip = skip_records
+            for records in generate_chunks(
+                chunk_size, self.parser.records_json(), stats
+            ):
+                # skipped records are counted after filtering, like the
+                # documents acknowledged by a checkpoint
+                if record_filter is not None:
+                    records = [record for record in records if record_filter(record)]
+                if to_skip:
+                    if to_skip >= len(records):
+                        to_skip -= len(records)
+                        continue
+                    records, to_skip = records[to_skip:], 0
+                if not records:
+                    continue
+                chunk_bytes.append(sum(len(record["data"]) for record in records))
+                yield records
+
+        if not multiprocess:
+            yield from generate_batches(
+                (
+                    (
+                        _receive_output(
+                            _format_output(records, filepath, options, stats),
+                            bulk_items,
+                        ),
+                        chunk_bytes.popleft(),
+                    )
+                    for records in gen_sized_chunks()
+                ),
+                batch_size or chunk_size,
+                batch_bytes,
+            )
+            return
+
+        cpu_count = self.get_cpu_count()
+        with self.__owned_pool(pool, options, profile_dir) as pool:
+            # options already shipped by the pool initializer are not sent again
+            task_options = (
+                None if getattr(pool, "worker_options", None) == options else options
+            )
+            with self.__segments(pool, options) as segments:
+                tasks = (
+                    (
+                        records,
+                        filepath,
+                        task_options,
+                        segments.reserve() if segments else None,
+                    )
+                    for records in gen_sized_chunks()
                 )
-                yield list(chain.from_iterable(results.get(timeout=None)))
-        else:
-            buffer: List[List[dict]] = []
-            for records in generate_chunks(chunk_size, self.parser.records_json()):
-                if chunk_size <= len(buffer):
-                    yield list(chain.from_iterable(buffer))
-                    buffer.clear()
-                else:
-                    buffer.append(
-                        process_by_chunk(records, gen_path, gen_shift, gen_tags)
+                # Stream formatted chunks in order as workers finish them
+                formatted = imap_bounded(
+                    pool,
+                    format_chunk,
+                    tasks,
+                    max_inflight or cpu_count * 2,
+                    wait_on_close=self.__untracked(pool, segments),
+                )
+
+                def gen_received() -> Generator:
+                    for output, task_stats in formatted:
+                        if task_stats is not None:
+                            stats.merge(task_stats)
+                        yield (
+                            _receive_output(output, bulk_items, segments),
+                            chunk_bytes.popleft(),
+                        )
+
+                with closing(formatted):
+                    yield from generate_batches(
+                        gen_received(), batch_size or chunk_size, batch_bytes
+                    )
+
+    def __gen_records_parsed_in_workers(
+        self,
+        options: WorkerOptions,
+        chunk_size: int,
+        max_inflight: Optional[int],
+        pool: Any,
+        batch_size: Optional[int],
+        batch_bytes: Optional[int],
+        skip_records: int,
+        record_filter: Optional[Callable[[dict], bool]],
+        stats: Optional[Stats],
+        profile_dir: Optional[Path],
+    ) -> Generator:
+        """`gen_records` where the workers parse the file (see `process_chunk_range`)."""
+        filepath = str(self.path)
+
+        def gen_formatted(
+            results: Iterable, segments: Optional[SegmentTracker]
+        ) -> Generator:
+            to_skip = skip_records
+            for output, raw_bytes, worker_filter, task_stats in results:
+                records = _receive_output(
+                    output, options.bulk_index is not None, segments
+                )
+                if worker_filter is not None:
+                    record_filter.merge(worker_filter)
+                if task_stats is not None:
+                    stats.merge(task_stats)
+                if to_skip:
+                    if to_skip >= len(records):
+                        to_skip -= len(records)
+                        continue
+                    records, to_skip = records[to_skip:], 0
+                if records:
+                    yield records, raw_bytes
+
+        cpu_count = self.get_cpu_count()
+        with self.__owned_pool(pool, options, profile_dir) as pool:
+            task_options = (
+                None if getattr(pool, "worker_options", None) == options else options
+            )
+            with self.__segments(pool, options) as segments:
+                tasks = (
+                    (
+                        filepath,
+                        offsets,
+                        task_options,
+                        record_filter,
+                        segments.reserve() if segments else None,
+                    )
+                    for offsets in group_chunks(scan_chunks(filepath), chunk_size)
+                )
+                results = imap_bounded(
+                    pool,
+                    process_chunk_range,
+                    tasks,
+                    max_inflight or cpu_count * 2,
+                    wait_on_close=self.__untracked(pool, segments),
+                )
+                with closing(results):
+                    yield from generate_batches(
+                        gen_formatted(results, segments),
+                        batch_size or chunk_size,
+                        batch_bytes,
                     )
-            else:
-                yield list(chain.from_iterable(buffer))
@@ -0,0 +1,107 @@
+# coding: utf-8
+"""EVTX file layout: a 4 KiB file header followed by independent 64 KiB chunks.
+
+Each chunk ("ElfChnk") holds its own string and template tables, so any set of
+chunks behind a file header is a valid EVTX file. This lets worker processes
+parse their own part of a file without the parent reading any record.
+"""
+import struct
+import zlib
+from pathlib import Path
+from typing import Generator, List, Tuple, Union
+
+FILE_HEADER_SIZE = 4096
+CHUNK_SIZE = 65536
+CHUNK_MAGIC = b"ElfChnk\x00"
+
+# a record takes at least a few dozen bytes: larger counts are garbage
+MAX_RECORDS_PER_CHUNK = CHUNK_SIZE // 32
+
+
+def scan_chunks(path: Union[str, Path]) -> List[Tuple[int, int]]:
+    """Locate the chunks of an EVTX file, reading only their headers.
+
+    Slots without the chunk signature (e.g. overwritten in a carved file) are
+    left out; the parser would skip them anyway.
+
+    Args:
+        path (Union[str, Path]): EVTX file.
+
+    Returns:
+        List[Tuple[int, int]]: (offset, number of records announced by its header)
+            of each chunk, in file order.
+    """
+    chunks = []
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        for offset in range(FILE_HEADER_SIZE, size, CHUNK_SIZE):
+            f.seek(offset)
+            header = f.read(24)
+            if len(header) < 24 or header[:8] != CHUNK_MAGIC:
+                continue
+            first, last = struct.unpack_from("<QQ", header, 8)
+            count = last - first + 1 if first <= last else 1
+            chunks.append((offset, min(count, MAX_RECORDS_PER_CHUNK)))
+    return chunks
+
+
+def group_chunks(chunks: List[Tuple[int, int]], records_per_group: int) -> Generator:
+    """Group consecutive chunks until they announce `records_per_group` records.
+
+    Args:
+        chunks (List[Tuple[int, int]]): Output of `scan_chunks`.
+        records_per_group (int): Approximate number of records per group.
+
+    Yields:
+        Generator: Tuple[int, ...] of chunk offsets.
+    """
+    offsets: List[int] = []
+    records = 0
+    for offset, count in chunks:
+        offsets.append(offset)
+        records += count
+        if records >= records_per_group:
+            yield tuple(offsets)
+            offsets, records = [], 0
+    if offsets:
+        yield tuple(offsets)
+
+
+def patch_header(header: bytearray, chunk_count: int) -> None:
+    """Update a file header in place to describe `chunk_count` chunks numbered from 0.
+
+    Args:
+        header (bytearray): File header, `FILE_HEADER_SIZE` bytes.
+        chunk_count (int): Number of chunks following the header.
+    """
+    # first chunk number (u64 @ 8), last chunk number (u64 @ 16),
+    # number of chunks (u16 @ 42), checksum of the first 120 bytes (u32 @ 124)
+    struct.pack_into("<QQ", header, 8, 0, max(chunk_count - 1, 0))
+    struct.pack_into("<H", header, 42, chunk_count & 0xFFFF)
+    struct.pack_into("<I", header, 124, zlib.crc32(bytes(header[:120])))
+
+
+def read_chunks(path: Union[str, Path], offsets: Tuple[int, ...]) -> bytes:
+    """In-memory EVTX file made of the file header and the chunks at `offsets`.
+
+    The chunk numbers, chunk count and checksum of the header are updated to
+    describe the chunks kept.
+
+    Args:
+        path (Union[str, Path]): EVTX file.
+        offsets (Tuple[int, ...]): Offsets of the chunks, from `scan_chunks`.
+
+    Returns:
+        bytes: EVTX file content.
+    """
+    with open(path, "rb") as f:
+        header = bytearray(f.read(FILE_HEADER_SIZE))
+        chunks = []
+        for offset in offsets:
+            f.seek(offset)
+            chunks.append(f.read(CHUNK_SIZE))
+
+    if len(header) == FILE_HEADER_SIZE:
+        patch_header(header, len(chunks))
+
+    return bytes(header) + b"".join(chunks)
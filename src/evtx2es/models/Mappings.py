@@ -0,0 +1,100 @@
+# coding: utf-8
+"""Elasticsearch index definitions for the documents built by `format_record`."""
+from evtx2es.__about__ import __version__
+
+KEYWORD = {"type": "keyword"}
+LONG = {"type": "long"}
+DATE = {"type": "date"}
+
+# Explicit mapping of the ECS fields (event_data and userdata are left out,
+# see TEMPLATE_MAPPINGS)
+ECS_MAPPINGS = {
+    "properties": {
+        "@timestamp": DATE,
+        "event": {
+            "properties": {
+                "action": KEYWORD,
+                "category": KEYWORD,
+                "type": KEYWORD,
+                "kind": KEYWORD,
+                "provider": KEYWORD,
+                "module": KEYWORD,
+                "dataset": KEYWORD,
+                "code": LONG,
+                "created": DATE,
+            }
+        },
+        "winlog": {
+            "properties": {
+                "channel": KEYWORD,
+                "computer_name": KEYWORD,
+                "event_id": LONG,
+                "opcode": LONG,
+                "record_id": LONG,
+                "task": LONG,
+                "version": LONG,
+                "provider": {
+                    "properties": {
+                        "name": KEYWORD,
+                        "guid": KEYWORD,
+                    }
+                },
+            }
+        },
+        "process": {
+            "properties": {
+                "pid": LONG,
+                "thread": {"properties": {"id": LONG}},
+            }
+        },
+        "log": {"properties": {"file": {"properties": {"path": KEYWORD}}}},
+        "tags": KEYWORD,
+    }
+}
+
+# The keys of event_data and userdata depend on each provider and event: as
+# dynamic objects they add fields to the mapping with every new provider, up
+# to index.mapping.total_fields.limit. A flattened field maps a whole subtree
+# as one field whose leaves are searchable as keywords; values longer than
+# ignore_above stay in _source but are not indexed (Lucene terms are limited
+# to 32766 bytes, e.g. PowerShell ScriptBlockText).
+FLATTENED = {"type": "flattened", "ignore_above": 8191}
+
+TEMPLATE_MAPPINGS = {
+    "properties": {
+        **ECS_MAPPINGS["properties"],
+        "winlog": {
+            "properties": {
+                **ECS_MAPPINGS["properties"]["winlog"]["properties"],
+                "event_data": FLATTENED,
+            }
+        },
+        "userdata": FLATTENED,
+    }
+}
+
+
+def index_template(index_name: str) -> dict:
+    """Composable index template for the indices written by evtx2es.
+
+    Args:
+        index_name (str): Target index; the template matches it and `<index_name>-*`.
+
+    Returns:
+        dict: Arguments of `indices.put_index_template` (except the name).
+    """
+    return {
+        "index_patterns": [index_name, f"{index_name}-*"],
+        "priority": 200,
+        "template": {"mappings": TEMPLATE_MAPPINGS},
+        "meta": {"description": "evtx2es output schema", "version": __version__},
+    }
+
+
+# No refresh nor replication while loading; both are restored afterwards
+BULK_LOAD_SETTINGS = {
+    "index": {
+        "refresh_interval": "-1",
+        "number_of_replicas": 0,
+    }
+}
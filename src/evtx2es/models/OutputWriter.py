@@ -0,0 +1,105 @@
+# coding: utf-8
+import gzip
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+
+def open_compressed(path: Path) -> BinaryIO:
+    """Open a binary output stream, choosing the codec from the file suffix.
+
+    `.gz` is compressed with gzip, `.zst` with zstandard (requires the optional
+    `zstandard` package, or Python 3.14+), anything else is written as is.
+
+    Args:
+        path (Path): Output file path.
+
+    Returns:
+        BinaryIO: Writable binary stream.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".gz":
+        # level 6 matches the gzip command line default
+        return gzip.open(path, mode="wb", compresslevel=6)
+
+    if suffix == ".zst":
+        try:
+            import zstandard
+
+            return zstandard.ZstdCompressor(level=3).stream_writer(
+                path.open(mode="wb"), closefd=True
+            )
+        except ImportError:
+            pass
+        try:
+            from compression import zstd
+
+            return zstd.open(path, mode="wb", level=3)
+        except ImportError:
+            raise ImportError(
+                "zstd output requires the 'zstandard' package: pip install evtx2es[zstd]"
+            ) from None
+
+    return path.open(mode="wb", buffering=1024 * 1024)
+
+
+class OutputWriter:
+    """Streaming binary writer for converted records.
+
+    For compressed outputs, compression runs on a background thread fed through
+    a bounded queue, so it overlaps with `format_record` (gzip and zstandard
+    release the GIL while compressing).
+    """
+
+    def __init__(self, path: Path, queue_size: int = 8) -> None:
+        self.path = Path(path)
+        self.stream = open_compressed(self.path)
+        self.error: Optional[BaseException] = None
+        self.queue: Optional[queue.Queue] = None
+        self.thread: Optional[threading.Thread] = None
+
+        if self.path.suffix.lower() in (".gz", ".zst"):
+            self.queue = queue.Queue(maxsize=queue_size)
+            self.thread = threading.Thread(target=self.__consume, daemon=True)
+            self.thread.start()
+
+    def __consume(self) -> None:
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self.stream.write(data)
+            except BaseException as e:
+                self.error = e
+
+    def __raise_error(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def write(self, data: bytes) -> None:
+        self.__raise_error()
+        if self.queue is not None:
+            self.queue.put(data)
+        else:
+            self.stream.write(data)
+
+    def writelines(self, lines: Iterable[bytes]) -> None:
+        self.write(b"".join(lines))
+
+    def close(self) -> None:
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.stream.close()
+        self.__raise_error()
+
+    def __enter__(self) -> "OutputWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
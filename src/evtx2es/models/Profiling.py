@@ -0,0 +1,108 @@
+# coding: utf-8
+"""Opt-in cProfile profiling of the main process and of the pool workers.
+
+Each process writes its own profile (`main-<pid>.prof`, `worker-<pid>.prof`)
+to the profile directory, readable with `pstats` or snakeviz. Once the run
+is over, the profiles it wrote are merged into `summary.txt`, which lists
+the top functions by cumulative and by own time across every process.
+
+Workers start profiling in the pool initializer and write their profile
+when they exit, so a profiled pool must be closed (see
+`Evtx2es.shutdown_pool`), not terminated.
+"""
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from multiprocessing import util
+from pathlib import Path
+from typing import Generator, Optional
+
+SUMMARY_FILE = "summary.txt"
+
+
+def _profile_path(directory: Path, role: str) -> Path:
+    return Path(directory) / f"{role}-{os.getpid()}.prof"
+
+
+def _dump_profile(profiler: cProfile.Profile, path: Path) -> None:
+    profiler.disable()
+    profiler.dump_stats(str(path))
+
+
+def profile_worker(directory: Path) -> None:
+    """Profile this worker process until it exits. (in a pool initializer)
+
+    Args:
+        directory (Path): Profile directory.
+    """
+    profiler = cProfile.Profile()
+    # run by multiprocessing when the worker exits normally
+    util.Finalize(
+        None,
+        _dump_profile,
+        args=(profiler, _profile_path(directory, "worker")),
+        exitpriority=10,
+    )
+    profiler.enable()
+
+
+def write_summary(directory: Path, since: float = 0.0, top: int = 30) -> Path:
+    """Merge the profiles of a directory into its summary.
+
+    Args:
+        directory (Path): Profile directory.
+        since (float, optional): Only merge the profiles written after this
+            time (seconds since the epoch), i.e. those of the current run.
+        top (int, optional): Number of functions listed.
+
+    Returns:
+        Path: The summary file.
+    """
+    directory = Path(directory)
+    profiles = sorted(
+        path for path in directory.glob("*.prof") if path.stat().st_mtime >= since
+    )
+    output = io.StringIO()
+    output.write(f"{len(profiles)} profiles merged:\n")
+    output.writelines(f"  {path.name}\n" for path in profiles)
+    if profiles:
+        stats = pstats.Stats(*map(str, profiles), stream=output)
+        for sort_key in ("cumulative", "tottime"):
+            output.write(f"\nTop {top} functions by {sort_key} time\n")
+            stats.sort_stats(sort_key).print_stats(top)
+
+    summary = directory / SUMMARY_FILE
+    summary.write_text(output.getvalue())
+    return summary
+
+
+@contextmanager
+def profile(directory: Optional[Path]) -> Generator:
+    """Profile this process for the duration of the block.
+
+    Does nothing when `directory` is None. Otherwise the directory is created,
+    the profile of this process written to it and, after the block (by which
+    time the pools it used must have been shut down), the summary of every
+    profile written meanwhile.
+
+    Args:
+        directory (Path, optional): Profile directory.
+    """
+    if directory is None:
+        yield
+        return
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    # file times can be coarser than time.time()
+    start = int(time.time())
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        _dump_profile(profiler, _profile_path(directory, "main"))
+        write_summary(directory, since=start)
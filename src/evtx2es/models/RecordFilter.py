@@ -0,0 +1,175 @@
+# coding: utf-8
+from datetime import datetime, timezone
+from hashlib import sha1
+from typing import Callable, Iterable, Optional, Union
+
+import orjson
+
+from evtx2es.models.Evtx2es import get_raw_system_field
+
+
+def _to_system_time(value: Union[str, datetime]) -> str:
+    """Normalize a date to the SystemTime format, which sorts as a string.
+
+    Args:
+        value (Union[str, datetime]): datetime or ISO 8601 string; naive values are UTC.
+
+    Returns:
+        str: e.g. "2016-10-06T01:47:07.509504Z"
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class RecordFilter:
+    """Selects records on their System fields, before they are formatted.
+
+    Fields are read from the System object of the raw record (see
+    `get_raw_system_field`), so dropped records are never formatted. Every
+    criterion left to None matches everything. Provider and channel names are
+    case-insensitive, and the time window applies to the original (unshifted)
+    TimeCreated.
+
+    Args:
+        event_ids (Iterable[int], optional): Keep only these event IDs.
+        exclude_event_ids (Iterable[int], optional): Drop these event IDs.
+        providers (Iterable[str], optional): Keep only these providers.
+        exclude_providers (Iterable[str], optional): Drop these providers.
+        channels (Iterable[str], optional): Keep only these channels.
+        since (Union[str, datetime], optional): Keep records created at or after this time.
+        until (Union[str, datetime], optional): Keep records created before this time.
+    """
+
+    def __init__(
+        self,
+        event_ids: Optional[Iterable[int]] = None,
+        exclude_event_ids: Optional[Iterable[int]] = None,
+        providers: Optional[Iterable[str]] = None,
+        exclude_providers: Optional[Iterable[str]] = None,
+        channels: Optional[Iterable[str]] = None,
+        since: Optional[Union[str, datetime]] = None,
+        until: Optional[Union[str, datetime]] = None,
+    ) -> None:
+        def as_set(values, convert):
+            return frozenset(convert(value) for value in values) if values else None
+
+        # event ids are compared as the digits of `get_raw_system_field`
+        self.event_ids = as_set(event_ids, lambda x: str(int(x)))
+        self.exclude_event_ids = as_set(exclude_event_ids, lambda x: str(int(x)))
+        self.providers = as_set(providers, str.lower)
+        self.exclude_providers = as_set(exclude_providers, str.lower)
+        self.channels = as_set(channels, str.lower)
+        self.since = _to_system_time(since) if since else None
+        self.until = _to_system_time(until) if until else None
+
+    def is_empty(self) -> bool:
+        return not any(
+            (
+                self.event_ids,
+                self.exclude_event_ids,
+                self.providers,
+                self.exclude_providers,
+                self.channels,
+                self.since,
+                self.until,
+            )
+        )
+
+    def selection_key(self) -> str:
+        """Short hash of the criteria, empty when nothing is filtered.
+
+        Two filters selecting the same records have the same key, so state
+        kept per selection (checkpoints, incremental watermarks) is reused.
+        """
+        if self.is_empty():
+            return ""
+        criteria = [
+            sorted(values) if isinstance(values, frozenset) else values
+            for values in (
+                self.event_ids,
+                self.exclude_event_ids,
+                self.providers,
+                self.exclude_providers,
+                self.channels,
+                self.since,
+                self.until,
+            )
+        ]
+        return sha1(orjson.dumps(criteria)).hexdigest()[:16]
+
+    def __call__(self, record: dict) -> bool:
+        # event ids first: the most common and the most selective criterion
+        if self.event_ids is not None or self.exclude_event_ids is not None:
+            event_id = get_raw_system_field(record, "EventID")
+            if self.event_ids is not None and event_id not in self.event_ids:
+                return False
+            if self.exclude_event_ids is not None and event_id in self.exclude_event_ids:
+                return False
+
+        if self.providers is not None or self.exclude_providers is not None:
+            provider = (get_raw_system_field(record, "Provider") or "").lower()
+            if self.providers is not None and provider not in self.providers:
+                return False
+            if self.exclude_providers is not None and provider in self.exclude_providers:
+                return False
+
+        if self.channels is not None:
+            channel = (get_raw_system_field(record, "Channel") or "").lower()
+            if channel not in self.channels:
+                return False
+
+        if self.since is not None or self.until is not None:
+            system_time = get_raw_system_field(record, "SystemTime")
+            if system_time is None:
+                return False
+            if self.since is not None and system_time < self.since:
+                return False
+            if self.until is not None and system_time >= self.until:
+                return False
+
+        return True
+
+
+class AllFilters:
+    """Predicate passing the records accepted by every filter.
+
+    Unlike a lambda, it can be sent to worker processes.
+    """
+
+    def __init__(self, filters: tuple) -> None:
+        self.filters = filters
+
+    def __call__(self, record: dict) -> bool:
+        return all(f(record) for f in self.filters)
+
+    def merge(self, other: "AllFilters") -> None:
+        """Fold in the state of a copy (see `IncrementalFilter.merge`)."""
+        for mine, theirs in zip(self.filters, other.filters):
+            if hasattr(mine, "merge"):
+                mine.merge(theirs)
+
+
+def combine_filters(
+    *filters: Optional[Callable[[dict], bool]],
+) -> Optional[Callable[[dict], bool]]:
+    """Single predicate passing the records accepted by every given filter.
+
+    Args:
+        *filters (Optional[Callable[[dict], bool]]): Filters, None ones are ignored.
+
+    Returns:
+        Optional[Callable[[dict], bool]]: None when there is nothing to filter.
+    """
+    filters = tuple(
+        f
+        for f in filters
+        if f is not None and not (isinstance(f, RecordFilter) and f.is_empty())
+    )
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return AllFilters(filters)
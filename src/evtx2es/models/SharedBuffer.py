@@ -0,0 +1,106 @@
+# coding: utf-8
+import secrets
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple, Optional, Set, Union
+
+
+class SharedBuffer(NamedTuple):
+    """Handle of bytes left by a worker process in a shared memory block.
+
+    Only the handle goes through the pool's result pipe: the bytes are not
+    pickled, and are copied once from the block by the receiving process.
+    """
+
+    name: str
+    size: int
+
+
+def _create(size: int, name: Optional[str] = None) -> shared_memory.SharedMemory:
+    # The receiving process releases the block: the resource tracker of the
+    # worker must not unlink it when the worker exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=True, size=size, track=False)
+    block = shared_memory.SharedMemory(name, create=True, size=size)
+    resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _unlink(name: str) -> None:
+    try:
+        block = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+def send_bytes(
+    data: bytes, use_shared_memory: bool, name: Optional[str] = None
+) -> Union[bytes, SharedBuffer]:
+    """Payload carrying `data` back to the main process.
+
+    Args:
+        data (bytes): Serialized records.
+        use_shared_memory (bool): Hand the bytes over in a shared memory block.
+        name (str, optional): Name of the block, reserved by the receiving
+            process (see `SegmentTracker`); a random one by default.
+
+    Returns:
+        Union[bytes, SharedBuffer]: `data` itself, or the handle of the block.
+    """
+    if not use_shared_memory:
+        return data
+    if not data:
+        # no block, but the handle still tells the name is not in use
+        return SharedBuffer(name, 0) if name else data
+    block = _create(len(data), name)
+    block.buf[: len(data)] = data
+    buffer = SharedBuffer(block.name, len(data))
+    block.close()
+    return buffer
+
+
+def receive_bytes(payload: Union[bytes, SharedBuffer]) -> bytes:
+    """Bytes of a `send_bytes` payload; a shared memory block is released."""
+    if not isinstance(payload, SharedBuffer):
+        return payload
+    if not payload.size:
+        return b""
+    block = shared_memory.SharedMemory(payload.name)
+    try:
+        return bytes(block.buf[: payload.size])
+    finally:
+        block.close()
+        block.unlink()
+
+
+class SegmentTracker:
+    """Names of the shared memory blocks of tasks whose result was not received.
+
+    The process submitting the tasks reserves a name for each of them, and
+    forgets it once the result is received. The blocks of the tasks that were
+    abandoned (or interrupted) are unlinked by `release`, once the workers
+    that could still create them are gone.
+    """
+
+    def __init__(self) -> None:
+        self.names: Set[str] = set()
+
+    def reserve(self) -> str:
+        """Name of the block of a new task."""
+        # short: POSIX names are limited to 31 characters on macOS
+        name = f"evtx2es_{secrets.token_hex(8)}"
+        self.names.add(name)
+        return name
+
+    def receive(self, payload: Union[bytes, SharedBuffer]) -> bytes:
+        """`receive_bytes` of the result of a task."""
+        if isinstance(payload, SharedBuffer):
+            self.names.discard(payload.name)
+        return receive_bytes(payload)
+
+    def release(self) -> None:
+        """Unlink the blocks left by the tasks whose result was not received."""
+        while self.names:
+            _unlink(self.names.pop())
@@ -0,0 +1,116 @@
+# coding: utf-8
+"""Counters and per-stage timers of a conversion or an import.
+
+Stages are timed per chunk or per request, never per record, so collecting
+stats costs little next to the work measured. Worker processes fill their
+own `Stats` for each task and send it back with the task result, where it
+is merged into the run's one.
+
+Stages:
+    parse       records read from `records_json()` (Rust parser)
+    loads       `orjson.loads` of the event data
+    format      `RecordFormatter` on the decoded events
+    hash        document ids
+    serialize   `orjson.dumps` of the output (NDJSON lines, `_bulk` items)
+    bulk        `_bulk` requests, i.e. their latency
+    run         the whole run (one call)
+"""
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import orjson
+
+STATS_FORMATS = ("json", "prometheus")
+
+
+class Stats:
+    """Counters and stage timers, mergeable across processes and threads."""
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, int] = {}
+        # stage: [calls, seconds, max seconds of a call]
+        self.stages: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        return {"counters": self.counters, "stages": self.stages}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+        self.counters = state["counters"]
+        self.stages = state["stages"]
+
+    def add(self, name: str, value: int = 1) -> None:
+        """Increment a counter."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1) -> None:
+        """Account `seconds` spent in `stage`, over `calls` calls."""
+        with self.lock:
+            timer = self.stages.get(stage)
+            if timer is None:
+                self.stages[stage] = [calls, seconds, seconds]
+            else:
+                timer[0] += calls
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    def merge(self, other: "Stats") -> None:
+        """Add the counters and timers of `other` (e.g. from a worker task)."""
+        for name, value in other.counters.items():
+            self.add(name, value)
+        with self.lock:
+            for stage, (calls, seconds, longest) in other.stages.items():
+                timer = self.stages.setdefault(stage, [0, 0.0, 0.0])
+                timer[0] += calls
+                timer[1] += seconds
+                timer[2] = max(timer[2], longest)
+
+    def to_dict(self) -> dict:
+        """JSON summary: counters, then calls, total and max seconds of each stage."""
+        with self.lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "stages": {
+                    stage: {"calls": calls, "seconds": seconds, "max_seconds": longest}
+                    for stage, (calls, seconds, longest) in sorted(self.stages.items())
+                },
+            }
+
+    def to_prometheus(self, prefix: str = "evtx2es") -> str:
+        """Prometheus text exposition format of `to_dict`."""
+        summary = self.to_dict()
+        lines = []
+        for name, value in summary["counters"].items():
+            metric = f"{prefix}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for metric, key, kind in (
+            ("stage_calls_total", "calls", "counter"),
+            ("stage_seconds_total", "seconds", "counter"),
+            ("stage_max_seconds", "max_seconds", "gauge"),
+        ):
+            if summary["stages"]:
+                lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for stage, values in summary["stages"].items():
+                lines.append(f'{prefix}_{metric}{{stage="{stage}"}} {values[key]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path, stats_format: str = "json") -> None:
+        """Write the summary to `path`.
+
+        Args:
+            path (Path): Output file.
+            stats_format (str, optional): One of `STATS_FORMATS`.
+        """
+        if stats_format not in STATS_FORMATS:
+            raise ValueError(
+                f"Unknown stats format: {stats_format!r} "
+                f"(expected one of {', '.join(STATS_FORMATS)})"
+            )
+        if stats_format == "prometheus":
+            data = self.to_prometheus().encode()
+        else:
+            data = orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2) + b"\n"
+        Path(path).write_bytes(data)
@@ -0,0 +1,250 @@
+# coding: utf-8
+import asyncio
+import threading
+import traceback
+from contextlib import closing
+from datetime import timedelta
+from typing import Any, List, Union, Callable, Optional
+from pathlib import Path
+
+from evtx2es.models.Evtx2es import Evtx2es
+from evtx2es.models.AsyncElasticsearchUtils import AsyncElasticsearchUtils
+from evtx2es.models.DeadLetter import DeadLetterQueue
+from evtx2es.models.ElasticsearchUtils import gen_actions
+from evtx2es.models.RecordFilter import RecordFilter, combine_filters
+
+
+def failed_action_info(action: dict, error: Exception) -> dict:
+    """Bulk result of an action whose request raised, as for a refused document."""
+    item = {
+        "_index": action.get("_index"),
+        "_id": action.get("_id"),
+        "status": None,
+        "error": str(error),
+        "data": action.get("_source"),
+    }
+    if action.get("pipeline"):
+        item["pipeline"] = action["pipeline"]
+    return {"index": item}
+
+
+class AsyncEvtx2esPresenter:
+    """asyncio counterpart of `Evtx2esPresenter`.
+
+    Parsing and formatting run on an executor thread, which feeds the event
+    loop through a queue bounded to `queue_size` batches; `bulk_concurrency`
+    tasks send bulk requests concurrently. The event loop is never blocked,
+    so several files can be imported at once with `asyncio.gather`.
+    """
+
+    def __init__(
+        self,
+        input_path: Path,
+        host: str = "localhost",
+        port: int = 9200,
+        index: str = "evtx2es",
+        scheme: str = "http",
+        pipeline: str = "",
+        shift: Union[str, timedelta] = "0",
+        login: str = "",
+        pwd: str = "",
+        is_quiet: bool = False,
+        multiprocess: bool = False,
+        chunk_size: int = 500,
+        additional_tags: List[str] = None,
+        max_inflight: Optional[int] = None,
+        parser_threads: int = 0,
+        parse_in_workers: bool = False,
+        batch_size: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+        bulk_concurrency: int = 4,
+        bulk_size: int = 500,
+        bulk_bytes: int = 100 * 1024 * 1024,
+        id_strategy: str = "content",
+        record_filter: Optional[RecordFilter] = None,
+        http_compress: bool = False,
+        max_retries: int = 3,
+        initial_backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        queue_size: int = 8,
+        dead_letter: Optional[DeadLetterQueue] = None,
+        logger: Optional[Callable[[str, bool], None]] = None,
+        es: Optional[AsyncElasticsearchUtils] = None,
+        pool: Any = None,
+    ):
+        self.input_path = input_path
+        self.host = host
+        self.port = port
+        self.index = index
+        self.scheme = scheme
+        self.pipeline = pipeline
+        self.shift = shift
+        self.login = login
+        self.pwd = pwd
+        self.is_quiet = is_quiet
+        self.multiprocess = multiprocess
+        self.chunk_size = chunk_size
+        self.additional_tags = additional_tags
+        self.max_inflight = max_inflight
+        self.parser_threads = parser_threads
+        self.parse_in_workers = parse_in_workers
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.bulk_concurrency = bulk_concurrency
+        self.bulk_size = bulk_size
+        self.bulk_bytes = bulk_bytes
+        self.id_strategy = id_strategy
+        self.record_filter = record_filter
+        self.http_compress = http_compress
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.queue_size = queue_size
+        self.dead_letter = dead_letter
+        self.logger = logger
+        # Shared resources (reused across files when given)
+        self.es = es
+        self.pool = pool
+        # Failures of the import: a count and the first few, the rest goes
+        # to the dead-letter file (if any)
+        self.failed_count = 0
+        self.failed_samples: List[dict] = []
+
+    def evtx2es(self):
+        r = Evtx2es(self.input_path, self.parser_threads)
+        return r.gen_records(
+            shift=self.shift,
+            multiprocess=self.multiprocess,
+            chunk_size=self.chunk_size,
+            additional_tags=self.additional_tags,
+            max_inflight=self.max_inflight,
+            pool=self.pool,
+            batch_size=self.batch_size,
+            batch_bytes=self.batch_bytes,
+            id_strategy=self.id_strategy if self.id_strategy != "none" else None,
+            record_filter=combine_filters(self.record_filter),
+            parse_in_workers=self.parse_in_workers,
+        )
+
+    def record_failure(self, info: dict) -> None:
+        self.failed_count += 1
+        if len(self.failed_samples) < 3:  # Show first 3 failures
+            op_type, item = next(iter(info.items()))
+            self.failed_samples.append(
+                {op_type: {k: v for k, v in item.items() if k != "data"}}
+            )
+        if self.dead_letter is not None:
+            self.dead_letter.add(info)
+
+    async def bulk_import(self) -> int:
+        es = self.es or AsyncElasticsearchUtils(
+            hostname=self.host,
+            port=self.port,
+            scheme=self.scheme,
+            login=self.login,
+            pwd=self.pwd,
+            connections_per_node=self.bulk_concurrency,
+            http_compress=self.http_compress,
+            max_retries=self.max_retries,
+            initial_backoff=self.initial_backoff,
+            max_backoff=self.max_backoff,
+        )
+        loop = asyncio.get_running_loop()
+
+        # The producer thread takes a slot per batch, consumers give it back:
+        # the queue itself is unbounded so the event loop never waits on it
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(self.queue_size)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                with closing(self.evtx2es()) as batches:
+                    for records in batches:
+                        while not slots.acquire(timeout=0.1):
+                            if stop.is_set():
+                                return
+                        loop.call_soon_threadsafe(queue.put_nowait, records)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        async def gen_batches():
+            nonlocal batch_count
+            while True:
+                records = await queue.get()
+                if records is None:
+                    # let the other consumers stop as well
+                    queue.put_nowait(None)
+                    return
+                slots.release()
+                batch_count += 1
+                yield records
+
+        async def consume():
+            nonlocal total_success
+            # One batch at a time: a bulk call raising only fails its own batch
+            async for records in gen_batches():
+                actions = list(
+                    gen_actions(records, self.index, self.pipeline, self.id_strategy)
+                )
+                results = 0
+                acknowledged = set()
+                try:
+                    async for ok, info in es.streaming_bulk_actions(
+                        actions,
+                        chunk_size=self.bulk_size,
+                        max_chunk_bytes=self.bulk_bytes,
+                    ):
+                        results += 1
+                        acknowledged.add(next(iter(info.values())).get("_id"))
+                        if ok:
+                            total_success += 1
+                        else:
+                            self.record_failure(info)
+
+                except Exception as e:
+                    if self.logger:
+                        self.logger("Error occurred during bulk indexing", self.is_quiet)
+                    traceback.print_exc()
+                    if all("_id" in action for action in actions):
+                        lost = [a for a in actions if a["_id"] not in acknowledged]
+                    else:
+                        # ids generated by Elasticsearch: results come in order
+                        lost = actions[results:]
+                    for action in lost:
+                        self.record_failure(failed_action_info(action, e))
+
+        # Buffer for collecting results
+        total_success = 0
+        batch_count = 0
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            await asyncio.gather(*(consume() for _ in range(self.bulk_concurrency)))
+        finally:
+            stop.set()
+            # re-raises parsing errors
+            await producer
+            if self.es is None:
+                await es.close()
+
+        if self.logger:
+            self.logger(
+                f"Bulk import completed: {batch_count} batches processed", self.is_quiet
+            )
+            self.logger(
+                f"Successfully indexed: {total_success} documents", self.is_quiet
+            )
+            if self.failed_count:
+                self.logger(
+                    f"Failed to index: {self.failed_count} documents", self.is_quiet
+                )
+                for failure in self.failed_samples:
+                    self.logger(f"Error: {failure}", self.is_quiet)
+                if self.dead_letter is not None:
+                    self.logger(
+                        f"Failed documents written to {self.dead_letter.path}",
+                        self.is_quiet,
+                    )
+
+        return total_success
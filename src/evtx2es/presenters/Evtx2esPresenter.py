@@ -1,13 +1,19 @@
 # coding: utf-8
 import traceback
-from datetime import datetime
-from typing import List, Union, Callable, Optional
+from collections import deque
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import Any, List, Union, Callable, Optional
 from pathlib import Path
 
 from tqdm import tqdm
 
-from evtx2es.models.Evtx2es import Evtx2es
+from evtx2es.models.Evtx2es import Evtx2es, get_serialized_record_id
 from evtx2es.models.ElasticsearchUtils import ElasticsearchUtils
+from evtx2es.models.Checkpoint import CheckpointStore, FileCheckpoint, IncrementalState
+from evtx2es.models.DeadLetter import DeadLetterQueue
+from evtx2es.models.RecordFilter import RecordFilter, combine_filters
+from evtx2es.models.Stats import Stats
 
 
 class Evtx2esPresenter:
@@ -20,14 +26,37 @@ class Evtx2esPresenter:
         index: str = "evtx2es",
         scheme: str = "http",
         pipeline: str = "",
-        shift: Union[str, datetime] = "0",
+        shift: Union[str, timedelta] = "0",
         login: str = "",
         pwd: str = "",
         is_quiet: bool = False,
         multiprocess: bool = False,
         chunk_size: int = 500,
         additional_tags: List[str] = None,
+        max_inflight: Optional[int] = None,
+        parser_threads: int = 0,
+        parse_in_workers: bool = False,
+        batch_size: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+        bulk_threads: int = 1,
+        bulk_size: int = 500,
+        bulk_bytes: int = 100 * 1024 * 1024,
+        id_strategy: str = "content",
+        http_compress: bool = False,
+        max_retries: int = 3,
+        initial_backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        bulk_load: bool = False,
+        install_template: bool = False,
         logger: Optional[Callable[[str, bool], None]] = None,
+        es: Optional[ElasticsearchUtils] = None,
+        pool: Any = None,
+        checkpoint: Optional[CheckpointStore] = None,
+        incremental: Optional[IncrementalState] = None,
+        record_filter: Optional[RecordFilter] = None,
+        dead_letter: Optional[DeadLetterQueue] = None,
+        stats: Optional[Stats] = None,
+        profile_dir: Optional[Path] = None,
     ):
         self.input_path = input_path
         self.host = host
@@ -42,52 +71,224 @@ class Evtx2esPresenter:
         self.multiprocess = multiprocess
         self.chunk_size = chunk_size
         self.additional_tags = additional_tags
+        self.max_inflight = max_inflight
+        self.parser_threads = parser_threads
+        self.parse_in_workers = parse_in_workers
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.bulk_threads = bulk_threads
+        self.bulk_size = bulk_size
+        self.bulk_bytes = bulk_bytes
+        self.id_strategy = id_strategy
+        self.http_compress = http_compress
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.bulk_load = bulk_load
+        self.install_template = install_template
         self.logger = logger
+        # Shared resources (reused across files when given)
+        self.es = es
+        self.pool = pool
+        self.checkpoint = checkpoint
+        self.incremental = incremental
+        self.record_filter = record_filter
+        self.dead_letter = dead_letter
+        self.stats = stats
+        self.profile_dir = profile_dir
+        # Failures of the import: a count and the first few, the rest goes
+        # to the dead-letter file (if any)
+        self.failed_count = 0
+        self.failed_samples: List[dict] = []
 
-    def evtx2es(self) -> List[List[dict]]:
-        r = Evtx2es(self.input_path)
-        generator = (
-            r.gen_records(
-                self.shift, self.multiprocess, self.chunk_size, self.additional_tags
-            )
-            if self.is_quiet
-            else tqdm(
-                r.gen_records(
-                    self.shift, self.multiprocess, self.chunk_size, self.additional_tags
-                )
-            )
+    def evtx2es(
+        self, skip_records: int = 0, record_filter: Optional[Callable[[dict], bool]] = None
+    ) -> List[List[bytes]]:
+        # Batches of `_bulk` items (action and source lines) serialized where the
+        # records are formatted: this process posts them without touching them
+        r = Evtx2es(self.input_path, self.parser_threads)
+        generator = r.gen_records(
+            shift=self.shift,
+            multiprocess=self.multiprocess,
+            chunk_size=self.chunk_size,
+            additional_tags=self.additional_tags,
+            max_inflight=self.max_inflight,
+            pool=self.pool,
+            batch_size=self.batch_size,
+            batch_bytes=self.batch_bytes,
+            # ids are computed next to format_record (in the workers with -m)
+            id_strategy=self.id_strategy if self.id_strategy != "none" else None,
+            skip_records=skip_records,
+            record_filter=record_filter,
+            parse_in_workers=self.parse_in_workers,
+            serialized=True,
+            bulk_index=self.index,
+            bulk_pipeline=self.pipeline,
+            stats=self.stats,
+            profile_dir=self.profile_dir,
         )
+        if not self.is_quiet:
+            generator = tqdm(generator)
 
-        buffer: List[List[dict]] = generator
+        buffer: List[List[bytes]] = generator
         return buffer
 
-    def bulk_import(self):
-        es = ElasticsearchUtils(
+    def bulk_import(self) -> int:
+        es = self.es or ElasticsearchUtils(
             hostname=self.host,
             port=self.port,
             scheme=self.scheme,
             login=self.login,
             pwd=self.pwd,
+            connections_per_node=self.bulk_threads,
+            http_compress=self.http_compress,
+            max_retries=self.max_retries,
+            initial_backoff=self.initial_backoff,
+            max_backoff=self.max_backoff,
+            stats=self.stats,
         )
 
+        # Before bulk_load may create the index, so that the template applies
+        if self.install_template:
+            es.install_template(self.index)
+
+        # No refresh nor replicas while loading, restored even on failure
+        with es.bulk_load(self.index) if self.bulk_load else nullcontext():
+            return self.__bulk_import(es)
+
+    def record_failure(self, info: dict) -> None:
+        self.failed_count += 1
+        if len(self.failed_samples) < 3:  # Show first 3 failures
+            op_type, item = next(iter(info.items()))
+            self.failed_samples.append(
+                {op_type: {k: v for k, v in item.items() if k != "data"}}
+            )
+        if self.dead_letter is not None:
+            self.dead_letter.add(info)
+
+    def __bulk_import(self, es: ElasticsearchUtils) -> int:
+        # Progress and watermarks are kept per record selection
+        selection = self.record_filter.selection_key() if self.record_filter else ""
+
+        # Resume from the records already acknowledged in a previous run
+        checkpoint: Optional[FileCheckpoint] = None
+        if self.checkpoint is not None:
+            checkpoint = self.checkpoint.open(
+                self.input_path,
+                "+".join(filter(None, (selection, self.incremental and "incremental"))),
+            )
+            if checkpoint.completed:
+                if self.logger:
+                    self.logger(
+                        f"Skipping {self.input_path}: already imported", self.is_quiet
+                    )
+                return 0
+            if checkpoint.records and self.logger:
+                self.logger(
+                    f"Resuming {self.input_path} after {checkpoint.records} records "
+                    f"(record_id {checkpoint.record_id})",
+                    self.is_quiet,
+                )
+        skip_records = checkpoint.records if checkpoint else 0
+
+        # Only the selected records newer than the last run, dropped before formatting
+        incremental_filter = (
+            self.incremental.filter(selection) if self.incremental else None
+        )
+        # the selection first: the incremental filter only sees the selected records
+        record_filter = combine_filters(self.record_filter, incremental_filter)
+
         # Buffer for collecting results
         total_success = 0
-        total_failed = []
         batch_count = 0
+        has_error = False
+        # a dead-lettered document is handled: the checkpoint can move past it
+        dead_lettered = self.dead_letter is not None
+
+        if self.bulk_threads > 1:
+            # record_id of each document sent, to match the in-order results
+            pending_ids: deque = deque()
+
+            # Several bulk requests in flight; formatting continues while they wait
+            def gen_records():
+                nonlocal batch_count
+                for records in self.evtx2es(skip_records, record_filter):
+                    batch_count += 1
+                    if checkpoint:
+                        pending_ids.extend(map(get_serialized_record_id, records))
+                    yield from records
 
-        for records in self.evtx2es():
             try:
-                success, failed = es.bulk_indice(records, self.index, self.pipeline)
-                total_success += success
-                if failed:
-                    total_failed.extend(failed)
-                batch_count += 1
+                for ok, info in es.bulk_actions(
+                    gen_records(),
+                    thread_count=self.bulk_threads,
+                    chunk_size=self.bulk_size,
+                    max_chunk_bytes=self.bulk_bytes,
+                    serialized=True,
+                ):
+                    if ok:
+                        total_success += 1
+                    else:
+                        self.record_failure(info)
+                    if checkpoint:
+                        record_id = pending_ids.popleft()
+                        if ok or dead_lettered:
+                            checkpoint.acknowledge(1, record_id)
+                        else:
+                            checkpoint.fail()
 
             except Exception:
+                has_error = True
+                if checkpoint:
+                    checkpoint.fail()
                 if self.logger:
                     self.logger("Error occurred during bulk indexing", self.is_quiet)
                 traceback.print_exc()
 
+        else:
+            for records in self.evtx2es(skip_records, record_filter):
+                try:
+                    success, failed = es.bulk_serialized(
+                        records,
+                        chunk_size=self.bulk_size,
+                        max_chunk_bytes=self.bulk_bytes,
+                    )
+                    total_success += success
+                    for info in failed:
+                        self.record_failure(info)
+                    batch_count += 1
+                    if checkpoint:
+                        if failed and not dead_lettered:
+                            checkpoint.fail()
+                        else:
+                            checkpoint.acknowledge(
+                                len(records),
+                                max(
+                                    filter(
+                                        None, map(get_serialized_record_id, records)
+                                    ),
+                                    default=None,
+                                ),
+                            )
+
+                except Exception:
+                    has_error = True
+                    if checkpoint:
+                        checkpoint.fail()
+                    if self.logger:
+                        self.logger("Error occurred during bulk indexing", self.is_quiet)
+                    traceback.print_exc()
+
+        if checkpoint:
+            checkpoint.finish()
+        # Advance only when everything was indexed, the next run retries otherwise
+        if (
+            incremental_filter is not None
+            and not has_error
+            and (dead_lettered or not self.failed_count)
+        ):
+            self.incremental.commit(incremental_filter)
+
         # Log summary results after tqdm completes
         if self.logger:
             self.logger(
@@ -96,9 +297,16 @@ class Evtx2esPresenter:
             self.logger(
                 f"Successfully indexed: {total_success} documents", self.is_quiet
             )
-            if total_failed:
+            if self.failed_count:
                 self.logger(
-                    f"Failed to index: {len(total_failed)} documents", self.is_quiet
+                    f"Failed to index: {self.failed_count} documents", self.is_quiet
                 )
-                for failure in total_failed[:3]:  # Show first 3 failures
+                for failure in self.failed_samples:
                     self.logger(f"Error: {failure}", self.is_quiet)
+                if self.dead_letter is not None:
+                    self.logger(
+                        f"Failed documents written to {self.dead_letter.path}",
+                        self.is_quiet,
+                    )
+
+        return total_success
@@ -1,11 +1,14 @@
 # coding: utf-8
-from datetime import datetime
+from datetime import timedelta
 from itertools import chain
 from pathlib import Path
-from typing import List, Union
+from typing import Generator, List, Optional, Union
 
 import orjson
 from evtx2es.models.Evtx2es import Evtx2es
+from evtx2es.models.OutputWriter import OutputWriter
+from evtx2es.models.RecordFilter import RecordFilter, combine_filters
+from evtx2es.models.Stats import Stats
 from tqdm import tqdm
 
 
@@ -14,42 +17,96 @@ class Evtx2jsonPresenter:
         self,
         input_path: str,
         output_path: str,
-        shift: Union[str, datetime] = "0",
+        shift: Union[str, timedelta] = "0",
         is_quiet: bool = False,
         multiprocess: bool = False,
         chunk_size: int = 500,
         additional_tags: List[str] = None,
+        max_inflight: Optional[int] = None,
+        parser_threads: int = 0,
+        parse_in_workers: bool = False,
+        batch_size: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+        output_format: str = "json",
+        record_filter: Optional[RecordFilter] = None,
+        stats: Optional[Stats] = None,
+        profile_dir: Optional[Path] = None,
     ):
         self.input_path = Path(input_path).resolve()
+        self.output_format = output_format
         self.output_path = (
             Path(output_path)
             if output_path
-            else Path(self.input_path).with_suffix(".json")
+            else Path(self.input_path).with_suffix(f".{output_format}")
         )
         self.shift = shift
         self.is_quiet = is_quiet
         self.multiprocess = multiprocess
         self.chunk_size = chunk_size
         self.additional_tags = additional_tags
+        self.max_inflight = max_inflight
+        self.parser_threads = parser_threads
+        self.parse_in_workers = parse_in_workers
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.record_filter = record_filter
+        self.stats = stats
+        self.profile_dir = profile_dir
 
-    def evtx2json(self) -> List[dict]:
-        r = Evtx2es(self.input_path)
-        generator = (
-            r.gen_records(
-                self.shift, self.multiprocess, self.chunk_size, self.additional_tags
-            )
-            if self.is_quiet
-            else tqdm(
-                r.gen_records(
-                    self.shift, self.multiprocess, self.chunk_size, self.additional_tags
-                )
-            )
+    def gen_records(self, serialized: bool = False) -> Generator:
+        r = Evtx2es(self.input_path, self.parser_threads)
+        generator = r.gen_records(
+            shift=self.shift,
+            multiprocess=self.multiprocess,
+            chunk_size=self.chunk_size,
+            additional_tags=self.additional_tags,
+            max_inflight=self.max_inflight,
+            batch_size=self.batch_size,
+            batch_bytes=self.batch_bytes,
+            record_filter=combine_filters(self.record_filter),
+            parse_in_workers=self.parse_in_workers,
+            serialized=serialized,
+            stats=self.stats,
+            profile_dir=self.profile_dir,
         )
+        if not self.is_quiet:
+            generator = tqdm(generator)
+
+        return generator
 
-        buffer: List[dict] = list(chain.from_iterable(generator))
+    def evtx2json(self) -> List[dict]:
+        buffer: List[dict] = list(chain.from_iterable(self.gen_records()))
         return buffer
 
+    def export_ndjson(self, writer: OutputWriter):
+        # Lines are serialized next to the formatting (in the workers with -m)
+        for lines in self.gen_records(serialized=True):
+            writer.writelines(lines)
+
+    def export_indented_json(self, writer: OutputWriter):
+        # Same bytes as orjson.dumps(records, option=OPT_INDENT_2), one batch at a
+        # time: a single write (and handoff to the compressor) per batch
+        started = False
+        for records in self.gen_records():
+            if not records:
+                continue
+            writer.write(
+                (b",\n  " if started else b"[\n  ")
+                + b",\n  ".join(
+                    orjson.dumps(record, option=orjson.OPT_INDENT_2).replace(
+                        b"\n", b"\n  "
+                    )
+                    for record in records
+                )
+            )
+            started = True
+        writer.write(b"\n]" if started else b"[]")
+
     def export_json(self):
-        self.output_path.write_text(
-            orjson.dumps(self.evtx2json(), option=orjson.OPT_INDENT_2).decode("utf-8")
-        )
+        # Write each batch as soon as it is produced; memory stays constant.
+        # The codec (.gz/.zst) is chosen from the output file suffix.
+        with OutputWriter(self.output_path) as writer:
+            if self.output_format == "ndjson":
+                self.export_ndjson(writer)
+            else:
+                self.export_indented_json(writer)
@@ -0,0 +1,75 @@
+# coding: utf-8
+import traceback
+from typing import Callable, Optional
+from pathlib import Path
+
+from tqdm import tqdm
+
+from evtx2es.models.DeadLetter import DeadLetterQueue, read_dead_letters
+from evtx2es.models.ElasticsearchUtils import ElasticsearchUtils
+
+
+class ReplayPresenter:
+    """Send again the documents recorded in a dead-letter file.
+
+    Documents go to the index and pipeline they were sent to originally;
+    those failing again are written to `dead_letter` (if given).
+    """
+
+    def __init__(
+        self,
+        input_path: Path,
+        es: ElasticsearchUtils,
+        is_quiet: bool = False,
+        bulk_threads: int = 1,
+        bulk_size: int = 500,
+        bulk_bytes: int = 100 * 1024 * 1024,
+        dead_letter: Optional[DeadLetterQueue] = None,
+        logger: Optional[Callable[[str, bool], None]] = None,
+    ):
+        self.input_path = input_path
+        self.es = es
+        self.is_quiet = is_quiet
+        self.bulk_threads = bulk_threads
+        self.bulk_size = bulk_size
+        self.bulk_bytes = bulk_bytes
+        self.dead_letter = dead_letter
+        self.logger = logger
+
+    def replay(self) -> int:
+        actions = read_dead_letters(self.input_path)
+        if not self.is_quiet:
+            actions = tqdm(actions, unit="docs")
+
+        total_success = 0
+        failed_count = 0
+        try:
+            for ok, info in self.es.bulk_actions(
+                actions,
+                thread_count=self.bulk_threads,
+                chunk_size=self.bulk_size,
+                max_chunk_bytes=self.bulk_bytes,
+            ):
+                if ok:
+                    total_success += 1
+                else:
+                    failed_count += 1
+                    if self.dead_letter is not None:
+                        self.dead_letter.add(info)
+
+        except Exception:
+            if self.logger:
+                self.logger("Error occurred during bulk indexing", self.is_quiet)
+            traceback.print_exc()
+
+        if self.logger:
+            self.logger(
+                f"Replayed {self.input_path}: {total_success} documents indexed",
+                self.is_quiet,
+            )
+            if failed_count:
+                self.logger(
+                    f"Failed to index: {failed_count} documents", self.is_quiet
+                )
+
+        return total_success
@@ -2,8 +2,19 @@
 import argparse
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
+from pathlib import Path
 
 from evtx2es.__about__ import __version__
+from evtx2es.models.RecordFilter import RecordFilter
+from evtx2es.models.Stats import STATS_FORMATS, Stats
+
+
+def comma_separated(value: str) -> list:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def comma_separated_ints(value: str) -> list:
+    return [int(item) for item in comma_separated(value)]
 
 
 class BaseView(metaclass=ABCMeta):
@@ -35,6 +46,35 @@ class BaseView(metaclass=ABCMeta):
             default=500,
             help="size of the chunk to be processed for each process.",
         )
+        self.parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="number of records per output batch (default: same as --size).",
+        )
+        self.parser.add_argument(
+            "--batch-bytes",
+            type=int,
+            default=None,
+            help="approximate byte budget per output batch, measured on the raw event data.",
+        )
+        self.parser.add_argument(
+            "--max-inflight",
+            type=int,
+            default=None,
+            help="maximum number of chunks in flight with --multiprocess (default: twice the CPU count).",
+        )
+        self.parser.add_argument(
+            "--parser-threads",
+            type=int,
+            default=0,
+            help="number of threads used by the EVTX parser itself (default: 0, all cores).",
+        )
+        self.parser.add_argument(
+            "--parse-in-workers",
+            action="store_true",
+            help="with --multiprocess, each worker reads and parses its own EVTX chunks; the main process only locates them.",
+        )
         self.parser.add_argument(
             "--tags",
             default="",
@@ -45,6 +85,69 @@ class BaseView(metaclass=ABCMeta):
             default=None,
             help="Date of latest record in dataset from TimeCreated record - MM/DD/YYYY.HH:MM:SS",
         )
+        self.parser.add_argument(
+            "--stats-file",
+            type=Path,
+            default=None,
+            help="write a summary of the run (counters, and time spent in each stage by this process and the workers) to this file.",
+        )
+        self.parser.add_argument(
+            "--stats-format",
+            choices=list(STATS_FORMATS),
+            default="json",
+            help="format of --stats-file: json (default) or prometheus (text exposition format).",
+        )
+        self.parser.add_argument(
+            "--profile",
+            type=Path,
+            default=None,
+            metavar="DIR",
+            help="profile this process and every worker with cProfile: one profile per process, and a merged summary.txt of the top functions, in this directory.",
+        )
+
+        filters = self.parser.add_argument_group(
+            "record filters", "evaluated on the raw records, before they are formatted"
+        )
+        filters.add_argument(
+            "--event-id",
+            type=comma_separated_ints,
+            default=None,
+            help="comma-separated event IDs to keep (e.g. 4624,4688,7045).",
+        )
+        filters.add_argument(
+            "--exclude-event-id",
+            type=comma_separated_ints,
+            default=None,
+            help="comma-separated event IDs to drop.",
+        )
+        filters.add_argument(
+            "--provider",
+            type=comma_separated,
+            default=None,
+            help="comma-separated provider names to keep (case-insensitive).",
+        )
+        filters.add_argument(
+            "--exclude-provider",
+            type=comma_separated,
+            default=None,
+            help="comma-separated provider names to drop (case-insensitive).",
+        )
+        filters.add_argument(
+            "--channel",
+            type=comma_separated,
+            default=None,
+            help="comma-separated channel names to keep (case-insensitive).",
+        )
+        filters.add_argument(
+            "--since",
+            default=None,
+            help="keep records created at or after this ISO 8601 time (UTC unless an offset is given).",
+        )
+        filters.add_argument(
+            "--until",
+            default=None,
+            help="keep records created before this ISO 8601 time (UTC unless an offset is given).",
+        )
 
     def get_shift_and_tags(self):
         # shift timestamp
@@ -63,6 +166,28 @@ class BaseView(metaclass=ABCMeta):
 
         return shift, additional_tags
 
+    def get_record_filter(self):
+        record_filter = RecordFilter(
+            event_ids=self.args.event_id,
+            exclude_event_ids=self.args.exclude_event_id,
+            providers=self.args.provider,
+            exclude_providers=self.args.exclude_provider,
+            channels=self.args.channel,
+            since=self.args.since,
+            until=self.args.until,
+        )
+        return None if record_filter.is_empty() else record_filter
+
+    def create_stats(self):
+        return Stats() if self.args.stats_file is not None else None
+
+    def write_stats(self, stats, elapsed: float):
+        if stats is None:
+            return
+        stats.add_time("run", elapsed)
+        stats.write(self.args.stats_file, self.args.stats_format)
+        self.log(f"Stats written to {self.args.stats_file}", self.args.quiet)
+
     @abstractmethod
     def define_options(self):
         pass
@@ -1,11 +1,21 @@
 # coding: utf-8
+import time
+from contextlib import nullcontext
 from typing import List
 from pathlib import Path
 from datetime import datetime
 from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 
 from evtx2es.views.BaseView import BaseView
+from evtx2es.models.Evtx2es import Evtx2es, WorkerOptions
+from evtx2es.models.DocumentId import ID_STRATEGIES
+from evtx2es.models.Checkpoint import CheckpointStore, IncrementalState
+from evtx2es.models.DeadLetter import DeadLetterQueue
+from evtx2es.models.ElasticsearchUtils import ElasticsearchUtils
+from evtx2es.models.Profiling import profile
 from evtx2es.presenters.Evtx2esPresenter import Evtx2esPresenter
+from evtx2es.presenters.ReplayPresenter import ReplayPresenter
 
 
 class Evtx2esView(BaseView):
@@ -14,17 +24,20 @@ class Evtx2esView(BaseView):
         super().__init__()
         self.define_options()
         self.args = self.parser.parse_args()
+        self.validate_options()
 
     def define_options(self):
         self.parser.add_argument(
             "evtx_files",
-            nargs="+",
+            nargs="*",
             type=str,
             help="Windows Eventlog files or directories containing them. (Files must have a '.evtx' or '.EVTX' extension)",
         )
 
         self.parser.add_argument(
-            "--host", default="localhost", help="ElasticSearch host"
+            "--host",
+            default="localhost",
+            help="ElasticSearch host, or comma-separated hosts used in round-robin (e.g. es1,es2:9201,https://es3)",
         )
         self.parser.add_argument(
             "--port", default=9200, help="ElasticSearch port number"
@@ -42,6 +55,103 @@ class Evtx2esView(BaseView):
         self.parser.add_argument(
             "--pwd", default="", help="Password associated with the login"
         )
+        self.parser.add_argument(
+            "--bulk-threads",
+            type=int,
+            default=1,
+            help="number of bulk requests in flight at the same time.",
+        )
+        self.parser.add_argument(
+            "--bulk-size",
+            type=int,
+            default=500,
+            help="maximum number of documents per bulk request.",
+        )
+        self.parser.add_argument(
+            "--bulk-bytes",
+            type=int,
+            default=100 * 1024 * 1024,
+            help="maximum size of a bulk request in bytes.",
+        )
+        self.parser.add_argument(
+            "--concurrent-files",
+            type=int,
+            default=1,
+            help="number of files imported at the same time, sharing the workers and the connections (default: 1).",
+        )
+        self.parser.add_argument(
+            "--id-strategy",
+            choices=list(ID_STRATEGIES),
+            default="content",
+            help="document id: content (SHA-1 of the record, default), natural (computer, channel, record id, provider, timestamp), xxhash (fast hash, requires xxhash), none (generated by Elasticsearch).",
+        )
+        self.parser.add_argument(
+            "--http-compress",
+            action="store_true",
+            help="gzip the bulk request bodies.",
+        )
+        self.parser.add_argument(
+            "--max-retries",
+            type=int,
+            default=3,
+            help="retries of documents rejected with 429 (es_rejected_execution_exception) or 503, with exponential backoff; other failures are permanent.",
+        )
+        self.parser.add_argument(
+            "--initial-backoff",
+            type=float,
+            default=2.0,
+            help="seconds before the first retry, doubled on each attempt.",
+        )
+        self.parser.add_argument(
+            "--max-backoff",
+            type=float,
+            default=60.0,
+            help="upper bound of the wait between two retries in seconds.",
+        )
+        self.parser.add_argument(
+            "--bulk-load",
+            action="store_true",
+            help="create the index with an explicit mapping if needed, and disable refresh and replicas during the import (restored afterwards).",
+        )
+        self.parser.add_argument(
+            "--dead-letter",
+            type=Path,
+            default=None,
+            help="NDJSON file receiving the documents that failed permanently (or after --max-retries), to be replayed with --replay.",
+        )
+        self.parser.add_argument(
+            "--replay",
+            type=Path,
+            default=None,
+            help="send again the documents of a dead-letter file (evtx files are then optional).",
+        )
+        self.parser.add_argument(
+            "--install-template",
+            action="store_true",
+            help="install a composable index template for the index first (typed ECS fields, event_data and userdata as flattened fields); only applies to indices created afterwards.",
+        )
+        self.parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            default=None,
+            help="state file recording the import progress of each file; on a re-run, imported files are skipped and interrupted ones resumed.",
+        )
+        self.parser.add_argument(
+            "--incremental",
+            type=Path,
+            default=None,
+            help="state file remembering the last imported record of each computer and channel; only newer records are imported.",
+        )
+
+    def validate_options(self):
+        if not self.args.evtx_files and self.args.replay is None:
+            self.parser.error("the following arguments are required: evtx_files")
+        if (
+            self.args.replay is not None
+            and self.args.dead_letter is not None
+            and self.args.replay.resolve() == self.args.dead_letter.resolve()
+        ):
+            self.parser.error("--dead-letter must differ from the --replay file")
 
     def __list_evtx_files(self, evtx_files: List[str]) -> List[Path]:
         evtx_path_list: List[Path] = []
@@ -54,35 +164,157 @@ class Evtx2esView(BaseView):
 
         return evtx_path_list
 
+    def __schedule_evtx_files(self, evtx_files: List[Path]) -> List[Path]:
+        # Largest files first, so the long imports are not left for the end
+        def file_size(path: Path) -> int:
+            try:
+                return path.stat().st_size
+            except OSError:
+                return 0
+
+        return sorted(evtx_files, key=file_size, reverse=True)
+
     def run(self):
+        with profile(self.args.profile):
+            self.__import()
+
+    def __import(self):
         shift, additional_tags = self.get_shift_and_tags()
+        record_filter = self.get_record_filter()
+        stats = self.create_stats()
 
-        evtx_files = self.__list_evtx_files(self.args.evtx_files)
+        evtx_files = self.__schedule_evtx_files(
+            self.__list_evtx_files(self.args.evtx_files)
+        )
 
         if self.args.multiprocess:
             self.log(f"Multi-Process: {cpu_count()}", self.args.quiet)
 
-        for evtx_file in evtx_files:
-            self.log(f"Currently Importing {evtx_file}.", self.args.quiet)
-
-            Evtx2esPresenter(
-                input_path=evtx_file,
-                host=self.args.host,
-                port=int(self.args.port),
-                index=self.args.index,
-                scheme=self.args.scheme,
-                pipeline=self.args.pipeline,
-                shift=shift,
-                login=self.args.login,
-                pwd=self.args.pwd,
-                is_quiet=self.args.quiet,
-                multiprocess=self.args.multiprocess,
-                chunk_size=int(self.args.size),
-                additional_tags=additional_tags,
-                logger=self.log,
-            ).bulk_import()
+        # One client (connection pool) and one worker pool shared by all files
+        es = ElasticsearchUtils(
+            hostname=self.args.host,
+            port=int(self.args.port),
+            scheme=self.args.scheme,
+            login=self.args.login,
+            pwd=self.args.pwd,
+            connections_per_node=self.args.bulk_threads,
+            http_compress=self.args.http_compress,
+            max_retries=self.args.max_retries,
+            initial_backoff=self.args.initial_backoff,
+            max_backoff=self.args.max_backoff,
+            stats=stats,
+        )
+        # the formatting options are the same for every file: sent once per worker
+        pool = (
+            Evtx2es.create_pool(
+                options=WorkerOptions(
+                    shift,
+                    tuple(additional_tags or ()),
+                    self.args.id_strategy if self.args.id_strategy != "none" else None,
+                    serialized=True,
+                    bulk_index=self.args.index,
+                    bulk_pipeline=self.args.pipeline,
+                    stats=stats is not None,
+                ),
+                profile_dir=self.args.profile,
+            )
+            if self.args.multiprocess
+            else None
+        )
+        checkpoint = (
+            CheckpointStore(self.args.checkpoint) if self.args.checkpoint else None
+        )
+        incremental = (
+            IncrementalState(self.args.incremental) if self.args.incremental else None
+        )
+        dead_letter = (
+            DeadLetterQueue(self.args.dead_letter) if self.args.dead_letter else None
+        )
+
+        total_documents = 0
+        start = time.perf_counter()
+        try:
+            if self.args.replay is not None:
+                self.log(f"Replaying {self.args.replay}.", self.args.quiet)
+                total_documents += ReplayPresenter(
+                    input_path=self.args.replay,
+                    es=es,
+                    is_quiet=self.args.quiet,
+                    bulk_threads=self.args.bulk_threads,
+                    bulk_size=self.args.bulk_size,
+                    bulk_bytes=self.args.bulk_bytes,
+                    dead_letter=dead_letter,
+                    logger=self.log,
+                ).replay()
+
+            if self.args.install_template:
+                es.install_template(self.args.index)
+
+            def import_file(evtx_file: Path) -> int:
+                self.log(f"Currently Importing {evtx_file}.", self.args.quiet)
+
+                return Evtx2esPresenter(
+                    input_path=evtx_file,
+                    host=self.args.host,
+                    port=int(self.args.port),
+                    index=self.args.index,
+                    scheme=self.args.scheme,
+                    pipeline=self.args.pipeline,
+                    shift=shift,
+                    login=self.args.login,
+                    pwd=self.args.pwd,
+                    is_quiet=self.args.quiet,
+                    multiprocess=self.args.multiprocess,
+                    chunk_size=int(self.args.size),
+                    additional_tags=additional_tags,
+                    max_inflight=self.args.max_inflight,
+                    parser_threads=self.args.parser_threads,
+                    parse_in_workers=self.args.parse_in_workers,
+                    batch_size=self.args.batch_size,
+                    batch_bytes=self.args.batch_bytes,
+                    bulk_threads=self.args.bulk_threads,
+                    bulk_size=self.args.bulk_size,
+                    bulk_bytes=self.args.bulk_bytes,
+                    id_strategy=self.args.id_strategy,
+                    logger=self.log,
+                    es=es,
+                    pool=pool,
+                    checkpoint=checkpoint,
+                    incremental=incremental,
+                    record_filter=record_filter,
+                    dead_letter=dead_letter,
+                    stats=stats,
+                ).bulk_import()
+
+            concurrent_files = min(self.args.concurrent_files, len(evtx_files))
+            # one bulk load for all the files: a single refresh at the end
+            with es.bulk_load(self.args.index) if self.args.bulk_load else nullcontext():
+                if concurrent_files > 1:
+                    # A window of files in flight: the chunks of the next file
+                    # reach the workers while the last ones of a file are
+                    # formatted or indexed, so no core waits at file boundaries
+                    with ThreadPool(concurrent_files) as files:
+                        total_documents += sum(
+                            files.imap_unordered(import_file, evtx_files)
+                        )
+                else:
+                    total_documents += sum(map(import_file, evtx_files))
+        finally:
+            if dead_letter is not None:
+                dead_letter.close()
+            if checkpoint is not None:
+                checkpoint.save()
+            if pool is not None:
+                Evtx2es.shutdown_pool(pool)
+        elapsed = time.perf_counter() - start
 
         self.log("Import completed.", self.args.quiet)
+        self.log(
+            f"Imported {total_documents} documents from {len(evtx_files)} files"
+            f" in {elapsed:.2f}s ({total_documents / max(elapsed, 1e-9):.0f} docs/s)",
+            self.args.quiet,
+        )
+        self.write_stats(stats, elapsed)
 
 
 def entry_point():
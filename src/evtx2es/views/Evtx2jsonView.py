@@ -1,8 +1,10 @@
 # coding: utf-8
+import time
 from datetime import datetime
 from multiprocessing import cpu_count
 
 from evtx2es.views.BaseView import BaseView
+from evtx2es.models.Profiling import profile
 from evtx2es.presenters.Evtx2jsonPresenter import Evtx2jsonPresenter
 
 
@@ -24,15 +26,28 @@ class Evtx2jsonView(BaseView):
             default="",
             help="json file path to output.",
         )
+        self.parser.add_argument(
+            "--format",
+            "-f",
+            choices=["json", "ndjson"],
+            default="json",
+            help="output format. ndjson writes one record per line while converting.",
+        )
 
     def run(self):
+        with profile(self.args.profile):
+            self.__convert()
+
+    def __convert(self):
         shift, additional_tags = self.get_shift_and_tags()
+        stats = self.create_stats()
 
         self.log(f"Converting {self.args.evtx_file}.", self.args.quiet)
 
         if self.args.multiprocess:
             self.log(f"Multi-Process: {cpu_count()}", self.args.quiet)
 
+        start = time.perf_counter()
         Evtx2jsonPresenter(
             input_path=self.args.evtx_file,
             output_path=self.args.output_file,
@@ -41,9 +56,19 @@ class Evtx2jsonView(BaseView):
             multiprocess=self.args.multiprocess,
             chunk_size=int(self.args.size),
             additional_tags=additional_tags,
+            max_inflight=self.args.max_inflight,
+            parser_threads=self.args.parser_threads,
+            parse_in_workers=self.args.parse_in_workers,
+            batch_size=self.args.batch_size,
+            batch_bytes=self.args.batch_bytes,
+            output_format=self.args.format,
+            record_filter=self.get_record_filter(),
+            stats=stats,
+            profile_dir=self.args.profile,
         ).export_json()
 
         self.log("Converted.", self.args.quiet)
+        self.write_stats(stats, time.perf_counter() - start)
 
 
 def entry_point():
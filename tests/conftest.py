@@ -1,8 +1,13 @@
 # coding: utf-8
+import gzip
 import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from urllib import request
+from urllib.parse import urlsplit
 
+import orjson
 import pytest
 
 
@@ -26,3 +31,162 @@ def prepare_eventlog():
     cachedir = Path(__file__).parent / Path('cache')
     for file in cachedir.glob('**/*[!.gitkeep]'):
         file.unlink()
+
+
+def flatten(settings: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value if value is None else str(value)
+    return flat
+
+
+class FakeElasticsearch:
+    """Local stand-in for an Elasticsearch node, acknowledging every document.
+
+    Index creation and settings are kept in `indices` (flat settings), index
+    templates in `templates`, every request is recorded in `requests`. The
+    next `invalid` documents are refused for good (400 mapper_parsing_exception)
+    and the next `reject` ones are answered with `reject_status` (429,
+    es_rejected_execution_exception, by default). The `_bulk` requests whose
+    number (from 1) is in `reject_requests` are rejected as a whole with 429.
+    The distinct `_bulk` requests whose number is in `drop_requests` get no
+    answer, retries included: the connection is closed.
+    """
+
+    def __init__(self) -> None:
+        self.documents = {}
+        self.indices = {}
+        self.templates = {}
+        self.requests = []
+        self.compressed_requests = 0
+        self.reject = 0
+        self.reject_status = 429
+        self.invalid = 0
+        self.bulk_requests = 0
+        self.reject_requests = set()
+        self.drop_requests = set()
+        self.bulk_bodies = {}
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def send_json(self, body: dict, status: int = 200) -> None:
+                payload = orjson.dumps(body)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                # a HEAD response has no body: it would be read as the next response
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            def read_body(self) -> bytes:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                    server.compressed_requests += 1
+                return body
+
+            def handle_request(self) -> None:
+                body = self.read_body()
+                path = urlsplit(self.path).path
+                with server.lock:
+                    server.requests.append((self.command, path))
+                parts = [part for part in path.split("/") if part]
+
+                if parts[-1:] == ["_bulk"]:
+                    self.handle_bulk(body)
+                elif not parts:
+                    self.send_json({"version": {"number": "9.0.0"}})
+                elif parts[0] == "_index_template" and self.command == "PUT":
+                    server.templates[parts[1]] = orjson.loads(body)
+                    self.send_json({"acknowledged": True})
+                elif len(parts) == 1 and self.command == "HEAD":
+                    self.send_json({}, 200 if parts[0] in server.indices else 404)
+                elif len(parts) == 1 and self.command == "PUT":
+                    request = orjson.loads(body)
+                    server.indices[parts[0]] = {
+                        "settings": flatten(request.get("settings", {})),
+                        "mappings": request.get("mappings"),
+                    }
+                    self.send_json({"acknowledged": True, "index": parts[0]})
+                elif parts[1:2] == ["_settings"] and self.command == "GET":
+                    settings = server.indices[parts[0]]["settings"]
+                    self.send_json({parts[0]: {"settings": settings}})
+                elif parts[1:2] == ["_settings"]:
+                    for key, value in flatten(orjson.loads(body)).items():
+                        if value is None:
+                            server.indices[parts[0]]["settings"].pop(key, None)
+                        else:
+                            server.indices[parts[0]]["settings"][key] = value
+                    self.send_json({"acknowledged": True})
+                else:
+                    self.send_json({"acknowledged": True})
+
+            def handle_bulk(self, body: bytes) -> None:
+                with server.lock:
+                    server.bulk_requests += 1
+                    rejected = server.bulk_requests in server.reject_requests
+                    digest = hashlib.md5(body).digest()
+                    number = server.bulk_bodies.setdefault(digest, len(server.bulk_bodies) + 1)
+                    dropped = number in server.drop_requests
+                if dropped:
+                    self.close_connection = True
+                    return
+                if rejected:
+                    error = {"type": "es_rejected_execution_exception", "reason": "queue full"}
+                    self.send_json({"error": error, "status": 429}, 429)
+                    return
+                lines = body.splitlines()
+                items = []
+                for action, source in zip(lines[::2], lines[1::2]):
+                    op, meta = next(iter(orjson.loads(action).items()))
+                    doc_id = meta.get("_id") or f"auto-{len(server.documents)}"
+                    with server.lock:
+                        invalid = server.invalid > 0
+                        rejected = not invalid and server.reject > 0
+                        if invalid:
+                            server.invalid -= 1
+                        elif rejected:
+                            server.reject -= 1
+                        else:
+                            server.documents[(meta["_index"], doc_id)] = orjson.loads(source)
+                    if invalid:
+                        error = {"type": "mapper_parsing_exception", "reason": "failed to parse"}
+                        items.append({op: {"_index": meta["_index"], "_id": doc_id, "status": 400, "error": error}})
+                    elif rejected:
+                        error = {"type": "es_rejected_execution_exception", "reason": "queue full"}
+                        items.append({op: {"_index": meta["_index"], "_id": doc_id, "status": server.reject_status, "error": error}})
+                    else:
+                        items.append({op: {"_index": meta["_index"], "_id": doc_id, "status": 201}})
+                errors = any(item[op]["status"] >= 300 for item in items for op in item)
+                self.send_json({"took": 1, "errors": errors, "items": items})
+
+            do_GET = do_HEAD = do_POST = do_PUT = handle_request
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeElasticsearch":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def fake_elasticsearch():
+    with FakeElasticsearch() as es:
+        yield es
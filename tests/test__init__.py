@@ -1,8 +1,17 @@
 # coding: utf-8
+import asyncio
+import gzip
 import orjson
+import pstats
+import shutil
+from itertools import islice
 from pathlib import Path
 
 import pytest
+from evtx import PyEvtxParser
+from evtx2es import evtx2es_async, evtx2json, iter_batches, iter_records
+from evtx2es.models.ElasticsearchUtils import ElasticsearchUtils
+from evtx2es.models.Evtx2es import process_by_chunk
 from evtx2es.views.Evtx2esView import entry_point as e2e
 from evtx2es.views.Evtx2jsonView import entry_point as e2j
 
@@ -12,6 +21,11 @@ def get_json_length(path: Path) -> int:
         return 0
     return len(orjson.loads(path.read_bytes()))
 
+def get_ndjson_length(path: Path) -> int:
+    if path.is_dir():
+        return 0
+    return len([orjson.loads(line) for line in path.read_bytes().splitlines()])
+
 
 # command-line test cases
 def test__evtx2es_help(monkeypatch):
@@ -63,3 +77,230 @@ def test__evtx2json_convert_multiprocessing(monkeypatch):
         m.setattr("sys.argv", argv)
         e2j()
     assert get_json_length(Path(path)) == 62031
+
+def test__evtx2json_convert_ndjson(monkeypatch):
+    path = 'tests/cache/Security.ndjson'
+    argv = ["evtx2json", "-o", path, "--format", "ndjson", "tests/cache/Security.evtx"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        e2j()
+    assert get_ndjson_length(Path(path)) == 62031
+
+def test__evtx2json_convert_gzip(monkeypatch):
+    path = 'tests/cache/Security.json.gz'
+    argv = ["evtx2json", "-o", path, "tests/cache/Security.evtx"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        e2j()
+    assert len(orjson.loads(gzip.decompress(Path(path).read_bytes()))) == 62031
+
+
+# python-api test cases
+@pytest.mark.parametrize(
+    "multiprocess, chunk_size, batch_size, batch_bytes",
+    [
+        (False, 500, None, None),
+        (False, 2, None, None),
+        (False, 7, 3, None),
+        (False, 100, 250, 4096),
+        (True, 1000, 300, None),
+        (True, 500, None, 65536),
+    ],
+)
+def test__evtx2json_batching_keeps_every_record(multiprocess, chunk_size, batch_size, batch_bytes):
+    path = 'tests/cache/Security.evtx'
+    expected = [
+        orjson.loads(record["data"])["Event"]["System"]["EventRecordID"]
+        for record in PyEvtxParser(path).records_json()
+    ]
+    records = evtx2json(
+        path,
+        multiprocess=multiprocess,
+        chunk_size=chunk_size,
+        batch_size=batch_size,
+        batch_bytes=batch_bytes,
+    )
+    assert [record["winlog"]["record_id"] for record in records] == expected
+
+
+def test__iter_records_is_lazy():
+    path = 'tests/cache/Security.evtx'
+    records = iter_records(path, chunk_size=2)
+    first = next(records)
+    records.close()
+    assert first == evtx2json(path)[0]
+
+    batches = list(iter_batches(path, chunk_size=2, batch_size=3))
+    assert all(len(batch) <= 3 for batch in batches)
+    assert [record for batch in batches for record in batch] == evtx2json(path)
+
+
+def test__evtx2es_async(fake_elasticsearch):
+    path = 'tests/cache/Security.evtx'
+
+    async def import_twice():
+        # two files (here, twice the same one) imported concurrently
+        await asyncio.gather(
+            evtx2es_async(path, host="127.0.0.1", port=fake_elasticsearch.port, index="a", bulk_size=2, chunk_size=3),
+            evtx2es_async(path, host="127.0.0.1", port=fake_elasticsearch.port, index="b", bulk_concurrency=1),
+        )
+
+    asyncio.run(import_twice())
+    expected = sorted(record["winlog"]["record_id"] for record in evtx2json(path))
+    for index in ("a", "b"):
+        assert sorted(
+            document["winlog"]["record_id"]
+            for (index_name, _), document in fake_elasticsearch.documents.items()
+            if index_name == index
+        ) == expected
+
+
+def test__evtx2es_async_dead_letter(fake_elasticsearch, tmp_path):
+    path = 'tests/cache/Security.evtx'
+    dead_letter = tmp_path / "dead.ndjson"
+    expected = sorted(record["winlog"]["record_id"] for record in evtx2json(path))
+    # four batches, one bulk request each: the second one gets no answer,
+    # retries of the client included
+    batch = -(-len(expected) // 4)
+    fake_elasticsearch.drop_requests = {2}
+    asyncio.run(
+        evtx2es_async(
+            path, host="127.0.0.1", port=fake_elasticsearch.port,
+            chunk_size=batch, bulk_size=batch, bulk_concurrency=1, dead_letter=str(dead_letter),
+        )
+    )
+    lost = [orjson.loads(line)["_source"]["winlog"]["record_id"] for line in dead_letter.read_bytes().splitlines()]
+    indexed = [document["winlog"]["record_id"] for document in fake_elasticsearch.documents.values()]
+    assert len(lost) == batch
+    assert sorted(lost + indexed) == expected
+
+
+def test__evtx2es_replay_dead_letter(monkeypatch, fake_elasticsearch, tmp_path):
+    dead_letter = tmp_path / "dead.ndjson"
+    port = str(fake_elasticsearch.port)
+    fake_elasticsearch.invalid = 3
+    argv = ["evtx2es", "-q", "--host", "127.0.0.1", "--port", port, "--dead-letter", str(dead_letter), "tests/cache/Security.evtx"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        e2e()
+    assert get_ndjson_length(dead_letter) == 3
+    total = len(list(PyEvtxParser('tests/cache/Security.evtx').records_json()))
+    assert len(fake_elasticsearch.documents) == total - 3
+
+    # evtx files are optional with --replay
+    argv = ["evtx2es", "-q", "--host", "127.0.0.1", "--port", port, "--replay", str(dead_letter)]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        e2e()
+    assert len(fake_elasticsearch.documents) == total
+
+
+@pytest.mark.parametrize("options", [[], ["-m", "--parse-in-workers", "--size", "2"]])
+def test__evtx2es_stats_file(monkeypatch, fake_elasticsearch, tmp_path, options):
+    stats_file = tmp_path / "stats.json"
+    fake_elasticsearch.reject = 2
+    argv = [
+        "evtx2es", "-q", "--host", "127.0.0.1", "--port", str(fake_elasticsearch.port),
+        "--initial-backoff", "0.01", "--stats-file", str(stats_file), *options, "tests/cache/Security.evtx",
+    ]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        e2e()
+
+    total = len(list(PyEvtxParser('tests/cache/Security.evtx').records_json()))
+    stats = orjson.loads(stats_file.read_bytes())
+    counters = stats["counters"]
+    # parsed and formatted in the workers with -m --parse-in-workers
+    assert counters["records_parsed"] == counters["records_formatted"] == total
+    assert counters["documents_indexed"] == total
+    assert counters["bulk_retries"] == 2
+    assert counters["bytes_read"] > 0 and counters["bytes_sent"] > 0
+    assert set(stats["stages"]) == {"parse", "loads", "format", "hash", "serialize", "bulk", "run"}
+
+    argv[-1:-1] = ["--stats-format", "prometheus"]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        e2e()
+    metrics = stats_file.read_text()
+    assert f"evtx2es_records_parsed_total {total}" in metrics.splitlines()
+    assert 'evtx2es_stage_seconds_total{stage="bulk"}' in metrics
+
+
+def test__evtx2json_profile(tmp_path):
+    records = evtx2json('tests/cache/Security.evtx', multiprocess=True, chunk_size=2, profile_dir=str(tmp_path))
+    assert len(records) == len(list(PyEvtxParser('tests/cache/Security.evtx').records_json()))
+
+    # one profile per process, the workers' written when the pool is shut down
+    profiles = sorted(path.name.split("-")[0] for path in tmp_path.glob("*.prof"))
+    assert profiles[0] == "main" and profiles[1:] and set(profiles[1:]) == {"worker"}
+    assert f"{len(profiles)} profiles merged" in (tmp_path / "summary.txt").read_text()
+    workers = pstats.Stats(*map(str, tmp_path.glob("worker-*.prof")))
+    assert any(name == "process_by_chunk" for _, _, name in workers.stats)
+
+
+@pytest.mark.parametrize("max_inflight", [1, 3])
+def test__evtx2json_multiprocess_keeps_order(max_inflight):
+    path = 'tests/cache/Security.evtx'
+    expected = evtx2json(path)
+    # several chunks for each worker, whatever the size of the sample
+    chunk_size = -(-len(expected) // 8)
+    records = evtx2json(path, multiprocess=True, chunk_size=chunk_size, max_inflight=max_inflight)
+    assert records == expected
+
+
+def test__process_by_chunk_formats_records_json_dicts():
+    path = 'tests/cache/Security.evtx'
+    records = list(islice(PyEvtxParser(path).records_json(), 1000))
+    # the former pipeline: dump the records, join them into an array, load it back
+    reloaded = orjson.loads(b"[" + b",".join(orjson.dumps(record) for record in records) + b"]")
+    assert process_by_chunk(records, path, "0") == process_by_chunk(reloaded, path, "0")
+
+
+def test__parallel_bulk_indice(fake_elasticsearch):
+    path = 'tests/cache/Security.evtx'
+    records = process_by_chunk(list(islice(PyEvtxParser(path).records_json(), 50)), path, "0")
+    es = ElasticsearchUtils(
+        hostname="127.0.0.1", port=fake_elasticsearch.port, scheme="http", login="", pwd=""
+    )
+    results = list(
+        es.parallel_bulk_indice(
+            records, "evtx2es", "", thread_count=3, chunk_size=500, max_chunk_bytes=1024
+        )
+    )
+
+    # every document indexed, the results in the order of the records
+    assert len(results) == len(records) and all(ok for ok, _ in results)
+    indexed = [
+        fake_elasticsearch.documents[("evtx2es", info["index"]["_id"])] for _, info in results
+    ]
+    assert [doc["winlog"]["record_id"] for doc in indexed] == [
+        record["winlog"]["record_id"] for record in records
+    ]
+    # the chunks were split by max_chunk_bytes, not by chunk_size
+    bulk_requests = [p for _, p in fake_elasticsearch.requests if p.split("?")[0].endswith("/_bulk")]
+    assert len(bulk_requests) > 1
+
+
+def test__evtx2es_concurrent_files(monkeypatch, capsys, fake_elasticsearch, tmp_path):
+    for i in range(3):
+        shutil.copy('tests/cache/Security.evtx', tmp_path / f"Security{i}.evtx")
+    checkpoint = tmp_path / "checkpoint.json"
+    argv = [
+        "evtx2es", "--host", "127.0.0.1", "--port", str(fake_elasticsearch.port),
+        "-m", "--concurrent-files", "3", "--checkpoint", str(checkpoint), str(tmp_path),
+    ]
+    with monkeypatch.context() as m:
+        m.setattr("sys.argv", argv)
+        e2e()
+
+    total = len(list(PyEvtxParser('tests/cache/Security.evtx').records_json()))
+    assert f"Imported {3 * total} documents from 3 files" in capsys.readouterr().out
+    # the checkpoint state shared by the files is kept for each of them
+    files = orjson.loads(checkpoint.read_bytes())["files"]
+    assert sorted(state["records"] for state in files.values()) == [total] * 3
+    assert all(state["completed"] for state in files.values())
+
+
+def test__evtx2json_parser_threads():
+    path = 'tests/cache/Security.evtx'
+    assert evtx2json(path, parser_threads=2) == evtx2json(path, parser_threads=0)
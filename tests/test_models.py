@@ -0,0 +1,607 @@
+# coding: utf-8
+import io
+from datetime import timedelta
+from hashlib import sha1
+from itertools import islice
+from pathlib import Path
+
+import orjson
+
+import pytest
+from evtx2es.models.Checkpoint import CheckpointStore, IncrementalState
+from evtx2es.models.DeadLetter import DeadLetterQueue
+from evtx2es.models.DocumentId import calc_content_hash, get_id_function
+from evtx2es.models.ElasticsearchUtils import ElasticsearchUtils, gen_actions, parse_hosts
+from evtx2es.models.Mappings import ECS_MAPPINGS, TEMPLATE_MAPPINGS
+from evtx2es.models.RecordFilter import RecordFilter, combine_filters
+from evtx2es.models.Stats import Stats
+from evtx2es.models.Evtx2es import Evtx2es, TimestampShifter, WorkerOptions, _create_timestamp_field, get_raw_system_field, get_serialized_record_id, process_by_chunk
+from evtx2es.models.EvtxChunks import read_chunks, scan_chunks
+from evtx2es.presenters.Evtx2esPresenter import Evtx2esPresenter
+from evtx import PyEvtxParser
+
+
+# utils
+def reference(system_time: str, shift: timedelta):
+    try:
+        return _create_timestamp_field(system_time, shift)
+    except (ValueError, OverflowError) as e:
+        return type(e)
+
+
+def shifted(system_time: str, shift: timedelta):
+    shifter = TimestampShifter(timedelta(seconds=shift.seconds, days=shift.days))
+    try:
+        # second call is served from the per-second cache
+        return shifter.shift(system_time), shifter.shift(system_time)
+    except (ValueError, OverflowError) as e:
+        return type(e), type(e)
+
+
+# timestamp shift test cases
+@pytest.mark.parametrize(
+    "system_time, shift",
+    [
+        # leap days
+        ("2016-02-28T23:59:59.999999Z", timedelta(seconds=1)),
+        ("2016-02-28T12:00:00.000001Z", timedelta(days=1)),
+        ("2015-02-28T12:00:00.000001Z", timedelta(days=1)),
+        ("2016-03-01T00:00:00.500000Z", timedelta(days=-1)),
+        ("2000-02-28T23:00:00.000000Z", timedelta(hours=1)),
+        ("1900-02-28T23:00:00.000000Z", timedelta(hours=25)),
+        # negative shifts, across year boundaries
+        ("2017-01-01T00:00:00.000000Z", timedelta(seconds=-1)),
+        ("2016-06-29T15:24:34.346000Z", timedelta(days=-3650, seconds=-7)),
+        ("2016-06-29T15:24:34.346000Z", timedelta(days=3650, hours=23)),
+        # sub-second part of the shift is dropped
+        ("2016-06-29T15:24:34.346000Z", timedelta(seconds=1, microseconds=999999)),
+        # years below 1000 and out of range results
+        ("1000-01-01T00:00:00.000000Z", timedelta(days=-1)),
+        ("0999-12-31T23:59:59.000000Z", timedelta(seconds=1)),
+        ("9999-12-31T23:59:59.000000Z", timedelta(seconds=1)),
+        # non-canonical fractions: padded by the reference, or rejected
+        ("2016-06-29T15:24:34.346Z", timedelta(days=1)),
+        ("2016-06-29T15:24:34.3460001Z", timedelta(days=1)),
+        ("2016-06-29T15:24:34Z", timedelta(days=1)),
+        # invalid values
+        ("2016-02-30T00:00:00.000000Z", timedelta(days=1)),
+        ("2016-06-29T24:00:00.000000Z", timedelta(days=1)),
+        ("2016-+6-29T15:24:34.346000Z", timedelta(days=1)),
+        ("2016-06-29 15:24:34.346000Z", timedelta(days=1)),
+    ],
+)
+def test__timestamp_shifter_matches_reference(system_time, shift):
+    expected = reference(system_time, shift)
+    assert shifted(system_time, shift) == (expected, expected)
+
+
+def test__timestamp_shifter_shift_many():
+    shifter = TimestampShifter(timedelta(days=1))
+    system_times = [
+        "2016-02-28T00:00:00.000000Z",
+        "2016-02-28T00:00:00.000001Z",
+        "2016-02-29T00:00:00.000000Z",
+    ]
+    assert shifter.shift_many(system_times) == [
+        "2016-02-29T00:00:00.000000Z",
+        "2016-02-29T00:00:00.000001Z",
+        "2016-03-01T00:00:00.000000Z",
+    ]
+
+
+# document id test cases
+def test__content_id_is_backward_compatible():
+    records = list(PyEvtxParser('tests/cache/Security.evtx').records_json())[:100]
+    expected = [
+        sha1(orjson.dumps(record, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        for record in process_by_chunk(records, 'tests/cache/Security.evtx', "0")
+    ]
+    with_ids = process_by_chunk(records, 'tests/cache/Security.evtx', "0", id_strategy="content")
+    assert [record.pop("_id") for record in with_ids] == expected
+
+
+def test__natural_id():
+    record = {
+        "event": {"created": "2016-10-06T01:47:07.509504Z"},
+        "winlog": {
+            "computer_name": "WIN-WFBHIBE5GXZ.example.co.jp",
+            "channel": "Security",
+            "record_id": 227126,
+            "provider": {"name": "Microsoft-Windows-Eventlog"},
+        },
+    }
+    assert get_id_function("natural")(record) == (
+        "WIN-WFBHIBE5GXZ.example.co.jp|Security|227126"
+        "|Microsoft-Windows-Eventlog|2016-10-06T01:47:07.509504Z"
+    )
+
+
+def test__unknown_id_strategy():
+    with pytest.raises(ValueError):
+        get_id_function("md5")
+
+
+# checkpoint test cases
+class StubElasticsearch:
+    def __init__(self, fail_after=None):
+        self.indexed = []
+        self.fail_after = fail_after
+
+    def bulk_serialized(self, items, *args, **kwargs):
+        if self.fail_after is not None and len(self.indexed) >= self.fail_after:
+            raise Exception("cluster unavailable")
+        for item in items:
+            action, source = item.splitlines()
+            self.indexed.append(orjson.loads(source)["winlog"]["record_id"])
+        return len(items), []
+
+
+def sample_record_ids(record_filter=None) -> list:
+    # EventRecordIDs of the sample kept by the filter, in file order
+    return [
+        orjson.loads(record["data"])["Event"]["System"]["EventRecordID"]
+        for record in PyEvtxParser('tests/cache/Security.evtx').records_json()
+        if record_filter is None or record_filter(record)
+    ]
+
+
+def sample_event_id(position: int) -> int:
+    raw = list(PyEvtxParser('tests/cache/Security.evtx').records_json())
+    formatted = process_by_chunk([raw[position]], 'tests/cache/Security.evtx', "0")
+    return formatted[0]["winlog"]["event_id"]
+
+
+def test__checkpoint_resumes_interrupted_import(tmp_path):
+    state = tmp_path / "state.json"
+
+    def run(es):
+        return Evtx2esPresenter(
+            input_path=Path('tests/cache/Security.evtx'),
+            is_quiet=True,
+            chunk_size=2,
+            es=es,
+            checkpoint=CheckpointStore(state),
+        ).bulk_import()
+
+    interrupted = StubElasticsearch(fail_after=4)
+    run(interrupted)
+    resumed = StubElasticsearch()
+    run(resumed)
+
+    assert interrupted.indexed + resumed.indexed == [
+        orjson.loads(record["data"])["Event"]["System"]["EventRecordID"]
+        for record in PyEvtxParser('tests/cache/Security.evtx').records_json()
+    ]
+    assert len(interrupted.indexed) == 4
+
+    # fully imported: skipped
+    skipped = StubElasticsearch()
+    assert run(skipped) == 0
+    assert skipped.indexed == []
+
+
+def test__incremental_imports_only_new_records(tmp_path):
+    state = tmp_path / "state.json"
+
+    def run(es):
+        return Evtx2esPresenter(
+            input_path=Path('tests/cache/Security.evtx'),
+            is_quiet=True,
+            es=es,
+            incremental=IncrementalState(state),
+        ).bulk_import()
+
+    first = StubElasticsearch()
+    run(first)
+    assert len(first.indexed) > 1
+
+    # nothing new
+    second = StubElasticsearch()
+    assert run(second) == 0
+
+    # the last record is new again
+    streams = orjson.loads(state.read_bytes())["streams"]
+    last = sorted(first.indexed)[-2]
+    for channels in streams.values():
+        for stream in channels.values():
+            stream["record_id"] = last
+    state.write_bytes(orjson.dumps({"streams": streams}))
+    third = StubElasticsearch()
+    run(third)
+    assert third.indexed == [sorted(first.indexed)[-1]]
+
+
+@pytest.mark.parametrize("parse_in_workers", [False, True])
+def test__checkpoint_resumes_filtered_import(tmp_path, parse_in_workers):
+    state = CheckpointStore(tmp_path / "state.json")
+
+    def run(es, record_filter):
+        return Evtx2esPresenter(
+            input_path=Path('tests/cache/Security.evtx'),
+            is_quiet=True,
+            chunk_size=2,
+            parse_in_workers=parse_in_workers,
+            es=es,
+            checkpoint=state,
+            record_filter=record_filter,
+        ).bulk_import()
+
+    event_id = sample_event_id(0)
+    interrupted = StubElasticsearch(fail_after=2)
+    run(interrupted, RecordFilter(exclude_event_ids=[event_id]))
+    resumed = StubElasticsearch()
+    run(resumed, RecordFilter(exclude_event_ids=[event_id]))
+    assert interrupted.indexed + resumed.indexed == sample_record_ids(
+        RecordFilter(exclude_event_ids=[event_id])
+    )
+
+    # another selection starts over
+    other = StubElasticsearch()
+    run(other, RecordFilter(event_ids=[event_id]))
+    assert other.indexed == sample_record_ids(RecordFilter(event_ids=[event_id]))
+
+
+def test__incremental_state_is_kept_per_selection(tmp_path):
+    state = tmp_path / "state.json"
+
+    def run(record_filter=None):
+        es = StubElasticsearch()
+        Evtx2esPresenter(
+            input_path=Path('tests/cache/Security.evtx'),
+            is_quiet=True,
+            es=es,
+            incremental=IncrementalState(state),
+            record_filter=record_filter,
+        ).bulk_import()
+        return es.indexed
+
+    event_id = sample_event_id(-1)
+    selected = sample_record_ids(RecordFilter(event_ids=[event_id]))
+    assert run(RecordFilter(event_ids=[event_id])) == selected
+    assert run(RecordFilter(event_ids=[event_id])) == []
+    # the records left out by the selection are still new to an unfiltered run
+    assert run() == sample_record_ids()
+    assert run() == []
+
+
+# record filter test cases
+def test__record_filter_matches_formatted_fields():
+    raw = list(PyEvtxParser('tests/cache/Security.evtx').records_json())
+    formatted = process_by_chunk(raw, 'tests/cache/Security.evtx', "0")
+    event_id = formatted[-1]["winlog"]["event_id"]
+    provider = formatted[-1]["winlog"]["provider"]["name"]
+    times = sorted(record["@timestamp"] for record in formatted)
+    since, until = times[len(times) // 3], times[2 * len(times) // 3]
+
+    def kept(record_filter, condition):
+        assert [
+            formatted_record["winlog"]["record_id"]
+            for raw_record, formatted_record in zip(raw, formatted)
+            if record_filter(raw_record)
+        ] == [record["winlog"]["record_id"] for record in formatted if condition(record)]
+
+    kept(RecordFilter(event_ids=[event_id]), lambda r: r["winlog"]["event_id"] == event_id)
+    kept(
+        RecordFilter(exclude_event_ids=[event_id]),
+        lambda r: r["winlog"]["event_id"] != event_id,
+    )
+    kept(
+        RecordFilter(providers=[provider.upper()]),
+        lambda r: r["winlog"]["provider"]["name"] == provider,
+    )
+    kept(
+        RecordFilter(exclude_providers=[provider]),
+        lambda r: r["winlog"]["provider"]["name"] != provider,
+    )
+    kept(RecordFilter(channels=["security"]), lambda r: True)
+    kept(
+        RecordFilter(since=since, until=until.replace("Z", "+00:00")),
+        lambda r: since <= r["@timestamp"] < until,
+    )
+
+
+def test__raw_system_fields_ignore_event_data():
+    raw = next(PyEvtxParser('tests/cache/Security.evtx').records_json())
+    event = orjson.loads(raw["data"])
+    system = event["Event"]["System"]
+    system["Computer"] = 'host "quoted" \\ name'
+    # fields of the event with the names of System fields
+    event["Event"]["EventData"] = {
+        **(event["Event"].get("EventData") or {}),
+        "Channel": "Application",
+        "Computer": "other",
+    }
+
+    def record(event):
+        return {**raw, "data": orjson.dumps(event, option=orjson.OPT_INDENT_2).decode()}
+
+    assert get_raw_system_field(record(event), "Channel") == system["Channel"]
+    assert get_raw_system_field(record(event), "Computer") == system["Computer"]
+    assert not RecordFilter(channels=["application"])(record(event))
+    assert RecordFilter(channels=[system["Channel"]])(record(event))
+
+    # a null System value is not looked up elsewhere
+    system["Channel"] = None
+    assert get_raw_system_field(record(event), "Channel") is None
+    assert not RecordFilter(channels=["application"])(record(event))
+
+
+# elasticsearch client test cases
+def test__parse_hosts():
+    assert parse_hosts("es1, https://es2:9201,es3/prefix", 9200, "http") == [
+        "http://es1:9200",
+        "https://es2:9201",
+        "http://es3:9200/prefix",
+    ]
+
+
+@pytest.mark.parametrize("bulk_threads,status", [(1, 429), (3, 429), (3, 503)])
+def test__bulk_retries_rejected_documents(fake_elasticsearch, bulk_threads, status):
+    es = ElasticsearchUtils(
+        "127.0.0.1", fake_elasticsearch.port, "http", "", "",
+        connections_per_node=bulk_threads, http_compress=True, initial_backoff=0.01,
+    )
+    records = process_by_chunk(
+        list(PyEvtxParser('tests/cache/Security.evtx').records_json()),
+        'tests/cache/Security.evtx',
+        "0",
+    )
+    fake_elasticsearch.reject = 3
+    fake_elasticsearch.reject_status = status
+
+    if bulk_threads == 1:
+        success, failed = es.bulk_indice(records, "evtx2es", "", chunk_size=2)
+        assert (success, failed) == (len(records), [])
+    else:
+        results = list(es.parallel_bulk_indice(records, "evtx2es", "", thread_count=bulk_threads, chunk_size=2))
+        assert all(ok for ok, _ in results)
+        # in the order of the records
+        ids = [calc_content_hash(record) for record in records]
+        assert [info["index"]["_id"] for _, info in results] == ids
+
+    assert len(fake_elasticsearch.documents) == len(records)
+    assert fake_elasticsearch.compressed_requests > 0
+
+
+@pytest.mark.parametrize("serialized", [False, True])
+def test__bulk_retries_only_rejected_requests(fake_elasticsearch, serialized):
+    path = Path('tests/cache/Security.evtx')
+    stats = Stats()
+    es = ElasticsearchUtils("127.0.0.1", fake_elasticsearch.port, "http", "", "", initial_backoff=0.01, stats=stats)
+    # the second request is rejected as a whole, retries of the transport
+    # included (3 by default)
+    fake_elasticsearch.reject_requests = {2, 3, 4, 5}
+
+    if serialized:
+        items = list(islice(
+            (
+                item
+                for batch in Evtx2es(path).gen_records("0", False, 500, id_strategy="content", serialized=True, bulk_index="evtx2es")
+                for item in batch
+            ),
+            8,
+        ))
+        assert es.bulk_serialized(items, chunk_size=2) == (len(items), [])
+    else:
+        records = list(islice(PyEvtxParser(str(path)).records_json(), 8))
+        items = process_by_chunk(records, str(path), "0")
+        assert es.bulk_indice(items, "evtx2es", "", chunk_size=2) == (len(items), [])
+
+    assert len(fake_elasticsearch.documents) == len(items)
+    # only the documents of the rejected request are sent again
+    requests = -(-len(items) // 2)
+    assert fake_elasticsearch.bulk_requests == requests + 3 + 1
+    # the client counts its requests, not the retries of the transport
+    assert stats.counters["bulk_requests"] == requests + 1
+    assert stats.counters["bytes_sent"] > 0
+
+
+@pytest.mark.parametrize("bulk_threads", [1, 3])
+def test__dead_letter_records_permanent_failures(fake_elasticsearch, tmp_path, bulk_threads):
+    fake_elasticsearch.invalid = 2
+    store = CheckpointStore(tmp_path / "checkpoint.json")
+    with DeadLetterQueue(tmp_path / "dead.ndjson") as dead_letter:
+        presenter = Evtx2esPresenter(
+            input_path=Path('tests/cache/Security.evtx'),
+            port=fake_elasticsearch.port,
+            host="127.0.0.1",
+            is_quiet=True,
+            bulk_threads=bulk_threads,
+            checkpoint=store,
+            dead_letter=dead_letter,
+        )
+        total = len(list(PyEvtxParser('tests/cache/Security.evtx').records_json()))
+        assert presenter.bulk_import() == total - 2
+
+    assert presenter.failed_count == 2
+    entries = [orjson.loads(line) for line in (tmp_path / "dead.ndjson").read_bytes().splitlines()]
+    assert [entry["status"] for entry in entries] == [400, 400]
+    assert entries[0]["error"]["type"] == "mapper_parsing_exception"
+    assert all(entry["_index"] == "evtx2es" and entry["_source"]["winlog"] for entry in entries)
+    # dead-lettered documents are handled: the file is not imported again
+    assert store.open(Path('tests/cache/Security.evtx')).completed
+
+
+def test__bulk_load_creates_index_and_restores_settings(fake_elasticsearch):
+    Evtx2esPresenter(
+        input_path=Path('tests/cache/Security.evtx'),
+        port=fake_elasticsearch.port,
+        host="127.0.0.1",
+        is_quiet=True,
+        bulk_load=True,
+    ).bulk_import()
+
+    calls = [call for call in fake_elasticsearch.requests if call[1] != "/_bulk"]
+    assert calls == [
+        ("HEAD", "/evtx2es"),
+        ("PUT", "/evtx2es"),
+        ("PUT", "/evtx2es/_settings"),
+        ("POST", "/evtx2es/_refresh"),
+    ]
+    # created with the mapping and bulk settings, then reset to the defaults
+    index = fake_elasticsearch.indices["evtx2es"]
+    assert index["mappings"] == ECS_MAPPINGS
+    assert index["settings"] == {}
+    assert len(fake_elasticsearch.documents) == len(list(PyEvtxParser('tests/cache/Security.evtx').records_json()))
+
+
+def test__bulk_load_restores_settings_on_failure(fake_elasticsearch):
+    fake_elasticsearch.indices["evtx2es"] = {
+        "settings": {"index.refresh_interval": "30s", "index.number_of_replicas": "2"},
+        "mappings": None,
+    }
+    with pytest.raises(FileNotFoundError):
+        Evtx2esPresenter(
+            input_path=Path('tests/cache/missing.evtx'),
+            port=fake_elasticsearch.port,
+            host="127.0.0.1",
+            is_quiet=True,
+            bulk_load=True,
+        ).bulk_import()
+
+    assert fake_elasticsearch.indices["evtx2es"]["settings"] == {
+        "index.refresh_interval": "30s",
+        "index.number_of_replicas": "2",
+    }
+    assert fake_elasticsearch.requests[-1] == ("POST", "/evtx2es/_refresh")
+
+
+def test__install_template_maps_every_field(fake_elasticsearch):
+    Evtx2esPresenter(
+        input_path=Path('tests/cache/Security.evtx'),
+        port=fake_elasticsearch.port,
+        host="127.0.0.1",
+        is_quiet=True,
+        install_template=True,
+    ).bulk_import()
+
+    template = fake_elasticsearch.templates["evtx2es"]
+    assert template["index_patterns"] == ["evtx2es", "evtx2es-*"]
+    mappings = template["template"]["mappings"]
+    assert mappings == TEMPLATE_MAPPINGS
+    assert mappings["properties"]["winlog"]["properties"]["event_data"]["type"] == "flattened"
+
+    # no document field is left to dynamic mapping
+    def unmapped(document: dict, properties: dict, prefix: str = ""):
+        for key, value in document.items():
+            mapping = properties.get(key)
+            if mapping is None:
+                yield prefix + key
+            elif "properties" in mapping and isinstance(value, dict):
+                yield from unmapped(value, mapping["properties"], f"{prefix}{key}.")
+
+    for document in fake_elasticsearch.documents.values():
+        assert list(unmapped(document, mappings["properties"])) == []
+
+
+def test__read_chunks_builds_a_parsable_file():
+    chunks = scan_chunks('tests/cache/Security.evtx')
+    assert chunks
+    data = read_chunks('tests/cache/Security.evtx', tuple(offset for offset, _ in chunks))
+    expected = list(PyEvtxParser('tests/cache/Security.evtx').records_json())
+    assert list(PyEvtxParser(io.BytesIO(data)).records_json()) == expected
+
+
+def test__parse_in_workers_matches_main_process():
+    path = Path('tests/cache/Security.evtx')
+    main_state, worker_state = IncrementalState(Path('unused')), IncrementalState(Path('unused'))
+
+    def gen(parse_in_workers: bool, incremental_filter) -> list:
+        record_filter = combine_filters(RecordFilter(exclude_event_ids=[4625]), incremental_filter)
+        batches = Evtx2es(path).gen_records("0", True, 2, record_filter=record_filter, parse_in_workers=parse_in_workers)
+        return [record for batch in batches for record in batch]
+
+    main_filter, worker_filter = main_state.filter(), worker_state.filter()
+    expected = gen(False, main_filter)
+    assert expected
+    assert gen(True, worker_filter) == expected
+    # the state of the filters evaluated in the workers is merged back
+    assert worker_filter.latest == main_filter.latest
+
+
+def test__worker_options_and_serialized_transports():
+    path = Path('tests/cache/Security.evtx')
+    expected = [record for batch in Evtx2es(path).gen_records("0", False, 3, additional_tags=["a"]) for record in batch]
+    lines = [orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in expected]
+
+    # options shipped once by the initializer, or with each task when they differ
+    with Evtx2es.create_pool(2, WorkerOptions("0", ("a",), None, True)) as pool:
+        for serialized, shared_memory, parse_in_workers in [
+            (True, False, False),
+            (True, True, True),
+            (False, False, True),
+        ]:
+            batches = Evtx2es(path).gen_records(
+                "0", True, 3, additional_tags=["a"], pool=pool,
+                serialized=serialized, shared_memory=shared_memory, parse_in_workers=parse_in_workers,
+            )
+            records = [record for batch in batches for record in batch]
+            assert records == (lines if serialized else expected)
+
+
+@pytest.mark.skipif(not Path("/dev/shm").is_dir(), reason="POSIX shared memory")
+def test__abandoned_shared_memory_is_released(tmp_path):
+    path = Path('tests/cache/Security.evtx')
+
+    def shared_blocks():
+        # the pool's own semaphores live there too
+        return {p for p in Path("/dev/shm").iterdir() if not p.name.startswith("sem.")}
+
+    blocks = shared_blocks()
+
+    # a profiled pool finishes its tasks on shutdown: each abandoned one leaves a block
+    pool = Evtx2es.create_pool(2, profile_dir=tmp_path)
+    batches = Evtx2es(path).gen_records(
+        "0", True, 1, pool=pool, max_inflight=4, serialized=True, shared_memory=True,
+    )
+    next(batches)
+    batches.close()
+    Evtx2es.shutdown_pool(pool)
+
+    assert shared_blocks() == blocks
+
+
+@pytest.mark.skipif(not Path("/dev/shm").is_dir(), reason="POSIX shared memory")
+def test__abandoned_shared_memory_of_another_pool_is_released():
+    path = Path('tests/cache/Security.evtx')
+
+    def shared_blocks():
+        return {p for p in Path("/dev/shm").iterdir() if not p.name.startswith("sem.")}
+
+    blocks = shared_blocks()
+
+    # a pool not made by create_pool keeps running once the import is abandoned
+    with Evtx2es.get_multiprocessing_context().Pool(2) as pool:
+        for parse_in_workers in (False, True):
+            batches = Evtx2es(path).gen_records(
+                "0", True, 1, pool=pool, max_inflight=4, serialized=True, shared_memory=True,
+                parse_in_workers=parse_in_workers,
+            )
+            next(batches)
+            batches.close()
+        pool.close()
+        pool.join()
+
+    assert shared_blocks() == blocks
+
+def test__bulk_items_serialized_in_workers(fake_elasticsearch):
+    path = Path('tests/cache/Security.evtx')
+    records = [record for batch in Evtx2es(path).gen_records("0", False, 3) for record in batch]
+    expected = list(gen_actions(records, "evtx2es", "pipe"))
+
+    batches = Evtx2es(path).gen_records(
+        "0", True, 3, id_strategy="content", serialized=True, bulk_index="evtx2es", bulk_pipeline="pipe",
+    )
+    items = [item for batch in batches for item in batch]
+    actions = []
+    for item in items:
+        action, source = map(orjson.loads, item.splitlines())
+        actions.append({**action["index"], "_source": source})
+    assert actions == expected
+    assert [get_serialized_record_id(item) for item in items] == [r["_source"]["winlog"]["record_id"] for r in expected]
+
+    # posted as they are, the rejected ones retried in order
+    fake_elasticsearch.reject = 2
+    es = ElasticsearchUtils("127.0.0.1", fake_elasticsearch.port, "http", "", "", initial_backoff=0.01)
+    assert es.bulk_serialized(items, chunk_size=2) == (len(items), [])
+    assert fake_elasticsearch.documents == {("evtx2es", a["_id"]): a["_source"] for a in expected}